@@ -1,7 +1,8 @@
+import collections
 from pathlib import Path
 import typing
 import pandas as pd
-from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
 
 from start_dj import start_django_lite
 
@@ -10,12 +11,14 @@ start_django_lite()
 from ontogen import Ontology
 from ontogen.converter import OntogenConverter, OwlClass, OwlIndividual
 from autogen_db_models import imdb, awards
+from award_ingest import AwardIngestReport, add_awards
 from engine import Session
+from imdb_info import fetch_imdb_info
+from title_matching import ensure_title_lookup, match_titles
 import attr
 
 from app import models
-from spacy_nlp import get_not_person_name
-import spacy_nlp as snlp
+from spacy_nlp import classify_names, get_not_person_name, pick_not_person_names
 
 _T = typing.TypeVar('_T')
 FilePathOrBuffer = typing.Union[str, Path, typing.IO[typing.AnyStr]]
@@ -79,8 +82,13 @@ def dump_attrs_list(file: FilePathOrBuffer,
     df.to_csv(file, index=False)
 
 
-def get_starting_films_from_awards() -> typing.List[Film]:
-    """Returns a list of Film with attribs title_id, title, and file_year added."""
+def get_starting_films_from_awards(ask: bool = False) -> typing.List[Film]:
+    """Returns a list of Film with attribs title_id, title, and file_year added.
+
+    Args:
+        ask: Whether to ask which of a BAFTA nominee and its workers is the film when it is not
+            recognized. Otherwise, such nominations are skipped and reported.
+    """
     session = Session()
     oscars = session.query(awards.Oscar).all()
     baftas = session.query(awards.Bafta).all()
@@ -92,47 +100,45 @@ def get_starting_films_from_awards() -> typing.List[Film]:
         unique_oscar_films.add((oscar.film, oscar.year_film))
 
     unique_bafta_films = set()
+    pairs = []
     for bafta in baftas:
         if bafta.nominee is None or bafta.year is None:
             continue
         if bafta.workers is not None:
-            film_name = get_not_person_name(bafta.nominee, bafta.workers)
-            # try:
-            #     film_name = get_not_person_name(bafta.nominee, bafta.workers)
-            # except ValueError:
-            #     film_name = None
-            #     while True:
-            #         res = input(f"Choose between '{bafta.nominee}' or '{bafta.workers}' as the person (1/2/q/s): ")
-            #         if res == 'q':
-            #             raise
-            #         if res == 's':
-            #             break
-            #         if res == '1':
-            #             film_name = bafta.workers
-            #             break
-            #         if res == '2':
-            #             film_name = bafta.nominee
-            #             break
-            #     if film_name is None:
-            #         continue
+            pairs.append((bafta.nominee, bafta.workers, bafta.year))
         else:
-            film_name = bafta.nominee
-        unique_bafta_films.add((film_name, bafta.year))
+            unique_bafta_films.add((bafta.nominee, bafta.year))
+    # Recognize the people in all the pairs at once, only the undecided ones are asked about, if `ask`
+    picks = pick_not_person_names((nominee, workers) for nominee, workers, _ in pairs)
+    undecided = []
+    for (nominee, workers, year), film_name in zip(pairs, picks):
+        if film_name is None and ask:
+            try:
+                film_name = get_not_person_name(nominee, workers)
+            except ValueError:
+                pass  # Both are persons
+        if film_name is None:
+            undecided.append((nominee, workers, year))
+            continue
+        unique_bafta_films.add((film_name, year))
+    if undecided:
+        print(f"Skipped {len(undecided)} BAFTA nominations with no film recognized, e.g. {undecided[:3]}")
 
     unique_award_winning_films = unique_oscar_films.union(unique_bafta_films)
-
-    film_lst: typing.List[Film] = []
-    title_akas_basics = session.query(imdb.TitleAkas.titleId, imdb.TitleAkas.title, imdb.TitleBasics.startYear).join(imdb.TitleBasics, imdb.TitleAkas.titleId == imdb.TitleBasics.tconst)
-
     for film in unique_award_winning_films:
         assert isinstance(film[0], str), str(film)
         assert isinstance(film[1], int), str(film)
-        print(f"{film=}")
-        title_akas_basic = title_akas_basics.filter(imdb.TitleAkas.title == film[0]).filter(imdb.TitleBasics.startYear == film[1]).first()
-        if title_akas_basic is None:
+
+    # One batched pass over the (normalized title, year) index instead of one akas scan per film
+    ensure_title_lookup(session)
+    matches = match_titles(session, unique_award_winning_films)
+
+    film_lst: typing.List[Film] = []
+    for film, match in matches.items():
+        if match is None:
             continue
-        film_lst.append(Film(title_id=title_akas_basic[0], title=title_akas_basic[1], film_year=title_akas_basic[2]))
-        print(title_akas_basic)
+        film_lst.append(Film(title_id=match.tconst, title=match.title, film_year=match.year))
+    print(f"Matched {len(film_lst)} of {len(matches)} award films")
 
     return film_lst
 
@@ -142,101 +148,79 @@ def init_awards():
     models.Award.objects.create(hasNickname='BAFTA')
 
 
-def add_award_info():
-    films: typing.Iterable[models.Film] = models.Film.objects.all()
-    session = Session()
-    # oscars = session.query(awards.Oscar).all()
-    # baftas = session.query(awards.Bafta).all()
+def add_award_info(**kwargs) -> AwardIngestReport:
+    """Adds the Oscar and BAFTA nominations of every `Film` and prints the rows skipped by reason.
 
-    for film in films:
-        oscar = session.query(awards.Oscar)\
-            .filter(awards.Oscar.film == film.hasTitle)\
-            .filter(awards.Oscar.year_film == film.hasInitialReleaseYear).first()
+    See `award_ingest.add_awards` for the keyword arguments. The nominees that are not
+    in the hand-made lists are classified by `spacy_nlp.classify_names` by default.
+    """
+    kwargs.setdefault('classify', classify_names)
+    report = add_awards(Session(), **kwargs)
+    reasons = collections.Counter(row.reason for row in report.skipped)
+    print(f'Added {report.nominations} nominations, skipped {len(report.skipped)} rows')
+    for reason, count in reasons.most_common():
+        print(f'  {count:>6} {reason}')
+    return report
 
-        if not oscar:
-            continue
 
-        res, name = snlp.categorize(oscar.name)
-        if res == 'ORG':
-            agent = models.Organization.upsert(hasName=name, label=name)
-        elif res == 'PERSON':
-            agent = models.Person.upsert(hasName=name)
-        else:
-            raise ValueError
-
-        award = models.Award.objects.get(hasNickname='Oscars')
-        award_cat = models.AwardCategory.get_instance_from_kaggle_oscar_data(oscar.category)
-        award_cem = models.AwardCeremony.upsert(
-                hasAward=award,
-                yearHeld=oscar.year_ceremony,
-                yearScreened=oscar.year_film,
-                hasEditionNumber=oscar.ceremony)
-
-        nom = models.NominationSituation.upsert(
-            forFilm=film,
-            hasAward=award,
-            hasAwardCategory=award_cat,
-            hasAwardCeremony=award_cem,
-            isGivenTo=agent,
-            win=oscar.winner
-        )
-        print(f'{film} {nom}')
-
-        # bafta = session.query(awards.Bafta) \
-        #     .filter(awards.Oscar.film == film.hasTitle) \
-        #     .filter(awards.Oscar.year_film == film.hasInitialReleaseYear).first()
-
-
-def add_imdb_info():
-    films: typing.Iterable[models.Film] = models.Film.objects.all()
+def add_imdb_info(*, batch_size: int = 500, sync_wikidata: bool = False, verbose: int = 1) -> int:
+    """Adds the genres, runtime, adult flag and country of origin from the IMDb tables to every `Film`.
+
+    The films are enriched a batch at a time: the IMDb rows of a batch are read by
+    `fetch_imdb_info`, then the films and their genres are written with one bulk
+    update and one bulk insert in a transaction.
+
+    Args:
+        batch_size: The number of films per batch.
+        sync_wikidata: Whether to sync every film with Wikidata afterwards, see
+            `Film.sync_many_from_wikidata`.
+        verbose: Prints the progress after each batch if greater than 0.
+
+    Returns:
+        The number of films found in `title_basics`.
+    """
     session = Session()
-    for film in films:
-        tconst = film.t_const
-
-        # add info from title_basic
-        title_basic: imdb.TitleBasics = session.query(imdb.TitleBasics).filter(imdb.TitleBasics.tconst == tconst).first()
-        # add genres
-        for genre in title_basic.genres.split(','):
-            g = models.Genre.upsert(label=genre)
-            film.hasGenre.add(g)
-
-        film.isAdult = bool(title_basic.isAdult)
-        if title_basic.isAdult == 1:
-            film.hasAudience = models.Audience.upsert(label='Adults')
-        else:
-            film.hasAudience = models.Audience.upsert(label='Children')
-
-        film.hasFeatureLengthInMinutes = title_basic.runtimeMinutes
-
-        # add info from title_akas
-        title_akas_lst: typing.Iterable[imdb.TitleAkas] = session.query(imdb.TitleAkas, imdb.ProductionCompanies, imdb.Certificates)\
-            .filter(imdb.TitleAkas.titleId == tconst)\
-            .filter(imdb.TitleAkas.isOriginalTitle == 1) \
-            .join(imdb.TitleBasics,
-                  imdb.TitleBasics.tconst == imdb.TitleAkas.titleId)\
-            .join(imdb.Certificates,
-                  imdb.Certificates.title == imdb.TitleAkas.title
-                  and imdb.Certificates.year == imdb.TitleBasics.startYear)\
-            .join(imdb.ProductionCompanies, imdb.ProductionCompanies.title == imdb.TitleAkas.title
-                  and imdb.ProductionCompanies.year == imdb.TitleBasics.startYear
-                  ).all()
-        try:
-            film.sync_from_wikidata()
-        except KeyError:
-            pass
-        for three in title_akas_lst:
-            title_akas = three[0]
-            prod = three[1]
-
-            if title_akas.isOriginalTitle == 1:
-                try:
-                    if prod.country_code:
-                        country = models.Country.objects.get(alpha_2__iexact=prod.country_code.upper())
-                        film.hasCountryOfOrigin = country
-                        print(f'found: {title_akas}')
-                except ObjectDoesNotExist:
-                    pass
-        print(film)
+    countries = {country.alpha_2.upper(): country for country in models.Country.objects.all()}
+    genre_map: typing.Dict[tuple, models.Genre] = {}
+    # Film has no audience property yet, so the audiences only have to exist once
+    for label in ('Adults', 'Children'):
+        models.Audience.upsert(label=label)
+    film_genre = models.Film.hasGenre.through
+
+    found = 0
+    films = list(models.Film.objects.all())
+    for i in range(0, len(films), batch_size):
+        batch = films[i:i + batch_size]
+        infos = fetch_imdb_info(session, [film.t_const for film in batch], batch_size=batch_size)
+        labels = list(dict.fromkeys(genre for info in infos.values() for genre in info.genres))
+        genres = dict(zip(labels, models.Genre.upsert_many([{'label': label} for label in labels],
+                                                           identity_map=genre_map)))
+
+        links = []
+        for film in batch:
+            info = infos.get(film.t_const)
+            if info is None:
+                continue
+            film.isAdult = info.is_adult
+            film.hasFeatureLengthInMinutes = info.runtime_minutes
+            # Only assigned when found, as reading the current one would query each film
+            if info.country_code and info.country_code.upper() in countries:
+                film.hasCountryOfOrigin = countries[info.country_code.upper()]
+            links.extend(film_genre(film_id=film.pk, genre_id=genres[genre].pk) for genre in info.genres)
+
+        with transaction.atomic():
+            models.Film.objects.bulk_update(batch, ['isAdult', 'hasFeatureLengthInMinutes', 'hasCountryOfOrigin'])
+            film_genre.objects.bulk_create(links, ignore_conflicts=True)
+        found += len(infos)
+        if verbose > 0:
+            print(f'IMDb info: {i + len(batch)} of {len(films)} films')
+
+    if sync_wikidata:
+        with transaction.atomic():
+            synced = models.Film.sync_many_from_wikidata(films)
+        if verbose > 0:
+            print(f'Wikidata: {len(synced)} of {len(films)} films')
+    return found
 
 
 def read_alpha_2_to_countries(csv_file: str):
@@ -0,0 +1,238 @@
+"""Adds the Oscar and BAFTA nominations of the films in the Django database.
+
+Instead of one `awards.Oscar` query, one spaCy call (which may ask on the console)
+and four upserts per film, `add_awards` reads every nomination once, joins them to
+the films by normalized title and year in memory, decides whether each nominee is
+a person or an organization with one lookup table, and writes the nominations of
+each ceremony in one transaction.
+"""
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from django.db import transaction
+from sqlalchemy import select
+from sqlalchemy.orm import Session as OrmSession
+
+from start_dj import start_django_lite
+
+start_django_lite()
+
+from app import models
+from autogen_db_models import awards
+from spacy_nlp import get_classification_cache
+from utils.str import normalize_title
+
+__all__ = ['PERSON', 'ORG', 'Nomination', 'SkippedRow', 'AwardIngestReport', 'index_films',
+           'oscar_nominations', 'bafta_nominations', 'load_agent_kinds', 'classify_agents', 'add_awards']
+
+PERSON = 'PERSON'
+ORG = 'ORG'
+
+# The 1st BAFTA film awards were held in 1949
+FIRST_BAFTA_YEAR = 1949
+
+FilmIndex = Dict[Tuple[str, int], models.Film]
+
+
+class Nomination(NamedTuple):
+    """A nomination joined to its film, before its agent, category and ceremony are resolved."""
+    award: str  # the nickname of the Award
+    edition: int
+    year_held: int
+    year_screened: int
+    category: str  # the label of the AwardCategory
+    nominee: str
+    film: models.Film
+    win: bool
+    table: str
+    row_id: int
+
+
+class SkippedRow(NamedTuple):
+    """A row of an award table that was not added, and why."""
+    table: str
+    row_id: int
+    reason: str
+
+
+class AwardIngestReport(NamedTuple):
+    nominations: int
+    skipped: List[SkippedRow]
+
+
+def index_films(films: Iterable[models.Film]) -> FilmIndex:
+    """Returns `films` by the `normalize_title` of their title and their initial release year."""
+    index = {}
+    for film in films:
+        if film.hasTitle and film.hasInitialReleaseYear is not None:
+            index.setdefault((normalize_title(film.hasTitle), film.hasInitialReleaseYear), film)
+    return index
+
+
+def _find_film(index: FilmIndex, title: Optional[str], years: Sequence[int]) -> Optional[models.Film]:
+    if not title:
+        return None
+    norm_title = normalize_title(title)
+    for year in years:
+        film = index.get((norm_title, year))
+        if film is not None:
+            return film
+    return None
+
+
+def oscar_nominations(session: OrmSession, index: FilmIndex, skipped: List[SkippedRow]) -> Iterator[Nomination]:
+    """Yields the nominations of `awards.Oscar` of the films in `index`. The other rows are added to `skipped`."""
+    table = awards.Oscar.__table__
+    for row in session.execute(select(table).order_by(table.c.ceremony, table.c._id)):
+        if not row.name:
+            skipped.append(SkippedRow(table.name, row._id, 'no nominee'))
+            continue
+        film = _find_film(index, row.film, (row.year_film,))
+        if film is None:
+            skipped.append(SkippedRow(table.name, row._id, 'no matching film'))
+            continue
+        try:
+            category = models.AwardCategory.label_from_kaggle_oscar_data(row.category)
+        except KeyError:
+            skipped.append(SkippedRow(table.name, row._id, f"unknown category '{row.category}'"))
+            continue
+        yield Nomination('Oscars', row.ceremony, row.year_ceremony, row.year_film, category,
+                         row.name, film, bool(row.winner), table.name, row._id)
+
+
+def bafta_nominations(session: OrmSession, index: FilmIndex, skipped: List[SkippedRow]) -> Iterator[Nomination]:
+    """Yields the nominations of `awards.Bafta` of the films in `index`. The other rows are added to `skipped`.
+
+    Either the nominee or the workers of a row is the title of the film and the other
+    one is the nominee, so whichever matches a film is taken as the film. The year of
+    a row is taken as the year of the ceremony, which screened the films of the year
+    before; the edition is counted from the 1st ceremony in 1949.
+    """
+    table = awards.Bafta.__table__
+    for row in session.execute(select(table).order_by(table.c.year, table.c._id)):
+        years = (row.year - 1, row.year)
+        nominee = None
+        film = _find_film(index, row.nominee, years)
+        if film is not None:
+            nominee = row.workers
+        else:
+            film = _find_film(index, row.workers, years)
+            if film is not None:
+                nominee = row.nominee
+        if film is None:
+            skipped.append(SkippedRow(table.name, row._id, 'no matching film'))
+            continue
+        if not nominee:
+            skipped.append(SkippedRow(table.name, row._id, 'no nominee'))
+            continue
+        category = models.AwardCategory.label_from_kaggle_bafta_data(row.category)
+        yield Nomination('BAFTA', row.year - FIRST_BAFTA_YEAR + 1, row.year, row.year - 1, category,
+                         nominee, film, bool(row.winner), table.name, row._id)
+
+
+def load_agent_kinds() -> Dict[str, str]:
+    """Returns `PERSON` or `ORG` for the names classified before, see `spacy_nlp.ClassificationCache`."""
+    cache = get_classification_cache()
+    return {name: kind for name, kind in cache.kinds.items() if kind in cache.KINDS}
+
+
+def classify_agents(names: Iterable[str],
+                    *,
+                    known: Dict[str, str] = None,
+                    classify: Callable[[List[str]], Dict[str, str]] = None,
+                    default_kind: Optional[str] = PERSON) -> Dict[str, Optional[str]]:
+    """Returns `PERSON`, `ORG` or None for each of `names`, without asking anything.
+
+    Args:
+        names: The names of the nominees.
+        known: The kinds already known. Defaults to `load_agent_kinds()`.
+        classify: Called once with all the names that are not known. It returns the
+            kind of the names it can tell.
+        default_kind: The kind of the names that are still unknown.
+    """
+    if known is None:
+        known = load_agent_kinds()
+    kinds = {name: known.get(name) for name in dict.fromkeys(names)}
+    unknown = [name for name, kind in kinds.items() if kind is None]
+    if unknown and classify is not None:
+        kinds.update(classify(unknown))
+    for name, kind in kinds.items():
+        if kind is None:
+            kinds[name] = default_kind
+    return kinds
+
+
+def _resolve_agents(kinds: Dict[str, Optional[str]]) -> Dict[str, models.Agent]:
+    """Returns the `Person` or `Organization` of each name whose kind is known, creating the missing ones."""
+    persons = [name for name, kind in kinds.items() if kind == PERSON]
+    orgs = [name for name, kind in kinds.items() if kind == ORG]
+    with transaction.atomic():
+        agents = dict(zip(persons, models.Person.upsert_many([{'hasName': name} for name in persons])))
+        agents.update(zip(orgs, models.Organization.upsert_many([{'hasName': name, 'label': name}
+                                                                   for name in orgs])))
+    return agents
+
+
+def add_awards(session: OrmSession,
+               films: Iterable[models.Film] = None,
+               *,
+               awards_to_add: Sequence[str] = ('Oscars', 'BAFTA'),
+               known: Dict[str, str] = None,
+               classify: Callable[[List[str]], Dict[str, str]] = None,
+               default_kind: Optional[str] = PERSON,
+               verbose: int = 1) -> AwardIngestReport:
+    """Adds a `NominationSituation` for every nomination of `films` in the award tables.
+
+    Args:
+        session: A session to the database with the award tables.
+        films: The films to add the nominations of. Defaults to every `Film`.
+        awards_to_add: The nicknames of the awards to add, 'Oscars' and/or 'BAFTA'.
+        known: See `classify_agents`.
+        classify: See `classify_agents`.
+        default_kind: See `classify_agents`. If None, the nominations of unknown nominees are skipped.
+        verbose: Prints the progress after each ceremony if greater than 0.
+
+    Returns:
+        The number of nominations added and the rows skipped.
+    """
+    if films is None:
+        films = models.Film.objects.all()
+    index = index_films(films)
+    skipped: List[SkippedRow] = []
+    nominations: List[Nomination] = []
+    if 'Oscars' in awards_to_add:
+        nominations.extend(oscar_nominations(session, index, skipped))
+    if 'BAFTA' in awards_to_add:
+        nominations.extend(bafta_nominations(session, index, skipped))
+
+    agents = _resolve_agents(classify_agents((nom.nominee for nom in nominations),
+                                             known=known, classify=classify, default_kind=default_kind))
+    labels = list(dict.fromkeys(nom.category for nom in nominations))
+    categories = dict(zip(labels, models.AwardCategory.upsert_many([{'label': label} for label in labels])))
+    award_objs = {nickname: models.Award.objects.get_or_create(hasNickname=nickname)[0]
+                  for nickname in awards_to_add}
+
+    ceremonies: Dict[Tuple[str, int], List[Nomination]] = {}
+    for nom in nominations:
+        ceremonies.setdefault((nom.award, nom.edition), []).append(nom)
+
+    count = 0
+    for (nickname, edition), noms in ceremonies.items():
+        award = award_objs[nickname]
+        rows = []
+        for nom in noms:
+            agent = agents.get(nom.nominee)
+            if agent is None:
+                skipped.append(SkippedRow(nom.table, nom.row_id, f"unknown kind of nominee '{nom.nominee}'"))
+                continue
+            rows.append(dict(forFilm=nom.film, hasAward=award, hasAwardCategory=categories[nom.category],
+                             isGivenTo=agent, win=nom.win))
+        with transaction.atomic():
+            ceremony = models.AwardCeremony.upsert(hasAward=award, yearHeld=noms[0].year_held,
+                                                   hasEditionNumber=edition, yearScreened=noms[0].year_screened)
+            for row in rows:
+                row['hasAwardCeremony'] = ceremony
+            models.NominationSituation.upsert_many(rows, batch_size=100)
+        count += len(rows)
+        if verbose > 0:
+            print(f'{nickname} #{edition}: {len(rows)} nominations')
+    return AwardIngestReport(count, skipped)
@@ -0,0 +1,50 @@
+"""Compares rows per second of the dict and columnar readers of `extended_csv` on a scaled up fixture.
+
+Usage:
+    python -m benchmarks.bench_extended_csv [scale]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from dirs import ROOT_DIR
+from extended_csv import read_xsv_file, read_xsv_file_batches
+
+FIXTURE = ROOT_DIR / 'tests/data/csv/branded_food-10000.csv'
+
+
+def write_scaled_fixture(filename: Path, scale: int) -> int:
+    """Writes the rows of `FIXTURE` `scale` times to `filename` and returns the number of rows."""
+    with open(FIXTURE, encoding='utf-8') as file:
+        header = file.readline()
+        body = file.read()
+    if not body.endswith('\n'):
+        body += '\n'
+    with open(filename, 'w', encoding='utf-8') as file:
+        file.write(header)
+        for _ in range(scale):
+            file.write(body)
+    return sum(len(batch) for batch in read_xsv_file_batches(filename, 'excel', encoding='utf-8'))
+
+
+def main(scale: int = 20):
+    with tempfile.TemporaryDirectory() as tempdir:
+        filename = Path(tempdir) / 'branded_food.csv'
+        num_rows = write_scaled_fixture(filename, scale)
+        for name, read in [
+            ('read_xsv_file (dicts)', lambda: read_xsv_file(filename, 'excel', encoding='utf-8')),
+            ('read_xsv_file_batches', lambda: sum(len(b) for b in read_xsv_file_batches(filename, 'excel',
+                                                                                         encoding='utf-8'))),
+            ('pd.read_csv(dtype=str)', lambda: pd.read_csv(filename, dtype=str, keep_default_na=False)),
+        ]:
+            start = time.perf_counter()
+            read()
+            elapsed = time.perf_counter() - start
+            print(f'{name:<23} {num_rows} rows in {elapsed:.2f}s ({num_rows / elapsed:,.0f} rows/s)')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,63 @@
+"""Compares lines per second of `parse_imdb_list`, `parse_imdb_list_fast` and `parse_imdb_list_parallel`.
+
+Usage:
+    python -m benchmarks.bench_imdb_list [num_lines] [workers]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sa_autowrite.parsers import parse_imdb_list, parse_imdb_list_fast, parse_imdb_list_parallel
+
+HEADER = (
+    'CRC: 0x5C4DA2A0  File: countries.list  Date: Fri Dec 22 00:00:00 2017\n'
+    '\n'
+    'COUNTRIES LIST\n'
+    '==============\n'
+)
+FOOTER = '--------------------------------------------------------------------------------\n'
+
+
+def write_countries_list(filename: Path, num_lines: int) -> None:
+    """Writes a fake `countries.list` with `num_lines` data lines."""
+    with open(filename, 'w', encoding='windows-1252') as file:
+        file.write('-' * 80 + '\n' + HEADER)
+        for i in range(num_lines):
+            if i % 4 == 0:
+                file.write(f'"Show {i}" ({1950 + i % 70}) {{Episode {i % 13} (#{i % 9}.{i % 20})}}\t\tUSA\n')
+            elif i % 4 == 1:
+                file.write(f'Movie {i} ({1950 + i % 70}/II) (TV)\t\t\t\tFrance\n')
+            elif i % 4 == 2:
+                file.write(f'"Show {i}" (????)\t\t\t\t\tJapan\n')
+            else:
+                file.write(f'Movie (Part {i}) ({1950 + i % 70})\t\t\t\t\tUK\n')
+        file.write(FOOTER)
+
+
+def time_parse(parse, filename: Path, **kwargs) -> float:
+    """Returns the seconds taken to parse `filename` with `parse`."""
+    start = time.perf_counter()
+    for _ in parse(filename, chunksize=10_000, **kwargs):
+        pass
+    return time.perf_counter() - start
+
+
+def main(num_lines: int = 400_000, workers: int = None):
+    if workers is None:
+        workers = os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as tempdir:
+        filename = Path(tempdir) / 'countries.list'
+        write_countries_list(filename, num_lines)
+        for name, parse, kwargs in [
+            ('parse_imdb_list', parse_imdb_list, {}),
+            ('parse_imdb_list_fast', parse_imdb_list_fast, {}),
+            (f'parallel, {workers} workers', parse_imdb_list_parallel, {'workers': workers, 'shard_size': 1 << 20}),
+        ]:
+            elapsed = time_parse(parse, filename, **kwargs)
+            print(f'{name:<24} {num_lines} lines in {elapsed:.2f}s ({num_lines / elapsed:,.0f} lines/s)')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
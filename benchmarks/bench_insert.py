@@ -0,0 +1,56 @@
+"""Compares rows per second of `insert_xsv_data` with and without `bulk`.
+
+Usage:
+    python -m benchmarks.bench_insert [num_rows]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from autogen_db_models.imdb import NameBasics
+from autogen_db_models.imdb.base import Base
+from sa_autowrite.insert import insert_xsv_data
+
+HEADER = 'nconst\tprimaryName\tbirthYear\tdeathYear\tprimaryProfession\tknownForTitles\n'
+
+
+def write_name_basics(filename: Path, num_rows: int) -> None:
+    """Writes a fake `name.basics.tsv` with `num_rows` rows."""
+    with open(filename, 'w', encoding='utf-8') as file:
+        file.write(HEADER)
+        for i in range(num_rows):
+            death_year = '\\N' if i % 3 else str(1950 + i % 70)
+            file.write(f'nm{i:07}\tPerson Number {i}\t{1900 + i % 100}\t{death_year}\t'
+                       f'actor,soundtrack\ttt{i:07},tt{i + 1:07}\n')
+
+
+def time_insert(filename: Path, db_filename: Path, *, bulk: bool) -> float:
+    """Returns the seconds taken to insert `filename` into a new SQLite database."""
+    engine = create_engine(f'sqlite:///{db_filename}')
+    Base.metadata.create_all(engine, tables=[NameBasics.__table__])
+    session = sessionmaker(bind=engine)()
+    start = time.perf_counter()
+    insert_xsv_data(filename, NameBasics, chunksize=10_000,
+                    null_values=['\\N'], ignore_cols=['_id'],
+                    skip_rows_data=0, verbose=0, bulk=bulk, session=session)
+    elapsed = time.perf_counter() - start
+    session.close()
+    engine.dispose()
+    return elapsed
+
+
+def main(num_rows: int = 100_000):
+    with tempfile.TemporaryDirectory() as tempdir:
+        filename = Path(tempdir) / 'name.basics.tsv'
+        write_name_basics(filename, num_rows)
+        for bulk in (False, True):
+            elapsed = time_insert(filename, Path(tempdir) / f'bench-{bulk}.sqlite3', bulk=bulk)
+            print(f'bulk={bulk!s:<5} {num_rows} rows in {elapsed:.2f}s ({num_rows / elapsed:,.0f} rows/s)')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
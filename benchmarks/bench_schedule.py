@@ -0,0 +1,34 @@
+"""Times actualizing the entities of mao.yaml into a new owlready2 World.
+
+The specs are loaded before the timer starts, so only the actualization is timed.
+
+Usage:
+    python -m benchmarks.bench_schedule [num_runs]
+"""
+import sys
+import time
+
+from dirs import ROOT_DIR
+from ontogen import open_world
+from ontogen.converter import OntogenConverter
+
+
+def time_actualize() -> float:
+    world = open_world()
+    converter = OntogenConverter.load_from_spec(ROOT_DIR / "mao.yaml", world=world)
+    start = time.perf_counter()
+    onto = converter.sync_with_ontology()
+    elapsed = time.perf_counter() - start
+    assert len(list(onto.implementation.classes())) > 0
+    world.close()
+    return elapsed
+
+
+def main(num_runs: int = 20):
+    times = [time_actualize() for _ in range(num_runs)]
+    print(f'mao.yaml actualized in {min(times) * 1000:.1f}ms (best of {num_runs}), '
+          f'{sum(times) / num_runs * 1000:.1f}ms on average')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
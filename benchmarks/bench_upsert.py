@@ -0,0 +1,48 @@
+"""Compares `UpsertMixin.upsert` per row with `UpsertMixin.upsert_many` on an in-memory database.
+
+Every distinct row appears twice and half of them already exist.
+
+Usage:
+    python -m benchmarks.bench_upsert [num_rows]
+"""
+import sys
+import time
+
+from django.core.management import call_command
+
+from start_dj import start_django_lite
+
+start_django_lite(':memory:')
+
+from app import models
+
+
+def make_rows(num_rows: int) -> list:
+    return [{'label': f'Language {i % (num_rows // 2)}'} for i in range(num_rows)]
+
+
+def time_upsert(rows: list, *, many: bool) -> float:
+    """Returns the seconds taken to upsert `rows` into a table that has half of the distinct ones."""
+    models.Language.objects.all().delete()
+    models.Language.objects.bulk_create(models.Language(**row) for row in rows[:len(rows) // 4])
+    start = time.perf_counter()
+    if many:
+        models.Language.upsert_many(rows)
+    else:
+        for row in rows:
+            models.Language.upsert(**row)
+    return time.perf_counter() - start
+
+
+def main(num_rows: int = 10_000):
+    call_command('migrate', 'app', verbosity=0)
+    rows = make_rows(num_rows)
+    for many in (False, True):
+        elapsed = time_upsert(rows, many=many)
+        name = 'upsert_many' if many else 'upsert'
+        print(f'{name:<11} {num_rows} rows in {elapsed:.2f}s ({num_rows / elapsed:,.0f} rows/s)')
+    assert models.Language.objects.count() == num_rows // 2
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
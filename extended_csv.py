@@ -1,11 +1,12 @@
 import csv
-from itertools import islice
+from itertools import chain, islice
 from pathlib import Path
-from typing import IO, Dict, Iterable, List, Union
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Union
 
 from utils.dict import select_not_null
 
-__all__ = ['read_xsv', 'read_xsv_file', 'get_dialect_from_suffix']
+__all__ = ['RecordBatch', 'read_xsv_batches', 'read_xsv_file_batches', 'read_xsv', 'read_xsv_file',
+           'get_dialect_from_suffix']
 
 
 _FORMAT_DIALECT = {
@@ -35,6 +36,125 @@ def get_dialect_from_suffix(suffix: str) -> str:
         raise ValueError(f"Unrecognized file format: '{suffix}'") from None
 
 
+class RecordBatch:
+    """Rows of a CSV/TSV file stored as one list of values per column.
+
+    Like `csv.DictReader`, missing values of short rows are None and the extra values
+    of long rows are kept in `rest` by row index.
+
+    Examples:
+        >>> batch = RecordBatch(['a', 'b'], [['1', '3'], ['2', None]], {1: ['x']})
+        >>> len(batch)
+        2
+        >>> batch.to_dicts()
+        [{'a': '1', 'b': '2'}, {'a': '3', 'b': None, None: ['x']}]
+    """
+    __slots__ = ('fieldnames', 'columns', 'rest')
+
+    def __init__(self, fieldnames: List[str], columns: List[List[Optional[str]]], rest: Dict[int, List[str]] = None):
+        self.fieldnames = fieldnames
+        self.columns = columns
+        self.rest = rest or {}
+
+    def __len__(self) -> int:
+        return len(self.columns[0]) if self.columns else 0
+
+    def column(self, name: str) -> List[Optional[str]]:
+        return self.columns[self.fieldnames.index(name)]
+
+    def to_dicts(self) -> List[Dict]:
+        """Returns the rows as dicts, the same as `csv.DictReader` would."""
+        dicts = [dict(zip(self.fieldnames, row)) for row in zip(*self.columns)]
+        for i, rest in self.rest.items():
+            dicts[i][None] = rest
+        return dicts
+
+    def to_frame(self) -> 'pd.DataFrame':
+        """Returns the batch as a DataFrame of str, without the extra values."""
+        import pandas as pd
+        return pd.DataFrame(dict(zip(self.fieldnames, self.columns)), columns=self.fieldnames, dtype=object)
+
+
+def read_xsv_batches(file: IO,
+                     dialect: str,
+                     fieldnames: List[str] = None,
+                     first_line_is_column_header: bool = True,
+                     discard: int = None,
+                     load_at_most: int = None,
+                     *,
+                     batch_size: int = 10_000,
+                     ) -> Iterator[RecordBatch]:
+    """Returns an iterator of `RecordBatch` of at most `batch_size` rows. Must be iterated while file is still open.
+
+    Takes the same arguments as `read_xsv` and reads the same rows, but without creating a dict per row.
+
+    Args:
+        batch_size:
+            Positive integer. The number of rows of each batch.
+
+    Warnings:
+        Must be iterated while file is still open.
+    """
+    if first_line_is_column_header and fieldnames is not None:
+        raise NotImplementedError("Changing column names isn't supported for simplicity")
+
+    # Like `csv.DictReader`, blank lines are not rows
+    reader = filter(None, csv.reader(file, dialect=dialect))
+    if fieldnames is None:
+        try:
+            first_row = next(reader)
+        except StopIteration:
+            return
+        if first_line_is_column_header:
+            fieldnames = first_row
+        else:
+            # use 'Column X' as fieldnames like in OpenRefine
+            fieldnames = [f'Column {i + 1}' for i in range(len(first_row))]
+            reader = chain([first_row], reader)
+    fieldnames = list(fieldnames)
+    num_fields = len(fieldnames)
+
+    stop = None
+    if load_at_most is not None:
+        stop = load_at_most
+        if discard is not None:
+            stop += discard
+    reader = islice(reader, discard, stop)
+
+    while True:
+        rows = list(islice(reader, batch_size))
+        if not rows:
+            return
+        rest = {}
+        for i, row in enumerate(rows):
+            if len(row) != num_fields:
+                if len(row) > num_fields:
+                    rest[i] = row[num_fields:]
+                    rows[i] = row[:num_fields]
+                else:
+                    rows[i] = row + [None] * (num_fields - len(row))
+        yield RecordBatch(fieldnames, [list(column) for column in zip(*rows)], rest)
+
+
+def read_xsv_file_batches(filename: Union[str, Path],
+                          dialect: str,
+                          *,
+                          encoding: str = None,
+                          fieldnames: List[str] = None,
+                          first_line_is_column_header: bool = True,
+                          discard: int = None,
+                          load_at_most: int = None,
+                          batch_size: int = 10_000,
+                          ) -> Iterator[RecordBatch]:
+    """Yields `RecordBatch` of at most `batch_size` rows. The file is closed once every batch is read.
+
+    See `read_xsv_file` and `read_xsv_batches` for the arguments.
+    """
+    with open(filename, 'r', **select_not_null({'encoding': encoding})) as file:
+        yield from read_xsv_batches(file, dialect, fieldnames, first_line_is_column_header, discard, load_at_most,
+                                    batch_size=batch_size)
+
+
 def read_xsv_file(filename: Union[str, Path],
                   dialect: str,
                   *,
@@ -65,17 +185,10 @@ def read_xsv_file(filename: Union[str, Path],
     Notes:
         Use 'excel' dialect for CSV. Use 'excel-tab' for TSV.
     """
-    kwargs = {
-        'encoding': encoding,
-        'fieldnames': fieldnames,
-        'first_line_is_column_header': first_line_is_column_header,
-        'discard': discard,
-        'load_at_most': load_at_most,
-    }
-    with open(filename, 'r', **select_not_null(kwargs, 'encoding')) as file:
-        kwargs.pop('encoding')
-        # must iterated now because file will be closed
-        return list(read_xsv(file, dialect, **select_not_null(kwargs)))
+    batches = read_xsv_file_batches(filename, dialect, encoding=encoding, fieldnames=fieldnames,
+                                    first_line_is_column_header=first_line_is_column_header,
+                                    discard=discard, load_at_most=load_at_most)
+    return [row for batch in batches for row in batch.to_dicts()]
 
 
 def read_xsv(file: IO,
@@ -107,28 +220,5 @@ def read_xsv(file: IO,
     Warnings:
         Must be iterated while file is still open.
     """
-    kwargs = {
-        'fieldnames': fieldnames,
-        'dialect': dialect,
-    }
-
-    if not first_line_is_column_header and fieldnames is None:
-        # use 'Column X' as fieldnames like in OpenRefine
-        first_line = file.readline(1)
-        file.seek(-1)
-        delimiter = csv.get_dialect(dialect).delimiter
-        num_cols = len(first_line.split(delimiter))
-        kwargs['fieldnames'] = [f'Column {i + 1}' for i in range(num_cols)]
-
-    if first_line_is_column_header and fieldnames is not None:
-        raise NotImplementedError("Changing column names isn't supported for simplicity")
-
-    reader = csv.DictReader(file, **select_not_null(kwargs, 'fieldnames', 'dialect'))
-
-    stop = None
-    if load_at_most is not None:
-        stop = load_at_most
-        if discard is not None:
-            stop += discard
-
-    return islice(reader, discard, stop)
+    batches = read_xsv_batches(file, dialect, fieldnames, first_line_is_column_header, discard, load_at_most)
+    return chain.from_iterable(batch.to_dicts() for batch in batches)
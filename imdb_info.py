@@ -0,0 +1,87 @@
+"""Reads what `add_individuals.add_imdb_info` needs about many IMDb titles at once.
+
+`fetch_imdb_info` looks up a batch of tconsts with one query per table
+(`title_basics`, `title_akas` and `production_companies`) instead of a few
+queries per title, so the number of round trips grows with the number of
+batches rather than the number of films.
+"""
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import and_, select
+from sqlalchemy.orm import Session as OrmSession
+
+from autogen_db_models.imdb import ProductionCompanies, TitleAkas, TitleBasics
+from utils.iter import chunked
+
+__all__ = ['ImdbInfo', 'fetch_imdb_info']
+
+
+class ImdbInfo(NamedTuple):
+    """What is known about a title from the IMDb tables.
+
+    Attributes:
+        tconst: The IMDb id of the title.
+        is_adult: Whether the title is for adults only.
+        runtime_minutes: The runtime, or None if unknown.
+        genres: The IMDb genres in the order they are listed.
+        country_code: The lowercase country code of the first production company
+            of the original title that has one, or None.
+    """
+    tconst: str
+    is_adult: bool
+    runtime_minutes: Optional[int]
+    genres: List[str]
+    country_code: Optional[str] = None
+
+
+def _to_minutes(value: Optional[str]) -> Optional[int]:
+    if value is None or not value.isdigit():
+        return None
+    return int(value)
+
+
+def fetch_imdb_info(session: OrmSession,
+                    tconsts: Iterable[str],
+                    *,
+                    batch_size: int = 500,
+                    ) -> Dict[str, ImdbInfo]:
+    """Returns the `ImdbInfo` of each of `tconsts` that is in `title_basics`.
+
+    The production companies of a title are the ones listed under its original
+    title (from `title_akas`) and its start year.
+
+    Args:
+        session: A session to the IMDb database.
+        tconsts: The titles to look up.
+        batch_size: The number of titles looked up per query.
+    """
+    infos: Dict[str, ImdbInfo] = {}
+    for batch in chunked(dict.fromkeys(tconsts), batch_size):
+        stmt = select(TitleBasics.tconst, TitleBasics.isAdult, TitleBasics.runtimeMinutes,
+                      TitleBasics.genres, TitleBasics.startYear) \
+            .where(TitleBasics.tconst.in_(batch))
+        years: Dict[str, Optional[int]] = {}
+        for tconst, is_adult, runtime, genres, year in session.execute(stmt):
+            infos[tconst] = ImdbInfo(tconst, is_adult == 1, _to_minutes(runtime),
+                                     genres.split(',') if genres else [])
+            years[tconst] = year
+
+        stmt = select(TitleAkas.titleId, TitleAkas.title) \
+            .where(and_(TitleAkas.titleId.in_(list(years)), TitleAkas.isOriginalTitle == 1))
+        original_titles: Dict[tuple, List[str]] = {}
+        for tconst, title in session.execute(stmt):
+            original_titles.setdefault((title, years[tconst]), []).append(tconst)
+        if not original_titles:
+            continue
+
+        stmt = select(ProductionCompanies.title, ProductionCompanies.year, ProductionCompanies.country_code) \
+            .where(and_(ProductionCompanies.title.in_({title for title, _ in original_titles}),
+                        ProductionCompanies.country_code.isnot(None))) \
+            .order_by(ProductionCompanies.id)
+        for title, year, country_code in session.execute(stmt):
+            if not country_code:
+                continue
+            for tconst in original_titles.get((title, year), ()):
+                if infos[tconst].country_code is None:
+                    infos[tconst] = infos[tconst]._replace(country_code=country_code)
+    return infos
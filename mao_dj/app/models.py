@@ -1,3 +1,6 @@
+import functools
+import operator
+
 from django.db import models
 import typing
 import re
@@ -6,7 +9,7 @@ import re
 #     @property
 #     def max_len(self):
 #         return max(map(self.choices, null=True), null=True)
-from django.db.models import ManyToOneRel, AutoField, ForeignObjectRel, Field
+from django.db.models import ManyToOneRel, AutoField, ForeignObjectRel, Field, Q
 
 # from dirs import ROOT_DIR
 from mapping import OSCAR_MAPPING
@@ -18,7 +21,10 @@ from wikidata_queries.base import (
     get_single_valued_prop,
     get_genre_with_subgenres,
     get_from_imdb_id,
+    get_from_imdb_ids,
     get_prequel_sequel,
+    get_single_valued_props,
+    VALUES_BATCH_SIZE,
 )
 
 
@@ -37,30 +43,140 @@ class CharacterImportance(models.TextChoices):
 _M = typing.TypeVar('_M', bound=models.Model)
 
 
+@functools.lru_cache(maxsize=None)
+def _get_upsert_fields(model_cls: typing.Type[models.Model]) -> typing.Dict[str, typing.Optional[Field]]:
+    """Returns the names `UpsertMixin.upsert` accepts for `model_cls`, each mapped to its field
+    if rows can be matched on it by value, i.e. it is a concrete column, else None."""
+    fields = {}
+    for rel in model_cls._meta.get_fields():
+        rel: typing.Union[ManyToOneRel, AutoField]
+        if isinstance(rel, Field):
+            field = rel.name
+        else:
+            field = rel.field.name
+        if '.' in field:
+            field = field.split('.')[-1]
+        if field in fields:
+            continue
+        if isinstance(rel, Field) and rel.concrete and not rel.many_to_many:
+            fields[field] = rel
+        else:
+            fields[field] = None
+    return fields
+
+
+def _key_value(field: typing.Optional[Field], value: typing.Any) -> typing.Any:
+    if isinstance(value, models.Model):
+        return value.pk
+    if field is None or field.is_relation:
+        return value
+    return field.to_python(value)
+
+
 class UpsertMixin:
     def __init__(self, *arg, **kwargs):
         super().__init__(*arg, **kwargs)
 
     @classmethod
-    def upsert(cls: typing.Type[_M], **kwargs) -> _M:
+    def _upsert_kwds(cls, kwargs: typing.Dict[str, typing.Any]) -> typing.Dict[str, typing.Any]:
         kwds = {}
-        for rel in cls._meta.get_fields():
-            rel: typing.Union[ManyToOneRel, AutoField]
-            if isinstance(rel, Field):
-                field = rel.name
-            else:
-                field = rel.field.name
-            if '.' in field:
-                field = field.split('.')[-1]
+        for field in _get_upsert_fields(cls):
             v = kwargs.get(field)
             if v is not None:
                 kwds[field] = v
+        return kwds
+
+    @classmethod
+    def upsert(cls: typing.Type[_M], **kwargs) -> _M:
+        kwds = cls._upsert_kwds(kwargs)
         try:
             return cls.objects.get(**kwds)
         except cls.DoesNotExist:
             pass
         return cls.objects.create(**kwds)
 
+    @classmethod
+    def upsert_many(cls: typing.Type[_M],
+                    rows: typing.Iterable[typing.Dict[str, typing.Any]],
+                    *,
+                    ignore_conflicts: bool = False,
+                    identity_map: typing.Dict[tuple, _M] = None,
+                    batch_size: int = 500) -> typing.List[_M]:
+        """Returns the instance of each of `rows` like `upsert`, but with a few queries for all of them.
+
+        The existing rows are looked up with one query per `batch_size` distinct rows and
+        the missing ones are inserted with `bulk_create`. Models with multi-table
+        inheritance cannot be bulk created, so their missing rows are created one by one.
+        Rows with a value for a reverse or many-to-many relation fall back to `upsert`.
+        Unlike `upsert`, a row that matches several existing ones gets the first of them
+        instead of raising `MultipleObjectsReturned`.
+
+        Args:
+            rows: The values of each instance, as the keyword arguments of `upsert`.
+            ignore_conflicts: Passed to `bulk_create`. The inserted rows are looked up again afterwards.
+            identity_map: The instances found so far by their values. It is updated, so
+                passing the same dict to several calls looks up each distinct row only once.
+            batch_size: The number of rows per query.
+
+        Returns:
+            The instances in the order of `rows`. Equal rows get the same instance.
+        """
+        fields = _get_upsert_fields(cls)
+        if identity_map is None:
+            identity_map = {}
+
+        keys = []
+        pending: typing.Dict[tuple, typing.Dict[str, typing.Any]] = {}
+        for row in rows:
+            kwds = cls._upsert_kwds(row)
+            key = tuple(sorted((name, _key_value(fields[name], v)) for name, v in kwds.items()))
+            keys.append(key)
+            if key not in identity_map:
+                pending[key] = kwds
+
+        groups: typing.Dict[typing.Tuple[str, ...], typing.List[tuple]] = {}
+        for key, kwds in pending.items():
+            names = tuple(name for name, _ in key)
+            if not names or any(fields[name] is None for name in names):
+                identity_map[key] = cls.upsert(**kwds)
+            else:
+                groups.setdefault(names, []).append(key)
+
+        for names, group in groups.items():
+            cls._lookup_many(names, [pending[key] for key in group], identity_map, batch_size)
+            missing = [key for key in group if key not in identity_map]
+            if not missing:
+                continue
+            if cls._meta.parents:
+                for key in missing:
+                    identity_map[key] = cls.objects.create(**pending[key])
+                continue
+            objs = [cls(**pending[key]) for key in missing]
+            cls.objects.bulk_create(objs, batch_size=batch_size, ignore_conflicts=ignore_conflicts)
+            if ignore_conflicts or any(obj.pk is None for obj in objs):
+                cls._lookup_many(names, [pending[key] for key in missing], identity_map, batch_size)
+            else:
+                identity_map.update(zip(missing, objs))
+        return [identity_map[key] for key in keys]
+
+    @classmethod
+    def _lookup_many(cls,
+                     names: typing.Tuple[str, ...],
+                     rows: typing.List[typing.Dict[str, typing.Any]],
+                     identity_map: typing.Dict[tuple, typing.Any],
+                     batch_size: int) -> None:
+        """Adds the existing instances that match one of `rows` on the fields `names` to `identity_map`."""
+        fields = _get_upsert_fields(cls)
+        for i in range(0, len(rows), batch_size):
+            batch = rows[i:i + batch_size]
+            if len(names) == 1:
+                query = cls.objects.filter(**{f'{names[0]}__in': [row[names[0]] for row in batch]})
+            else:
+                query = cls.objects.filter(functools.reduce(operator.or_, (Q(**row) for row in batch)))
+            for obj in query.order_by('pk'):
+                key = tuple((name, _key_value(fields[name], getattr(obj, fields[name].attname))) for name in names)
+                identity_map.setdefault(key, obj)
+
 
 class Agent(UpsertMixin, models.Model):
     # temp
@@ -283,15 +399,23 @@ class AwardCategory(models.Model, UpsertMixin):
     def _name(self):
         return f"Academy Awards for {self.label}"
 
+    @staticmethod
+    def label_from_kaggle_oscar_data(category: str) -> str:
+        """Raises KeyError if `category` is not in `OSCAR_MAPPING`."""
+        return OSCAR_MAPPING[category]
+
+    @staticmethod
+    def label_from_kaggle_bafta_data(category: str) -> str:
+        """Returns e.g. 'Leading Actor' for 'Film | Leading Actor in 2020'."""
+        return re.match(r'^(?:Film \| )?(?P<category>.*?)(?: in \d{4})?$', category)['category']
+
     @classmethod
     def get_instance_from_kaggle_oscar_data(cls, category: str) -> 'AwardCategory':
-        return cls.upsert(label=OSCAR_MAPPING[category])
+        return cls.upsert(label=cls.label_from_kaggle_oscar_data(category))
 
     @classmethod
     def get_instance_from_kaggle_bafta_data(cls, category: str) -> 'AwardCategory':
-        matched_str = re.match(r'^Film | (?P<category>.*)in (.*$)', category)
-        return AwardCategory.upsert(label=matched_str['category'])
-        # return cls
+        return cls.upsert(label=cls.label_from_kaggle_bafta_data(category))
 
 
 class Award(models.Model):
@@ -380,6 +504,48 @@ class Film(DjModelOntogenMixin, models.Model):
         except KeyError as e:
             print(e)
 
+    @classmethod
+    def sync_many_from_wikidata(cls, films: typing.Iterable['Film'], *,
+                                batch_size: int = VALUES_BATCH_SIZE) -> typing.List['Film']:
+        """Sets the Wikidata id, release date, country of origin and original language of `films`
+        like `sync_from_wikidata`, with one query per `batch_size` films for each of them.
+
+        The films that already have a Wikidata id are synced too, without looking it up again.
+        Content ratings are left to `update_content_rating_from_wikidata`.
+
+        Returns:
+            The films found on Wikidata.
+        """
+        films = list(films)
+        missing = [film for film in films if not film.hasWikidataId]
+        ids = {}
+        for df in get_from_imdb_ids((film.t_const for film in missing), batch_size=batch_size):
+            ids.update(df['film'].to_dict())
+        for film in missing:
+            film.hasWikidataId = ids.get(film.t_const)
+        synced = [film for film in films if film.hasWikidataId]
+
+        props = {}
+        for df in get_single_valued_props((film.hasWikidataId for film in synced), batch_size=batch_size):
+            props.update(df.to_dict('index'))
+        country_labels = list(dict.fromkeys(p['hasCountryOfOrigin'] for p in props.values() if p['hasCountryOfOrigin']))
+        lang_labels = list(dict.fromkeys(p['hasOriginalLanguage'] for p in props.values() if p['hasOriginalLanguage']))
+        countries = dict(zip(country_labels, Country.upsert_many([{'label': label} for label in country_labels])))
+        langs = dict(zip(lang_labels, Language.upsert_many([{'label': label} for label in lang_labels])))
+        for film in synced:
+            prop = props.get(film.hasWikidataId)
+            if prop is None:
+                continue
+            film.dateReleased = prop['hasPublicationDate'] or film.dateReleased
+            # Only assigned when found, as reading the current ones would query each of them
+            if prop['hasCountryOfOrigin'] in countries:
+                film.hasCountryOfOrigin = countries[prop['hasCountryOfOrigin']]
+            if prop['hasOriginalLanguage'] in langs:
+                film.hasOriginalLanguage = langs[prop['hasOriginalLanguage']]
+        cls.objects.bulk_update(synced, ['hasWikidataId', 'dateReleased', 'hasCountryOfOrigin',
+                                         'hasOriginalLanguage'], batch_size=batch_size)
+        return synced
+
     def update_wikidata_id_from_imdb(self):
         self.hasWikidataId = get_from_imdb_id(self.t_const)
         if not self.hasWikidataId:
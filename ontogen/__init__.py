@@ -1,3 +1,3 @@
-from ontogen.base.ontology import Ontology
+from ontogen.base.ontology import Ontology, open_world
 from ontogen.primitives import (OwlAnnotationProperty, OwlClass, OwlDataProperty,
                                 OwlObjectProperty, OwlIndividual)
@@ -1,8 +1,10 @@
 from abc import ABCMeta, abstractmethod
 from typing import Type
 
+from ontogen.actualizers.schedule import schedule
 from ontogen.primitives.base import OwlEntity
 from ontogen.base.ontology import Ontology
+from ontogen.manifest import ManifestDiff
 from ontogen.primitives.classes import OwlClass
 from ontogen.primitives.properties import OwlProperty
 
@@ -75,7 +77,8 @@ class OntologyActualizer:
         Returns:
 
         """
-        for key, item in onto.entities.items():
+        # Each entity after the ones it depends on, so that it is generated once and complete
+        for item in schedule(onto):
             if isinstance(item, OwlClass):
                 self.class_actualizer.actualize(cls=item, onto=onto)
             elif isinstance(item, OwlProperty):
@@ -84,3 +87,28 @@ class OntologyActualizer:
             indiv.actualize_assertions(indiv._imp)
         self.onto_actualizer.actualize(onto)
         onto.actualize()
+
+    def clear(self, onto: Ontology):
+        """Removes every entity, axiom and rule from the underlying implementation of a given Ontology
+
+        Args:
+            onto: A given Ontology
+
+        Returns:
+            None
+        """
+        raise NotImplementedError
+
+    def actualize_changes(self, onto: Ontology, changes: ManifestDiff):
+        """Actualizes only the Individuals that changed into an underlying implementation that
+        already holds the previous actualization of the Ontology
+
+        Args:
+            onto: A given Ontology
+            changes: The entities added, changed and removed since the previous actualization.
+                Only Individuals may differ.
+
+        Returns:
+            None
+        """
+        raise NotImplementedError
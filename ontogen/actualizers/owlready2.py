@@ -1,4 +1,4 @@
-from typing import Type, Union, List
+from typing import List, Optional, Type, Union
 
 from owlready2 import (AnnotationProperty, DataProperty, ObjectProperty, Thing, AllDisjoint, destroy_entity,
                        Restriction)
@@ -9,8 +9,11 @@ from ontogen.actualizers.types import ACTUALIZED_CLASS
 from ontogen.base import OwlEntity, GENERATED_TYPES
 from ontogen.base.ontology import Ontology
 from ontogen.internal import CHARACTERISTICS_MAPPING
+from ontogen.manifest import ManifestDiff
+from ontogen.primitives.errors import OntologyConsistencyError
 from ontogen.primitives.properties import OwlProperty, OwlAnnotationProperty, OwlDataProperty
-from ontogen.utils.classexp import ClassExpToConstruct
+from ontogen.utils.basics import absolutize_entity_name
+from ontogen.utils.classexp import ClassExpToConstruct, iter_names, parse_class_expression
 
 TYPE_MAPPING = {
     OwlAnnotationProperty: AnnotationProperty,
@@ -41,8 +44,25 @@ class OwlreadyOntologyActualizer(OntologyBaseActualizer):
 
 
 class OwlreadyBaseActualizer(OwlEntityBaseActualizer):
+    @staticmethod
+    def find_actualized_entity(cls: OwlEntity, onto: Ontology) -> Optional[Type[Thing]]:
+        """Returns the entity already actualized from a given entity in a given Ontology, if any
+
+        Args:
+            cls: A given Entity
+            onto: A given Ontology
+
+        Returns:
+            An actualized entity, or None
+        """
+        generated = GENERATED_TYPES.get(cls.name)
+        # The generated types are kept by name, so one of another Ontology with the same name is not reused
+        if generated is None or getattr(generated.namespace, 'ontology', None) is not onto.implementation:
+            return None
+        return generated
+
     def get_actualized_entity(self, cls: OwlEntity, onto: Ontology, **attrs) -> Type[Thing]:
-        """Returns an actualized Class of the given Ontology
+        """Returns an actualized Class of the given Ontology, generating it only once
 
         Args:
             cls:
@@ -52,32 +72,21 @@ class OwlreadyBaseActualizer(OwlEntityBaseActualizer):
         Returns:
             An actualized Class
         """
-        try:
-            cls._sync_description()
-            return cls.actualized_entity
-        except AssertionError:
-            attrs['namespace'] = onto.implementation
-            default = True
-            if len(cls._parent_classes) > 0 or len(cls._realised_parent_classes) > 0:
-                cls._realised_parent_classes.extend(
-                    [self.get_actualized_entity(x, onto) for x in cls._parent_classes
-                     if (x is not None and isinstance(x, OwlEntity))])
-                restrictions = [x for x in cls._parent_classes if isinstance(x, Restriction)]
-                gen = cls._realised_parent_classes
-                if len(gen) > 0:
-                    GENERATED_TYPES[cls.name] = type(cls.name, tuple(gen), attrs)
-                    GENERATED_TYPES[cls.name].is_a.extend(restrictions)
-                    default = False
-            if default:
-                mapped = TYPE_MAPPING[cls.__class__]
-                GENERATED_TYPES[cls.name] = type(cls.name, (mapped,), attrs)
-            if onto.base_prefix != cls.prefix:
-                p = cls.get_iri(onto)
-                cls.actualized_entity.iri = p
-            cls.actualize_assertions(GENERATED_TYPES[cls.name])
-            cls._actualized_entity = GENERATED_TYPES[cls.name]
-            cls._sync_description()
-            return GENERATED_TYPES[cls.name]
+        generated = self.find_actualized_entity(cls, onto)
+        if generated is not None:
+            return generated
+        attrs['namespace'] = onto.implementation
+        if onto.base_prefix != cls.prefix:
+            # Created at its own IRI, which an entity with the same name may already have in the World
+            attrs['namespace'] = onto.implementation.get_namespace(onto.lookup_iri(cls.prefix))
+        cls._realised_parent_classes.extend(
+            [self.get_actualized_entity(x, onto) for x in cls._parent_classes
+             if (x is not None and isinstance(x, OwlEntity))])
+        bases = tuple(cls._realised_parent_classes) or (TYPE_MAPPING[cls.__class__],)
+        generated = GENERATED_TYPES[cls.name] = type(cls.name, bases, attrs)
+        cls.actualize_assertions(generated)
+        cls._actualized_entity = generated
+        return generated
 
 
 class OwlreadyClassActualizer(OwlreadyBaseActualizer):
@@ -87,49 +96,57 @@ class OwlreadyClassActualizer(OwlreadyBaseActualizer):
     def actualize(self, cls: OwlClass, onto: Ontology) -> 'OwlClass':
         """Makes the entity concrete (saved) in a given Ontology
 
+        The entities it depends on are expected to be actualized already, see `schedule`.
+
         Args:
             onto: a given Ontology
         """
         super().actualize(cls, onto)
-        if isinstance(cls, OwlClass):
-            for i in cls.individuals:
-                self.actualize_individual(i, onto)
-        [cls.add_equivalent_class_expression(get_exp_constructor(onto).to_construct(exp))
-         for exp in cls.equivalent_class_expressions]
-        # [cls.add_superclass_expressions(get_exp_constructor(onto).to_construct(exp))
-        #  for exp in cls.superclass_expressions]
-        for idx, x in enumerate(cls._parent_classes):
-            if isinstance(x, str):
-                c = get_exp_constructor(onto).to_construct(x)
-                cls._parent_classes[idx] = c
         generated_cls = self.get_actualized_entity(cls, onto)
-        cls.actualize_assertions(generated_cls)
         if isinstance(cls, OwlClass):
             for i in cls.individuals:
                 self.actualize_individual(i, onto)
-        disjoints: List[Type[Thing]] = [self.get_actualized_entity(x, onto) for x in cls._disjoint_classes] + [cls.actualized_entity]
+        expressions = [x for x in cls._parent_classes if isinstance(x, str)]
+        self.actualize_named_entities(cls.equivalent_class_expressions + expressions, onto)
+        constructor = get_exp_constructor(onto)
+        for exp in cls.equivalent_class_expressions:
+            cls.add_equivalent_class_expression(constructor.to_construct(exp))
+        cls._sync_description()
+        superclass_constructs = [constructor.to_construct(x) for x in expressions]
+        generated_cls.is_a.extend(c for c in superclass_constructs if isinstance(c, Restriction))
+        disjoints: List[Type[Thing]] = [self.get_actualized_entity(x, onto) for x in cls._disjoint_classes] + [generated_cls]
         if len(disjoints) > 0:
             AllDisjoint(disjoints)
         return cls
 
+    def actualize_named_entities(self, expressions: List[str], onto: Ontology):
+        """Generates the Classes and Properties named in given Class Expressions, if they are not yet.
+        They are only missing for a dependency in a cycle, which `schedule` cannot order.
+
+        Args:
+            expressions: Class Expressions in Protege Manchester Syntax
+            onto: A given Ontology
+        """
+        for exp in expressions:
+            for name in iter_names(parse_class_expression(exp)):
+                entity = onto.entities.get(absolutize_entity_name(name, onto.base_prefix))
+                if isinstance(entity, OwlProperty):
+                    self.parent.property_actualizer.get_actualized_entity(entity, onto)
+                elif isinstance(entity, OwlClass):
+                    self.get_actualized_entity(entity, onto)
+
     def actualize_individual(self, cls: OwlIndividual, onto: Ontology):
         res = cls.name_with_prefix.split(":")
         assert len(res) > 1, "Must include a prefix"
         name = res[1]
-        try:
-            if cls._imp:
-                inst = GENERATED_TYPES[name]
-                return
-            else:
-                inst = cls.onto_types[0].actualized_entity()
-            inst.name = name
-            [self.parent.property_actualizer.actualize(y, onto) for y in [onto.get_entity(prop)
-                                                                          for prop in cls.properties_values] if y]
-            GENERATED_TYPES[inst.name] = inst
-           # cls.actualize_assertions(inst)
-            cls._imp = inst
-        except AssertionError:
-            pass
+        if cls._imp or not cls.onto_types[0].is_actualized:
+            return
+        # Named at creation, which reuses the IRI of an entity destroyed by `clear`
+        inst = cls.onto_types[0].actualized_entity(name)
+        [self.parent.property_actualizer.actualize(y, onto) for y in [onto.get_entity(prop)
+                                                                      for prop in cls.properties_values] if y]
+        GENERATED_TYPES[inst.name] = inst
+        cls._imp = inst
 
 
 class OwlreadyPropertyActualizer(OwlreadyBaseActualizer):
@@ -140,8 +157,7 @@ class OwlreadyPropertyActualizer(OwlreadyBaseActualizer):
             if cls.name in ["topObjectProperty", "topDataProperty"]:
                 return
             super().actualize(cls, onto)
-            p = self.get_actualized_entity(cls, onto)
-            cls.actualize_assertions(p)
+            self.get_actualized_entity(cls, onto)
 
     def _get_generated(self, cls: OwlEntity, onto: Ontology, classes: List[OwlEntity]) -> List[ACTUALIZED_CLASS]:
         lst = []
@@ -156,6 +172,9 @@ class OwlreadyPropertyActualizer(OwlreadyBaseActualizer):
         return lst
 
     def get_actualized_entity(self, cls: Union[OwlObjectProperty, OwlProperty], onto: Ontology, **attrs) -> Type[Thing]:
+        generated = self.find_actualized_entity(cls, onto)
+        if generated is not None:
+            return generated
         if isinstance(cls, OwlProperty):
             attrs['domain'] = self._get_generated(cls, onto, cls.domain)
             attrs['range'] = self._get_generated(cls, onto, cls.range)
@@ -179,3 +198,70 @@ class Owlready2Actualizer(OntologyActualizer):
     onto_actualizer_class = OwlreadyOntologyActualizer
     class_actualizer_class = OwlreadyClassActualizer
     property_actualizer_class = OwlreadyPropertyActualizer
+
+    def clear(self, onto: Ontology):
+        imp = onto.implementation
+        for disjoint in list(imp.disjoints()):
+            disjoint.destroy()
+        destroyed = set()
+        for entity in list(imp.rules()) + list(imp.individuals()) + list(imp.properties()) + list(imp.classes()):
+            destroyed.add(entity.name)
+            destroy_entity(entity)
+        # What was generated in another World, e.g. one closed since, is generated again as well
+        for name, generated in list(GENERATED_TYPES.items()):
+            namespace = getattr(generated, 'namespace', None)
+            if name in destroyed or getattr(namespace, 'world', imp.world) is not imp.world:
+                del GENERATED_TYPES[name]
+
+    def actualize_changes(self, onto: Ontology, changes: ManifestDiff):
+        world = onto.implementation.world
+
+        def find(name_with_prefix: str):
+            return world[onto.iris.expand(name_with_prefix, onto.base_prefix)]
+
+        # The classes and properties are already there, only the generated types have to point to them
+        for entity in onto.entities.values():
+            if isinstance(entity, OwlIndividual) or entity.name in ["topObjectProperty", "topDataProperty"]:
+                continue
+            found = find(entity.name_with_prefix)
+            if found is None:
+                raise OntologyConsistencyError(f"{entity.name_with_prefix} has yet to be actualized in the Ontology")
+            GENERATED_TYPES[entity.name] = found
+            entity._actualized_entity = found
+
+        for name in changes.removed:
+            found = find(name)
+            if found is not None:
+                GENERATED_TYPES.pop(found.name, None)
+                destroy_entity(found)
+
+        individuals: List[OwlIndividual] = [onto.entities[name] for name in sorted(changes.added | changes.changed)]
+        for indiv in individuals:
+            if not indiv.onto_types:
+                continue
+            inst = find(indiv.name_with_prefix)
+            owl_type = indiv.onto_types[0].actualized_entity
+            if inst is None:
+                inst = owl_type(indiv.name, namespace=owl_type.namespace)
+            else:
+                # Updated in place, so that the assertions of other entities about it are kept
+                inst.is_a = [owl_type]
+                for prop in list(inst.get_properties()):
+                    prop[inst] = []
+            GENERATED_TYPES[indiv.name] = inst
+            indiv._imp = inst
+
+        # The unchanged Individuals are only looked up when a changed one refers to them
+        for indiv in individuals:
+            for values in indiv.properties_with_values.values():
+                for value in values if isinstance(values, list) else [values]:
+                    if not isinstance(value, str):
+                        continue
+                    other = onto.entities.get(absolutize_entity_name(value, onto.base_prefix))
+                    if isinstance(other, OwlIndividual) and other._imp is None:
+                        other._imp = find(other.name_with_prefix)
+                        if other._imp is not None:
+                            GENERATED_TYPES[other.name] = other._imp
+        for indiv in individuals:
+            if indiv._imp is not None:
+                indiv.actualize_assertions(indiv._imp)
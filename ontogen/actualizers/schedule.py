@@ -0,0 +1,91 @@
+"""Orders the entities of an Ontology so that each one is actualized after the entities it depends on.
+
+An entity depends on its superclasses, on the domain, range and inverse of a property,
+on the classes it is disjoint with, and on the entities named in its class expressions.
+A name of an Individual in an expression stands for the classes of the Individual,
+which actualize it. Dependencies in a cycle, e.g. two properties inverse of each other,
+are left to be actualized on demand by the actualizer of the entity that comes first.
+"""
+from typing import Dict, Iterator, List, Union
+
+from ontogen.base import OwlEntity
+from ontogen.base.ontology import Ontology
+from ontogen.primitives.classes import OwlClass, OwlIndividual
+from ontogen.primitives.properties import OwlProperty
+from ontogen.utils.classexp import iter_names, parse_class_expression
+
+_VISITING, _DONE = 1, 2
+
+
+def _name_lookup(onto: Ontology) -> Dict[str, List[OwlEntity]]:
+    """Returns the entities that actualize each entity of an Ontology, by prefixed and short name"""
+    lookup = {}
+    for name, entity in onto.entities.items():
+        actualized_by = [t for t in entity.onto_types if isinstance(t, OwlEntity)] \
+            if isinstance(entity, OwlIndividual) else [entity]
+        lookup[name] = actualized_by
+        lookup.setdefault(entity.name, actualized_by)
+    return lookup
+
+
+def entity_dependencies(entity: OwlEntity, lookup: Dict[str, List[OwlEntity]]) -> Iterator[OwlEntity]:
+    """Yields the entities a given entity refers to, in the order they are defined by the entity
+
+    Args:
+        entity: A Class or a Property
+        lookup: The entities that actualize each entity, by prefixed and short name
+
+    Returns:
+        An iterator of entities, which may repeat
+    """
+    # The superclasses given as strings are expressions, the other strings are names
+    references: List[Union[OwlEntity, str]] = [x for x in entity._parent_classes if not isinstance(x, str)]
+    expressions = [x for x in entity._parent_classes if isinstance(x, str)]
+    if isinstance(entity, OwlClass):
+        expressions += entity.equivalent_class_expressions
+        references += entity._disjoint_classes
+    if isinstance(entity, OwlProperty):
+        references += list(entity.domain) + list(entity.range) + [entity.inverse_prop] + entity.dependencies
+    for reference in references:
+        if isinstance(reference, OwlEntity):
+            yield reference
+        elif isinstance(reference, str):
+            yield from lookup.get(reference, ())
+    for expression in expressions:
+        for name in iter_names(parse_class_expression(expression)):
+            yield from lookup.get(name, ())
+
+
+def schedule(onto: Ontology) -> List[Union[OwlClass, OwlProperty]]:
+    """Returns the Classes and Properties of a given Ontology, each one after the entities it depends on
+
+    The entities that do not depend on each other keep the order of `Ontology.entities`.
+
+    Args:
+        onto: A given Ontology
+
+    Returns:
+        A list of entities to actualize in this order
+    """
+    entities = [entity for entity in onto.entities.values() if isinstance(entity, (OwlClass, OwlProperty))]
+    scheduled = {id(entity) for entity in entities}
+    lookup = _name_lookup(onto)
+    order = []
+    state: Dict[int, int] = {}
+    for root in entities:
+        if id(root) in state:
+            continue
+        state[id(root)] = _VISITING
+        stack = [(root, entity_dependencies(root, lookup))]
+        while stack:
+            entity, dependencies = stack[-1]
+            for dependency in dependencies:
+                if id(dependency) in scheduled and id(dependency) not in state:
+                    state[id(dependency)] = _VISITING
+                    stack.append((dependency, entity_dependencies(dependency, lookup)))
+                    break
+            else:
+                stack.pop()
+                state[id(entity)] = _DONE
+                order.append(entity)
+    return order
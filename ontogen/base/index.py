@@ -0,0 +1,127 @@
+"""The entities of an Ontology by name, indexed by type and by the classes of the Individuals.
+
+``EntityIndex`` is the mapping of ``Ontology.entities``. Every write goes through it, so the
+Classes, Properties and Individuals are kept in an index of their own as they are added,
+and an Individual is kept under each of its classes. ``Ontology.classes`` and the like are
+read-only views of these indexes instead of a scan of every entity.
+"""
+from types import MappingProxyType
+from typing import Dict, Iterator, Mapping, MutableMapping, Tuple, Type, Union
+
+from ontogen.base import OwlEntity
+from ontogen.primitives.classes import OwlClass, OwlIndividual
+from ontogen.primitives.properties import OwlAnnotationProperty, OwlDataProperty, OwlObjectProperty
+
+INDEXED_TYPES: Tuple[Type[OwlEntity], ...] = (OwlClass, OwlIndividual, OwlObjectProperty, OwlDataProperty,
+                                              OwlAnnotationProperty)
+
+
+def _type_key(cls: Union[OwlClass, str]) -> str:
+    return cls if isinstance(cls, str) else cls.name_with_prefix
+
+
+class EntityIndex(MutableMapping[str, OwlEntity]):
+    """The entities of an Ontology by their prefixed names, with an index per type of entity
+    and an index of the Individuals per class
+
+    The Individuals are indexed by the classes they have when they are added, and by
+    the classes added afterwards with `OwlIndividual.be_type_of`.
+
+    Examples:
+        >>> entities = EntityIndex()
+        >>> film = OwlClass("mao:Film")
+        >>> parasite = OwlIndividual("mao:Parasite")
+        >>> parasite.be_type_of(film)
+        >>> entities["mao:Film"], entities["mao:Parasite"] = film, parasite
+        >>> list(entities.of_type(OwlIndividual))
+        ['mao:Parasite']
+        >>> list(entities.individuals_of(film))
+        ['mao:Parasite']
+    """
+
+    def __init__(self, entities: Mapping[str, OwlEntity] = None):
+        """
+        Args:
+            entities: The entities to add, by their prefixed names
+        """
+        self._entities: Dict[str, OwlEntity] = {}
+        self._by_type: Dict[Type[OwlEntity], Dict[str, OwlEntity]] = {t: {} for t in INDEXED_TYPES}
+        self._views = {t: MappingProxyType(index) for t, index in self._by_type.items()}
+        self._by_class: Dict[str, Dict[str, OwlIndividual]] = {}
+        if entities:
+            self.update(entities)
+
+    def __getitem__(self, name: str) -> OwlEntity:
+        return self._entities[name]
+
+    def __setitem__(self, name: str, entity: OwlEntity):
+        if name in self._entities:
+            if self._entities[name] is entity:
+                return
+            self._unindex(name, self._entities[name])
+        self._entities[name] = entity
+        for t, index in self._by_type.items():
+            if isinstance(entity, t):
+                index[name] = entity
+        if isinstance(entity, OwlIndividual):
+            entity._indexes.append((self, name))
+            for cls in entity.onto_types:
+                self.add_type(name, cls)
+
+    def __delitem__(self, name: str):
+        self._unindex(name, self._entities.pop(name))
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entities)
+
+    def __len__(self) -> int:
+        return len(self._entities)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._entities
+
+    def __repr__(self) -> str:
+        return f"EntityIndex({self._entities!r})"
+
+    def _unindex(self, name: str, entity: OwlEntity):
+        for index in self._by_type.values():
+            index.pop(name, None)
+        if isinstance(entity, OwlIndividual):
+            # By identity, as an EntityIndex equals any mapping with the same items
+            entity._indexes[:] = [(index, n) for index, n in entity._indexes if index is not self or n != name]
+            for cls in entity.onto_types:
+                individuals = self._by_class.get(_type_key(cls), {})
+                individuals.pop(name, None)
+
+    def add_type(self, name: str, cls: Union[OwlClass, str]):
+        """Indexes the Individual with a given name under one more class, see `OwlIndividual.be_type_of`
+
+        Args:
+            name: The prefixed name of an Individual of this index
+            cls: A given Class, or its prefixed name
+        """
+        self._by_class.setdefault(_type_key(cls), {})[name] = self._entities[name]
+
+    def of_type(self, t: Type[OwlEntity]) -> Mapping[str, OwlEntity]:
+        """Returns a read-only view of the entities of a given type, kept up to date
+
+        Args:
+            t: One of `INDEXED_TYPES`
+
+        Returns:
+            The entities by their prefixed names
+        """
+        if t not in self._views:
+            raise TypeError(f"The entities of type {t.__name__} are not indexed")
+        return self._views[t]
+
+    def individuals_of(self, cls: Union[OwlClass, str]) -> Mapping[str, OwlIndividual]:
+        """Returns a read-only view of the Individuals that are of a given Class, kept up to date
+
+        Args:
+            cls: A given Class, or its prefixed name
+
+        Returns:
+            The Individuals by their prefixed names
+        """
+        return MappingProxyType(self._by_class.setdefault(_type_key(cls), {}))
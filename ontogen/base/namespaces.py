@@ -1,4 +1,5 @@
-from typing import Dict
+from types import MappingProxyType
+from typing import Dict, Iterator, Mapping, MutableMapping, Optional
 
 WELL_KNOWN_PREFIXES = {
     'rdf': 'http://www.w3.org/1999/02/22-rdf-syntax-ns#',
@@ -37,17 +38,133 @@ ANNOTATIONS_KEY = 'annotations'
 OWL_DISJOINT_WITH = 'owl:disjointWith'
 
 
-def lookup_iri(prefix: str, lookup: dict = None) -> str:
+class PrefixRegistry(MutableMapping[str, str]):
+    """The IRIs of an Ontology by prefix, along with the prefixes by IRI
+
+    Both maps are kept merged with the well-known prefixes as prefixes are defined, so
+    looking up one is a single dict lookup. The well-known prefixes take precedence.
+
+    Examples:
+        >>> iris = PrefixRegistry({'mao': 'http://example.org/mao#'})
+        >>> iris.lookup_iri('mao'), iris.lookup_iri('owl')
+        ('http://example.org/mao#', 'http://www.w3.org/2002/07/owl#')
+        >>> iris.lookup_prefix('http://example.org/mao#')
+        'mao'
+        >>> iris.expand('Film', 'mao'), iris.expand('rdfs:label', 'mao')
+        ('http://example.org/mao#Film', 'http://www.w3.org/2000/01/rdf-schema#label')
+    """
+
+    def __init__(self, prefixes: Mapping[str, str] = None):
+        """
+        Args:
+            prefixes: The IRIs to define, by prefix
+        """
+        self._iris: Dict[str, str] = {}
+        self._prefixes: Dict[str, str] = {}
+        self._lookup: Dict[str, str] = dict(WELL_KNOWN_PREFIXES)
+        self._inverse: Dict[str, str] = dict(WELL_KNOWN_IRIS)
+        if prefixes:
+            self.update(prefixes)
+
+    def __getitem__(self, prefix: str) -> str:
+        return self._iris[prefix]
+
+    def __setitem__(self, prefix: str, iri: str):
+        previous = self._iris.get(prefix)
+        if previous == iri:
+            return
+        self._iris[prefix] = iri
+        if previous is not None:
+            self._forget_iri(previous)
+        # As with a dict of the inverse, the last prefix of an IRI is the one kept
+        self._prefixes[iri] = prefix
+        if prefix not in WELL_KNOWN_PREFIXES:
+            self._lookup[prefix] = iri
+        if iri not in WELL_KNOWN_IRIS:
+            self._inverse[iri] = prefix
+
+    def __delitem__(self, prefix: str):
+        iri = self._iris.pop(prefix)
+        if prefix not in WELL_KNOWN_PREFIXES:
+            del self._lookup[prefix]
+        self._forget_iri(iri)
+
+    def _forget_iri(self, iri: str):
+        """Points an IRI to the last prefix still defined with it, if any"""
+        prefix = next((p for p in reversed(self._iris) if self._iris[p] == iri), None)
+        if prefix is None:
+            self._prefixes.pop(iri, None)
+            if iri not in WELL_KNOWN_IRIS:
+                self._inverse.pop(iri, None)
+        else:
+            self._prefixes[iri] = prefix
+            if iri not in WELL_KNOWN_IRIS:
+                self._inverse[iri] = prefix
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._iris)
+
+    def __len__(self) -> int:
+        return len(self._iris)
+
+    def __contains__(self, prefix: object) -> bool:
+        return prefix in self._iris
+
+    def __repr__(self) -> str:
+        return f"PrefixRegistry({self._iris!r})"
+
+    @property
+    def iri_to_prefixes(self) -> Mapping[str, str]:
+        """Returns the prefixes defined in this registry by IRI, without the well-known ones"""
+        return MappingProxyType(self._prefixes)
+
+    def lookup_iri(self, prefix: str) -> str:
+        """Returns the IRI of a given prefix, which may be a well-known one
+
+        Raises:
+            KeyError: The prefix is not defined
+        """
+        return self._lookup[prefix.lower()]
+
+    def lookup_prefix(self, iri: str) -> str:
+        """Returns the prefix of a given IRI, which may be a well-known one
+
+        Raises:
+            KeyError: The IRI has no prefix
+        """
+        return self._inverse[iri]
+
+    def expand(self, name: str, fallback_prefix: str) -> str:
+        """Returns the full IRI of an entity name, with the fallback prefix if it has none
+
+        Args:
+            name: A given name, with or without its prefix
+            fallback_prefix: The prefix of a name without one, usually the base prefix
+
+        Returns:
+            An IRI
+        """
+        prefix, separator, local_name = name.partition(":")
+        if not separator:
+            prefix, local_name = fallback_prefix, name
+        return f"{self.lookup_iri(prefix)}{local_name}"
+
+
+def lookup_iri(prefix: str, lookup: Optional[Mapping[str, str]] = None) -> str:
     if lookup is None:
         return WELL_KNOWN_PREFIXES[prefix.lower()]
+    if isinstance(lookup, PrefixRegistry):
+        return lookup.lookup_iri(prefix)
     lookup = dict(lookup)
     lookup.update(WELL_KNOWN_PREFIXES)
     return lookup[prefix.lower()]
 
 
-def lookup_prefix(iri: str, lookup: dict = None) -> str:
+def lookup_prefix(iri: str, lookup: Optional[Mapping[str, str]] = None) -> str:
     if lookup is None:
         return WELL_KNOWN_IRIS[iri.lower()]
+    if isinstance(lookup, PrefixRegistry):
+        return lookup.lookup_prefix(iri)
     lookup = dict(lookup)
     lookup.update(WELL_KNOWN_IRIS)
     return lookup[iri]
@@ -57,7 +174,7 @@ def get_full_iri_from_prefix(prefix, short_name: str, lookup: dict = S_WK_P) ->
     return short_name.replace(f"{prefix}:", lookup_iri(prefix, lookup))
 
 
-def build_prefixes(prefixes: Dict[str, str]) -> str:
-    prefixes.update(WELL_KNOWN_PREFIXES)
+def build_prefixes(prefixes: Mapping[str, str]) -> str:
+    prefixes = dict(prefixes, **WELL_KNOWN_PREFIXES)
     joined_prefixes = "".join([f"PREFIX {prefix}: <{prefixes[prefix]}>\n" for prefix in prefixes])
     return joined_prefixes
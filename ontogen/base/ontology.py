@@ -1,22 +1,44 @@
 import datetime
 import re
+from pathlib import Path
 
 import owlready2
 from rdflib import Graph, Namespace
-from owlready2 import Imp, get_ontology, sync_reasoner_pellet
-from typing import Any, Dict, List, Optional, Union, Type, Set, Tuple
+from owlready2 import Imp, World, default_world, sync_reasoner_pellet
+from typing import Any, Dict, List, Mapping, Optional, Union, Type, Set, Tuple
 
 from . import OwlEntity
-from .namespaces import lookup_iri, lookup_prefix, build_prefixes, WELL_KNOWN_PREFIXES
+from .namespaces import PrefixRegistry, lookup_iri, build_prefixes, WELL_KNOWN_PREFIXES
 from .assertable import OwlAssertable
+from .index import EntityIndex
+from .writers import TRIPLE_WRITERS
 from ontogen.primitives.classes import OwlClass, OwlIndividual
 from ontogen.primitives.properties import OwlObjectProperty
 from ..primitives import OwlDataProperty
 from ..utils.basics import absolutize_entity_name
 
 
-def get_ontology_from_prefix(prefix: str, ld: dict):
-    return get_ontology(lookup_iri(prefix, ld))
+def get_ontology_from_prefix(prefix: str, ld: dict, world: World = None):
+    return (default_world if world is None else world).get_ontology(lookup_iri(prefix, ld))
+
+
+def open_world(filename: Union[str, Path, None] = None, exclusive: bool = True) -> World:
+    """Opens an `owlready2` World, persisted in a SQLite quadstore if a filename is given
+
+    The ontologies of a persisted World do not have to be parsed again by the next
+    process, which only reads the entities it uses from the quadstore.
+
+    Args:
+        filename: The name of the quadstore file, created if missing. An in-memory World if None
+        exclusive: Whether this process is the only one to use the file. Pass False to
+                   share it with other processes, at the cost of slower writes
+
+    Returns:
+        A World to create or load Ontologies in
+    """
+    if filename is None:
+        return World()
+    return World(filename=str(filename), exclusive=exclusive)
 
 
 FREE_DOMAIN = "http://www.semanticweb.org"
@@ -36,38 +58,54 @@ class Ontology(OwlAssertable):
     contributor: str
     comment: str
 
-    def __init__(self, base_iri: str = "", base_prefix: str = ""):
+    def __init__(self, base_iri: str = "", base_prefix: str = "", world: World = None):
+        """
+        Args:
+            base_iri: The IRI of this Ontology
+            base_prefix: The prefix of the IRI of this Ontology
+            world: The `owlready2` World of the implementation, see `open_world`.
+                   Defaults to the in-memory `owlready2.default_world`
+        """
         super(Ontology, self).__init__()
+        self.world: World = default_world if world is None else world
         self._internal_onto: owlready2.Ontology or None = None
         self.base_iri = base_iri
         self.base_prefix = base_prefix
-        self.iris: Dict[str, str] = {}
+        self.iris: PrefixRegistry = PrefixRegistry()
         self.annotations: Dict[str, List[Union["OwlAnnotationProperty", Any]]] = {}
-        self.entities: Dict[str, Union[OwlEntity, OwlIndividual]] = {}
+        self.entities: EntityIndex = EntityIndex()
         self.disjoint_sets: List[Tuple['OwlEntity']] = []
 
-    def _get_with_type(self, t: Type[Union['OwlEntity', 'OwlIndividual']]):
-        return {x: self.entities[x] for x in self.entities if isinstance(self.entities[x], t)}
-
     @property
-    def individuals(self) -> Dict[str, OwlIndividual]:
-        """Returns all the Individuals of this Ontology"""
-        return self._get_with_type(OwlIndividual)
+    def individuals(self) -> Mapping[str, OwlIndividual]:
+        """Returns a read-only view of all the Individuals of this Ontology"""
+        return self.entities.of_type(OwlIndividual)
 
     @property
-    def classes(self) -> Dict[str, OwlClass]:
-        """Returns all the Classes of this Ontology"""
-        return self._get_with_type(OwlClass)
+    def classes(self) -> Mapping[str, OwlClass]:
+        """Returns a read-only view of all the Classes of this Ontology"""
+        return self.entities.of_type(OwlClass)
 
     @property
-    def object_properties(self) -> Dict[str, OwlObjectProperty]:
-        """Returns all the Object Properties of this Ontology"""
-        return self._get_with_type(OwlObjectProperty)
+    def object_properties(self) -> Mapping[str, OwlObjectProperty]:
+        """Returns a read-only view of all the Object Properties of this Ontology"""
+        return self.entities.of_type(OwlObjectProperty)
 
     @property
-    def data_properties(self) -> Dict[str, OwlDataProperty]:
-        """Returns all the Data Properties of this Ontology"""
-        return self._get_with_type(OwlDataProperty)
+    def data_properties(self) -> Mapping[str, OwlDataProperty]:
+        """Returns a read-only view of all the Data Properties of this Ontology"""
+        return self.entities.of_type(OwlDataProperty)
+
+    def individuals_of(self, cls: Union[OwlClass, str]) -> Mapping[str, OwlIndividual]:
+        """Returns a read-only view of the Individuals of this Ontology that are of a given Class
+
+        Args:
+            cls: A given Class, or its prefixed name
+
+        Returns:
+            The Individuals by their prefixed names
+        """
+        return self.entities.individuals_of(cls)
 
     def get_entity(self, relative_name: str) -> Union[OwlEntity, None]:
         name = absolutize_entity_name(relative_name, self.base_prefix)
@@ -79,7 +117,7 @@ class Ontology(OwlAssertable):
             self.base_iri = f"{FREE_DOMAIN}/{developer}/ontologies/{now.year}/{now.month}/{self.base_prefix}#"
 
     def _get_onto_from_prefix(self, prefix: str) -> owlready2.Ontology:
-        return get_ontology_from_prefix(prefix, self.iris)
+        return get_ontology_from_prefix(prefix, self.iris, self.world)
 
     def lookup_iri(self, prefix: str) -> str:
         """Returns a fully qualified IRI from a given prefix
@@ -88,7 +126,7 @@ class Ontology(OwlAssertable):
             prefix: A given prefix
 
         """
-        return lookup_iri(prefix, self.iris)
+        return self.iris.lookup_iri(prefix)
 
     def lookup_prefix(self, iri: str) -> str:
         """Returns a fully qualified prefix from a given IRI
@@ -96,15 +134,16 @@ class Ontology(OwlAssertable):
         Args:
             iri: A given IRI
         """
-        return lookup_prefix(iri, self.iri_to_prefixes)
+        return self.iris.lookup_prefix(iri)
 
     def update_base_prefix(self):
         b = self.lookup_prefix(self.base_iri)
         self.base_prefix = b
 
     @property
-    def iri_to_prefixes(self):
-        return {v: k for k, v in self.iris.items()}
+    def iri_to_prefixes(self) -> Mapping[str, str]:
+        """Returns a read-only view of the prefixes defined in this Ontology by IRI"""
+        return self.iris.iri_to_prefixes
 
     def create(self, namespace_iri: str = ""):
         """Newly creates an Ontology from an existing namespace
@@ -118,7 +157,7 @@ class Ontology(OwlAssertable):
         if not (self.base_iri == "" or namespace_iri == ""):
             raise AssertionError("Namespace must be set before creation")
         self.base_iri = self.base_iri if self.base_iri != "" else namespace_iri
-        self._internal_onto = get_ontology(self.base_iri)
+        self._internal_onto = self.world.get_ontology(self.base_iri)
         if not self.base_prefix:
             self.base_prefix = self.implementation.name
         self.implementation.name = self.base_prefix
@@ -147,18 +186,23 @@ class Ontology(OwlAssertable):
         self.iris[prefix] = iri
 
     @classmethod
-    def load_from_file(cls, filename: str) -> "Ontology":
+    def load_from_file(cls, filename: str, world: World = None) -> "Ontology":
         """Loads an Ontology from an existing file
 
         Args:
             filename: The name of a given file
+            world: The `owlready2` World to load the Ontology into. A persisted World only
+                   parses the file the first time, later loads read its quadstore instead
 
         Returns: An Ontology object
         """
-        inst = cls()
-        inst._internal_onto = get_ontology(f"file://{filename}")
-        internal = inst._internal_onto
-        internal.load()
+        inst = cls(world=world)
+        internal = inst.world.get_ontology(f"file://{filename}").load()
+        # A cached load keeps the file as the IRI of the ontology, instead of the one it declares
+        row = inst.world.graph.execute("SELECT iri FROM ontologies WHERE c=?", (internal.graph.c,)).fetchone()
+        if row is not None and row[0] != internal.base_iri:
+            internal = inst.world.get_ontology(row[0])
+        inst._internal_onto = internal
         for k in ANNOTATION_FUNCTION_MAP:
             if hasattr(internal.metadata, k):
                 [getattr(inst, ANNOTATION_FUNCTION_MAP[k])(prop)
@@ -167,23 +211,45 @@ class Ontology(OwlAssertable):
         inst.define_prefix()
         return inst
 
+    def load_triples_from_file(self, filename: str):
+        """Loads the triples of an existing file into this Ontology, under its own IRI
+
+        Unlike `load_from_file`, no other ontology is added to the World. A persisted World that
+        already holds this Ontology does not parse the file again.
+
+        Args:
+            filename: The name of a given file, e.g. saved by a previous actualization of this Ontology
+        """
+        self.create()
+        if self.implementation.graph.get_last_update_time() == 0.0:
+            with open(filename, "rb") as f:
+                self.implementation.load(fileobj=f)
+
+    def save_world(self):
+        """Commits the changes made to this Ontology into the quadstore of its World, if it is persisted"""
+        self.world.save()
+
     def save_to_file(self, filename: str, file_format: str = "xml"):
         """Saves an Ontology with a given filename
 
+        N-Triples and Turtle are streamed from the quadstore, with the prefixes of this Ontology
+        in Turtle. RDF/XML is serialized by `rdflib`, which builds the whole document in memory.
+
         Args:
             filename: The name of a given file
-            file_format: The file format of given filename. Only `xml` is supported by `owlready2`
+            file_format: The file format of given filename: `xml` (RDF/XML), `nt` or `ntriples` (N-Triples),
+                         `ttl` or `turtle` (Turtle), or any other format `rdflib` can serialize
         """
-
+        prefixes = dict(self.iris, **WELL_KNOWN_PREFIXES)
+        if file_format in TRIPLE_WRITERS:
+            with open(filename, mode="w", encoding="utf-8") as file:
+                TRIPLE_WRITERS[file_format](self.implementation.graph, prefixes).write(file)
+            return
         with self.implementation:
-            g: Graph = self.rdflib_graph
-            self.iris.update(WELL_KNOWN_PREFIXES)
-            if len(self.iris) > 0:
-                for prefix in self.iris:
-                    #self.implementation.graph.add_ontology_alias(prefix, self.iris[prefix])
-                    g.namespace_manager.bind(prefix, Namespace(self.iris[prefix]))
-            with open(filename, mode="wb") as file:
-                file.write(g.serialize(format=file_format))
+            g: Graph = self.rdflib_graph.get_context(self.implementation)
+            for prefix in prefixes:
+                g.namespace_manager.bind(prefix, Namespace(prefixes[prefix]))
+            g.serialize(destination=filename, format=file_format)
 
     def add_rule(self, swrl_rule: str, rule_name: str = None, comment: str = None):
         """Adds a SWRL rule to the Ontology
@@ -248,7 +314,7 @@ class Ontology(OwlAssertable):
             A result
         """
         if sync_reasoner:
-            sync_reasoner_pellet()
+            sync_reasoner_pellet(self.world)
         if with_prefixes:
             #q = self.rdflib_graph.query(query, initNs=self.iris)
             m = re.match(r"PREFIX (.+): <(.+)>", query)
@@ -0,0 +1,130 @@
+"""Writers of the triples of an `owlready2` Ontology, streamed from its quadstore into a file.
+
+Unlike serializing ``Ontology.rdflib_graph``, the triples are read with a cursor of
+the quadstore and written in chunks, so the whole graph is never held in memory.
+"""
+import re
+from functools import lru_cache
+from typing import Dict, List, TextIO, Union
+
+import owlready2
+
+CHUNK_SIZE = 10_000  # Triples formatted before they are written
+TERM_CACHE_SIZE = 65_536  # Formatted IRIs kept, most of them are properties and classes used over and over
+
+_LITERAL_ESCAPES = str.maketrans({'\\': '\\\\', '"': '\\"', '\n': '\\n', '\r': '\\r'})
+_LOCAL_NAME = re.compile(r'[A-Za-z_][A-Za-z0-9_\-]*')
+
+
+class NTriplesWriter:
+    """Writes the triples of an `owlready2` graph as N-Triples"""
+    sort_by_subject = False
+
+    def __init__(self, graph: owlready2.Graph, prefixes: Dict[str, str] = None):
+        """
+        Args:
+            graph: The quadstore of a World, or the graph of one of its Ontologies
+            prefixes: The IRIs by prefix to abbreviate the IRIs with, if the format allows it
+        """
+        self.graph = graph
+        self.prefixes = dict(prefixes or {})
+        self._format_iri = lru_cache(maxsize=TERM_CACHE_SIZE)(self._format_storid)
+
+    def _format_storid(self, storid: int) -> str:
+        return f"<{self.graph._unabbreviate(storid)}>"
+
+    def format_resource(self, storid: int) -> str:
+        """Returns a given IRI or blank node of the quadstore as a term"""
+        if storid < 0:
+            return f"_:b{-storid}"
+        return self._format_iri(storid)
+
+    def format_literal(self, value: Union[str, int, float], datatype: Union[str, int]) -> str:
+        """Returns a given value of the quadstore, with its datatype or language tag, as a term"""
+        lexical = f'"{str(value).translate(_LITERAL_ESCAPES)}"'
+        if isinstance(datatype, str) and datatype.startswith("@"):
+            return f"{lexical}{datatype}"
+        if not datatype:
+            return lexical
+        return f"{lexical}^^{self._format_iri(datatype)}"
+
+    def format_object(self, o: Union[str, int, float], d: Union[str, int, None]) -> str:
+        if d is None:
+            return self.format_resource(o)
+        return self.format_literal(o, d)
+
+    def write_header(self, file: TextIO):
+        pass
+
+    def format_chunk(self, triples: List[tuple]) -> str:
+        return "".join(f"{self.format_resource(s)} {self.format_resource(p)} {self.format_object(o, d)} .\n"
+                       for s, p, o, d in triples)
+
+    def write(self, file: TextIO, chunk_size: int = CHUNK_SIZE) -> int:
+        """Writes all the triples of the graph to a given file
+
+        Args:
+            file: A file opened for writing text
+            chunk_size: The number of triples written at once
+
+        Returns:
+            The number of triples written
+        """
+        self.write_header(file)
+        cursor = self.graph._iter_triples(sort_by_s=self.sort_by_subject)
+        count = 0
+        while True:
+            triples = cursor.fetchmany(chunk_size)
+            if not triples:
+                return count
+            file.write(self.format_chunk(triples))
+            count += len(triples)
+
+
+class TurtleWriter(NTriplesWriter):
+    """Writes the triples of an `owlready2` graph as Turtle, grouped by subject and abbreviated with the prefixes"""
+    sort_by_subject = True
+
+    def __init__(self, graph: owlready2.Graph, prefixes: Dict[str, str] = None):
+        super().__init__(graph, prefixes)
+        # The longest IRI first, for a prefix of which another one is the beginning
+        self._iri_prefixes = sorted(((iri, prefix) for prefix, iri in self.prefixes.items()),
+                                    key=lambda x: len(x[0]), reverse=True)
+        self._subject = None
+
+    def _format_storid(self, storid: int) -> str:
+        iri = self.graph._unabbreviate(storid)
+        for base, prefix in self._iri_prefixes:
+            if iri.startswith(base) and _LOCAL_NAME.fullmatch(iri, len(base)):
+                return f"{prefix}:{iri[len(base):]}"
+        return f"<{iri}>"
+
+    def write_header(self, file: TextIO):
+        file.write("".join(f"@prefix {prefix}: <{iri}> .\n" for prefix, iri in self.prefixes.items()))
+        self._subject = None
+
+    def format_chunk(self, triples: List[tuple]) -> str:
+        lines = []
+        for s, p, o, d in triples:
+            predicate = "a" if p == owlready2.rdf_type else self.format_resource(p)
+            if s == self._subject:
+                lines.append(f" ;\n    {predicate} {self.format_object(o, d)}")
+            else:
+                separator = " .\n\n" if self._subject is not None else "\n"
+                lines.append(f"{separator}{self.format_resource(s)} {predicate} {self.format_object(o, d)}")
+                self._subject = s
+        return "".join(lines)
+
+    def write(self, file: TextIO, chunk_size: int = CHUNK_SIZE) -> int:
+        count = super().write(file, chunk_size)
+        if self._subject is not None:
+            file.write(" .\n")
+        return count
+
+
+TRIPLE_WRITERS = {
+    'nt': NTriplesWriter,
+    'ntriples': NTriplesWriter,
+    'ttl': TurtleWriter,
+    'turtle': TurtleWriter,
+}
@@ -1,17 +1,20 @@
-from typing import Dict, List, Union, Tuple, Set
+from pathlib import Path
+from typing import Dict, Iterable, List, Union, Tuple, Set
 import yaml
 from owlready2 import (AnnotationPropertyClass, ClassValueList, DataPropertyClass,
-                       ObjectPropertyClass, Thing, IndividualValueList)
+                       ObjectPropertyClass, Thing, IndividualValueList, World)
 from semver import VersionInfo
 
 from ontogen.base.ontology import Ontology
 from ontogen.actualizers import OntologyActualizer, Owlready2Actualizer
+from ontogen.manifest import EntityManifest
 from ontogen.base.namespaces import OWL_INDIVIDUAL, RDF_TYPE, OWL_THING, OWL_CLASS, OWL_OBJECT_PROPERTY, OWL_DATA_PROPERTY
 from ontogen.primitives import (BASE_ENTITIES, PROPERTY_ENTITIES, OwlEntity, OwlClass, OwlDataProperty,
                                 OwlObjectProperty)
 from ontogen.primitives.errors import OntologyConsistencyError
 from ontogen.utils.basics import absolutize_entity_name
 from ontogen.primitives.classes import OwlIndividual
+from ontogen.specs import load_individual_shards, load_spec, merge_individuals
 from ontogen.utils.basics import assign_optional_dct
 
 
@@ -22,10 +25,13 @@ class OntogenConverter:
     """
     SUPPORTED_VERSION = "2.1.0"
 
-    def __init__(self):
+    def __init__(self, world: World = None):
         """Loads a file with the given name into a skeleton of an OWL ontology.
+
+        Args:
+            world: The `owlready2` World to actualize the ontology in, see `ontogen.base.ontology.open_world`
         """
-        self._ontology = Ontology()
+        self._ontology = Ontology(world=world)
         self._ontology.generate_base_iri_from_prefix()
         self.file_version = ""
         self.actualizer: OntologyActualizer = Owlready2Actualizer()
@@ -72,16 +78,23 @@ class OntogenConverter:
             raise AssertionError("Unsupported version of file")
 
     @classmethod
-    def load_from_spec(cls, spec_filename: str) -> 'OntogenConverter':
+    def load_from_spec(cls, spec_filename: str, world: World = None, individual_shards: Iterable[str] = (),
+                       cache_dir: str = None, max_workers: int = None) -> 'OntogenConverter':
         """Creates an abstract Ontology from a specs file with the given filename
 
         Args:
             spec_filename: The filename of a specs file in YAML
+            world: The `owlready2` World to actualize the ontology in. Defaults to the in-memory one
+            individual_shards: The filenames of YAML files with more Individuals, loaded in parallel
+            cache_dir: The folder to cache the parsed specs in, see `ontogen.specs.load_spec`
+            max_workers: The number of processes loading the shards
         """
-        self = cls()
-        with open(spec_filename) as f:
-            self._dct = yaml.load(f, Loader=yaml.Loader)
-            root = self._dct
+        self = cls(world)
+        self._dct = load_spec(spec_filename, cache_dir)
+        if individual_shards:
+            self._dct = merge_individuals(self._dct, load_individual_shards(individual_shards, cache_dir,
+                                                                            max_workers))
+        root = self._dct
         self._check_eligible_version(root)
         self._deal_with_iris(root)
         temp_classes = []
@@ -117,7 +130,7 @@ class OntogenConverter:
         return self
 
     def write_yaml(self, owl_filename: str, spec_filename: str):
-        self._ontology = Ontology.load_from_file(owl_filename)
+        self._ontology = Ontology.load_from_file(owl_filename, self._ontology.world)
         onto = self._ontology
         with onto.implementation:
             # print(list(onto.implementation.world.graph.ontologies_iris()))
@@ -132,7 +145,7 @@ class OntogenConverter:
         internals = self._from_internals_to_dict()
         dct = {'version': self.SUPPORTED_VERSION,
                'iri': onto.base_iri,
-               'prefixes': onto.iris,
+               'prefixes': dict(onto.iris),
                'annotations': onto.annotations}
         dct.update(internals)
         with open(spec_filename, "w") as f:
@@ -152,7 +165,6 @@ class OntogenConverter:
                     for key, values in values.items():
                         for val in values:
                             ind.add_property_assertion(absolutize_entity_name(key, self.prefix), val)
-            self.individuals[individual] = ind
             self._ontology.add_entity(ind)
 
     def _load_class_descriptions(self, classes: Tuple[OwlEntity, ...]):
@@ -232,20 +244,57 @@ class OntogenConverter:
         self.actualizer.actualize(onto)
         self._add_rules(self._dct)
 
-    def sync_with_ontology(self, onto: Ontology = None) -> Ontology:
+    def sync_with_ontology(self, onto: Ontology = None, manifest: EntityManifest = None,
+                           existing_file: str = None) -> Ontology:
         """Saves changes made into a given Ontology
 
         Args:
             onto: A given Ontology
+            manifest: The manifest of a previous actualization that the given Ontology already holds,
+                e.g. loaded from an OWL file saved along with the manifest. Only the Individuals
+                added, changed or removed since are actualized, and the manifest is updated to
+                the current entities. Everything is actualized again if an empty manifest is given
+                or if anything but the Individuals changed.
+            existing_file: The OWL file saved along with `manifest`, loaded into the given Ontology
+                first so that it holds the previous actualization. Everything is actualized again
+                if the file does not exist.
 
         Returns:
             A resultant Ontology
         """
         if onto is None:
             onto = self._ontology
-        self.actualize_ontology(onto)
+        if manifest is None:
+            self.actualize_ontology(onto)
+            return onto
+        missing_file = existing_file is not None and not Path(existing_file).exists()
+        if existing_file is not None and not missing_file:
+            onto.load_triples_from_file(str(existing_file))
+        # Taken before the actualization, which changes the entities
+        current = self.build_manifest(onto)
+        changes = manifest.diff(current)
+        if len(manifest) == 0 or missing_file or changes.schema_changed:
+            self.actualizer.clear(onto)
+            self.actualize_ontology(onto)
+        elif changes:
+            self.check_missing_definitions()
+            onto.create()
+            self.actualizer.actualize_changes(onto, changes)
+        manifest.update(current)
         return onto
 
+    def build_manifest(self, onto: Ontology = None) -> EntityManifest:
+        """Returns the manifest of the entities and rules to be actualized into a given Ontology
+
+        Args:
+            onto: A given Ontology. Defaults to the internal Ontology of this Converter
+
+        Returns:
+            An EntityManifest
+        """
+        return EntityManifest.from_ontology(self._ontology if onto is None else onto,
+                                            rules=self._dct.get("rules", {}))
+
     @property
     def individuals(self):
         return self._ontology.individuals
@@ -292,11 +341,11 @@ class OntogenConverter:
                 i.be_type_of(self.get_entity(e2))
             self.entities[e] = i
         dct = {}
-        assign_optional_dct(dct, OWL_CLASS, {abs_name: self.ontology.classes[abs_name].to_dict() for abs_name in self.ontology.classes})
-        assign_optional_dct(dct, OWL_OBJECT_PROPERTY, {abs_name: self.ontology.object_properties[abs_name].to_dict()
-                                                       for abs_name in self.ontology.object_properties})
-        assign_optional_dct(dct, OWL_DATA_PROPERTY, {abs_name: self.ontology.data_properties[abs_name].to_dict()
-                                                     for abs_name in self.ontology.data_properties})
-        assign_optional_dct(dct, OWL_INDIVIDUAL, {abs_name: self.ontology.individuals[abs_name].to_dict()
-                                                  for abs_name in self.individuals})
+        assign_optional_dct(dct, OWL_CLASS, {abs_name: cls.to_dict() for abs_name, cls in onto.classes.items()})
+        assign_optional_dct(dct, OWL_OBJECT_PROPERTY, {abs_name: prop.to_dict()
+                                                       for abs_name, prop in onto.object_properties.items()})
+        assign_optional_dct(dct, OWL_DATA_PROPERTY, {abs_name: prop.to_dict()
+                                                     for abs_name, prop in onto.data_properties.items()})
+        assign_optional_dct(dct, OWL_INDIVIDUAL, {abs_name: individual.to_dict()
+                                                  for abs_name, individual in onto.individuals.items()})
         return dct
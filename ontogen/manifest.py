@@ -0,0 +1,185 @@
+"""Fingerprints of the entities of an Ontology, to actualize only what changed since the last run.
+
+An ``EntityManifest`` keeps a content hash of every entity of an ``Ontology`` by its
+prefixed name. Diffing the manifest of the previous actualization with the one of
+the current entities tells which entities were added, changed or removed, see
+``OntogenConverter.sync_with_ontology``.
+"""
+import datetime
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Set, Tuple, Union
+
+from owlready2 import locstr
+
+from ontogen.base.ontology import Ontology
+from ontogen.primitives import OwlEntity, OwlIndividual, OwlObjectProperty
+from ontogen.primitives.properties import OwlProperty
+
+ONTOLOGY_KEY = 'owl:Ontology'
+INDIVIDUAL_KIND = OwlIndividual.__name__
+
+
+def _canonical(value: Any) -> Any:
+    if isinstance(value, OwlEntity):
+        return value.name_with_prefix
+    if isinstance(value, locstr):
+        return [str(value), value.lang]
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    if isinstance(value, type):
+        return f'{value.__module__}.{value.__qualname__}'
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (set, frozenset)):
+        return sorted(map(_canonical, value), key=repr)
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    return repr(value)
+
+
+def fingerprint(state: Any) -> str:
+    """Returns a hash of `state`, which is equal for equal states across runs.
+
+    Examples:
+        >>> fingerprint({'b': [1, 'x'], 'a': None}) == fingerprint({'a': None, 'b': [1, 'x']})
+        True
+        >>> fingerprint({'a': 1}) == fingerprint({'a': '1'})
+        False
+    """
+    dumped = json.dumps(_canonical(state), sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(dumped.encode('utf-8')).hexdigest()
+
+
+def entity_fingerprint(entity: OwlEntity) -> str:
+    """Returns a hash of the definition of `entity` as loaded from the specs or added afterwards.
+
+    It must be taken before the entity is actualized, which changes some of its attributes.
+    """
+    state = {'kind': type(entity).__name__,
+             'name': entity.name_with_prefix,
+             'properties': entity.properties_values,
+             'annotations': entity.annotations}
+    if isinstance(entity, OwlIndividual):
+        state['types'] = entity.onto_types
+    else:
+        state.update(spec=entity._internal_dict,
+                     parents=entity.parent_class_names,
+                     disjoint=entity.disjoint_class_names,
+                     equivalent=entity.equivalent_class_expressions)
+        if isinstance(entity, OwlProperty):
+            state.update(domain=entity.domain, range=entity.range, inverse=entity.inverse_prop)
+        if isinstance(entity, OwlObjectProperty):
+            state['characteristics'] = entity._characteristics
+    return fingerprint(state)
+
+
+class ManifestDiff(NamedTuple):
+    """The entities that differ between two manifests, by their prefixed names."""
+    added: Set[str]
+    changed: Set[str]
+    removed: Set[str]
+    schema_changed: bool  # Whether anything but individuals differs
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.changed or self.removed or self.schema_changed)
+
+
+class EntityManifest:
+    """The fingerprint and kind of every entity of an Ontology, by prefixed name.
+
+    The Ontology itself, with its annotations and anything else given to
+    `from_ontology`, is kept as `ONTOLOGY_KEY`.
+    """
+    VERSION = 1
+
+    def __init__(self, entries: Dict[str, Tuple[str, str]] = None, base_iri: str = ''):
+        """
+        Args:
+            entries: The kind (the name of the class of the entity) and fingerprint of each entity
+            base_iri: The base IRI of the Ontology
+        """
+        self.entries: Dict[str, Tuple[str, str]] = dict(entries or {})
+        self.base_iri = base_iri
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.entries
+
+    @classmethod
+    def from_ontology(cls, onto: Ontology, **extra: Any) -> 'EntityManifest':
+        """Returns the manifest of the current entities of a given Ontology
+
+        Args:
+            onto: A given Ontology, before it is actualized
+            **extra: Anything else that is written along with the Ontology, e.g. its rules
+
+        Returns:
+            An EntityManifest
+        """
+        entries = {name: (type(entity).__name__, entity_fingerprint(entity))
+                   for name, entity in onto.entities.items()}
+        entries[ONTOLOGY_KEY] = (Ontology.__name__, fingerprint({'iris': dict(onto.iris),
+                                                                 'annotations': onto.properties_with_values,
+                                                                 **extra}))
+        return cls(entries, onto.base_iri)
+
+    def diff(self, newer: 'EntityManifest') -> ManifestDiff:
+        """Returns the entities added, changed and removed in a newer manifest
+
+        Args:
+            newer: The manifest of the current entities
+
+        Returns:
+            A ManifestDiff
+        """
+        added = newer.entries.keys() - self.entries.keys()
+        removed = self.entries.keys() - newer.entries.keys()
+        changed = {name for name in self.entries.keys() & newer.entries.keys()
+                   if self.entries[name] != newer.entries[name]}
+        kinds = {self.entries[name][0] for name in removed | changed}
+        kinds.update(newer.entries[name][0] for name in added | changed)
+        schema_changed = self.base_iri != newer.base_iri or bool(kinds - {INDIVIDUAL_KIND})
+        return ManifestDiff(added, changed, removed, schema_changed)
+
+    def update(self, newer: 'EntityManifest'):
+        """Replaces the entries of this manifest with the ones of a newer manifest"""
+        self.entries = dict(newer.entries)
+        self.base_iri = newer.base_iri
+
+    @classmethod
+    def load(cls, filename: Union[str, Path]) -> 'EntityManifest':
+        """Loads a manifest saved by `save`. A missing file gives an empty manifest.
+
+        Args:
+            filename: The name of a given file
+
+        Returns:
+            An EntityManifest
+        """
+        try:
+            with open(filename, encoding='utf-8') as f:
+                dct = json.load(f)
+        except FileNotFoundError:
+            return cls()
+        if dct.get('version') != cls.VERSION:
+            return cls()
+        return cls({name: tuple(entry) for name, entry in dct['entities'].items()}, dct['iri'])
+
+    def save(self, filename: Union[str, Path]):
+        """Saves this manifest as JSON with a given filename
+
+        Args:
+            filename: The name of a given file
+        """
+        path = Path(filename)
+        temp = path.with_name(f'{path.name}.tmp')
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.VERSION, 'iri': self.base_iri, 'entities': self.entries}, f)
+        os.replace(temp, path)
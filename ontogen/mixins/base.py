@@ -6,7 +6,9 @@ from django.db.models import Field, AutoField, ManyToOneRel
 from django.db.models.fields.reverse_related import ManyToManyRel
 
 from ontogen.utils.basics import absolutize_entity_name
-import start_dj
+from start_dj import start_django_lite
+
+start_django_lite()
 
 from django.db import models
 
@@ -1,4 +1,4 @@
-from typing import List, Dict, Union
+from typing import List, Dict, Tuple, Union
 import datetime
 
 from ontogen.base.assertable import OwlAssertable
@@ -59,6 +59,8 @@ class OwlIndividual(OwlEntity, OwlAssertable):
         self.defined_properties: Dict[str, "OwlProperty" or None] = dict(ENTITIES)
         self._imp = None
         self.properties_values: Dict[str, ] = {}
+        # The `EntityIndex` instances this Individual is in, with its name in each of them
+        self._indexes: List[Tuple["EntityIndex", str]] = []
 
     def be_type_of(self, cls: OwlClass):
         """
@@ -69,6 +71,8 @@ class OwlIndividual(OwlEntity, OwlAssertable):
         """
         cls.individuals.append(self)
         self.onto_types.append(cls)
+        for index, name in self._indexes:
+            index.add_type(name, cls)
 
     def _prepare_assertion_value(self, prop_name: str, value: Union[List, str]) -> Union[List[object], object]:
         val = value
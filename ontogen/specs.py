@@ -0,0 +1,156 @@
+"""Loading of YAML specs, with the libyaml C loader, a binary cache and individuals in shards.
+
+``load_spec`` parses a spec with ``yaml.CLoader`` when PyYAML is built with libyaml and
+with the pure-Python ``yaml.Loader`` otherwise. Given a cache folder, the parsed spec is
+pickled there, so a spec that has not changed since is loaded without any YAML parsing.
+A cached spec is used when the size and modification time of the file are the ones it was
+cached with, or else when the SHA-1 of its content is.
+
+The Individuals can be split across shard files, which have the same ``owl:Individual``
+section as a spec. ``load_individual_shards`` parses them in parallel processes.
+"""
+import hashlib
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Union
+
+import yaml
+
+from ontogen.base.namespaces import OWL_INDIVIDUAL
+from ontogen.primitives.errors import OntologyConsistencyError
+
+__all__ = ['YAML_LOADER', 'SpecCacheEntry', 'file_digest', 'load_spec', 'load_individual_shards',
+           'merge_individuals']
+
+YAML_LOADER = getattr(yaml, 'CLoader', yaml.Loader)
+CACHE_VERSION = 1
+DIGEST_CHUNK_SIZE = 1 << 20
+
+
+class SpecCacheEntry(NamedTuple):
+    """A parsed spec, along with what tells whether its file has changed since."""
+    version: int
+    size: int
+    mtime_ns: int
+    sha1: str
+    data: Any
+
+
+def file_digest(filename: Union[str, Path]) -> str:
+    """Returns the SHA-1 of the content of a file with a given name"""
+    sha1 = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(DIGEST_CHUNK_SIZE), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def _cache_filename(filename: Path, cache_dir: Path) -> Path:
+    key = hashlib.sha1(str(filename.resolve()).encode('utf-8')).hexdigest()
+    return cache_dir / f'{filename.stem}-{key[:16]}.pickle'
+
+
+def _read_cache(cache_filename: Path) -> Optional[SpecCacheEntry]:
+    try:
+        with open(cache_filename, 'rb') as f:
+            entry = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, TypeError):
+        return None
+    if not isinstance(entry, SpecCacheEntry) or entry.version != CACHE_VERSION:
+        return None
+    return entry
+
+
+def _write_cache(cache_filename: Path, entry: SpecCacheEntry):
+    cache_filename.parent.mkdir(parents=True, exist_ok=True)
+    # Written aside first, so that another process never reads half of it
+    temp = cache_filename.with_name(f'{cache_filename.name}.{os.getpid()}.tmp')
+    with open(temp, 'wb') as f:
+        pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp, cache_filename)
+
+
+def load_spec(filename: Union[str, Path], cache_dir: Union[str, Path] = None) -> Any:
+    """Loads a YAML spec with a given filename, from the cache if the file has not changed
+
+    Args:
+        filename: The name of a YAML file
+        cache_dir: The folder of the parsed specs, or None to always parse the file.
+            The cache is pickled, so it must only be written by a trusted user.
+
+    Returns:
+        The parsed spec, usually a dict
+    """
+    filename = Path(filename)
+    if cache_dir is None:
+        with open(filename, encoding='utf-8') as f:
+            return yaml.load(f, Loader=YAML_LOADER)
+
+    stat = filename.stat()
+    cache_filename = _cache_filename(filename, Path(cache_dir))
+    entry = _read_cache(cache_filename)
+    if entry is not None and (entry.size, entry.mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+        return entry.data
+    # Touched or copied files keep their cache, as long as the content is the same
+    sha1 = file_digest(filename)
+    if entry is not None and entry.sha1 == sha1:
+        data = entry.data
+    else:
+        with open(filename, encoding='utf-8') as f:
+            data = yaml.load(f, Loader=YAML_LOADER)
+    _write_cache(cache_filename, SpecCacheEntry(CACHE_VERSION, stat.st_size, stat.st_mtime_ns, sha1, data))
+    return data
+
+
+def _load_shard_individuals(filename: Union[str, Path], cache_dir: Union[str, Path] = None) -> Dict[str, dict]:
+    shard = load_spec(filename, cache_dir)
+    return (shard or {}).get(OWL_INDIVIDUAL) or {}
+
+
+def load_individual_shards(filenames: Iterable[Union[str, Path]], cache_dir: Union[str, Path] = None,
+                           max_workers: int = None) -> List[Dict[str, dict]]:
+    """Loads the Individuals of shard files at the same time, in separate processes
+
+    Args:
+        filenames: The names of YAML files with an ``owl:Individual`` section, as in a spec
+        cache_dir: The folder of the parsed specs, see `load_spec`
+        max_workers: The number of processes. Defaults to the number of CPUs. With 1, the shards
+            are loaded one after another in this process.
+
+    Returns:
+        The Individuals of each shard, in the order of the filenames
+    """
+    filenames = list(filenames)
+    if max_workers == 1 or len(filenames) <= 1:
+        return [_load_shard_individuals(filename, cache_dir) for filename in filenames]
+    with ProcessPoolExecutor(max_workers=min(max_workers or os.cpu_count() or 1, len(filenames))) as executor:
+        futures = [executor.submit(_load_shard_individuals, filename, cache_dir) for filename in filenames]
+        return [future.result() for future in futures]
+
+
+def merge_individuals(spec: dict, shards: Iterable[Dict[str, dict]]) -> dict:
+    """Returns a given spec with the Individuals of shards added to its own
+
+    Args:
+        spec: A parsed spec, which is left as is
+        shards: The Individuals of each shard, see `load_individual_shards`
+
+    Returns:
+        A parsed spec
+
+    Raises:
+        OntologyConsistencyError: An Individual is defined more than once
+
+    Examples:
+        >>> merge_individuals({'owl:Individual': {'mao:A': {}}}, [{'mao:B': {}}, {'mao:C': {}}])
+        {'owl:Individual': {'mao:A': {}, 'mao:B': {}, 'mao:C': {}}}
+    """
+    individuals = dict(spec.get(OWL_INDIVIDUAL) or {})
+    for shard in shards:
+        duplicates = individuals.keys() & shard.keys()
+        if duplicates:
+            raise OntologyConsistencyError(f"Individuals defined more than once: {', '.join(sorted(duplicates))}")
+        individuals.update(shard)
+    return dict(spec, **{OWL_INDIVIDUAL: individuals})
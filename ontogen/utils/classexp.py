@@ -1,5 +1,23 @@
-from re import Match, match, search
-from typing import Dict, Tuple, Type, Union
+"""Converts Class Expressions in the Manchester syntax of `Protege` to Class Constructs of `owlready2`.
+
+An expression is first tokenized and parsed into an abstract syntax tree, which only
+depends on its text and is cached. The tree is then lowered to `owlready2` constructs
+with the entities of a given Ontology. The grammar, from the loosest operator, is::
+
+    expression  := conjunction ('or' conjunction)*
+    conjunction := primary ('and' primary)*
+    primary     := 'not' primary | restriction | atomic
+    restriction := atomic ('some' | 'only') primary
+                 | atomic 'value' atomic
+                 | atomic ('min' | 'max' | 'exactly') INTEGER [primary]
+    atomic      := '(' expression ')' | '{' NAME (',' NAME)* '}' | NAME | NUMBER | STRING
+
+where a NAME may have a prefix, like ``mao:Film``, and facets, like ``integer[>=40]``.
+"""
+import operator
+import re
+from functools import lru_cache, reduce
+from typing import Iterator, List, NamedTuple, Optional, Tuple, Type, Union
 
 from owlready2 import ClassConstruct, ConstrainedDatatype, Not, ObjectProperty, OneOf, Thing
 
@@ -7,7 +25,7 @@ from ontogen import Ontology
 from ontogen.base.vars import GENERATED_TYPES
 from ontogen.internal import CONSTRAINT_DATATYPE_OPERATOR_MAP
 
-__all__ = ('ClassExpToConstruct',)
+__all__ = ('ClassExpToConstruct', 'iter_names', 'parse_class_expression')
 
 QUANTIFIER_RESTRICTION_KEYWORDS = ("some", "only")
 PROPERTY_RESTRICTION_KEYWORDS = QUANTIFIER_RESTRICTION_KEYWORDS + ("value",)
@@ -17,20 +35,17 @@ CARDINALITY_RESTRICTION_KEYWORDS = ("min", "max", "exactly")
 TRIPLE_KEYWORDS = (PROPERTY_RESTRICTION_KEYWORDS +
                    TRIPLE_LOGICAL_OPERATION_KEYWORDS +
                    CARDINALITY_RESTRICTION_KEYWORDS)
+RESTRICTION_KEYWORDS = PROPERTY_RESTRICTION_KEYWORDS + CARDINALITY_RESTRICTION_KEYWORDS
+KEYWORDS = frozenset(TRIPLE_KEYWORDS + ("not",))
 
-# (op, nested)
-NOT_PATTERN = (r'(not)(?:\(([:a-zA-Z0-9<># ]*)\)| '
-               r'((?:[a-z]+:)?[<a-zA-Z0-9>#]+[A-Za-z]*))', (3, 2))
-TRIPLE_PATTERN = (r'(?:((?:[a-z]+:)?[<a-zA-Z0-9>#]+[A-Za-z]*)|'
-                  r'(\((?:[a-z]+:)?[<a-zA-Z0-9>#]+[A-Za-z]*\))) '
-                  rf'({"|".join(TRIPLE_KEYWORDS)}) (?:([0-9]+) )?'
-                  r'(?:((?:[a-z]+:)?[<a-zA-Z0-9>#]+[A-Za-z0-9]*(?:\[.+\])?)|'
-                  # r'(?:((?:[a-z]+:)?[<a-zA-Z0-9>#]+[A-Za-z0-9\[\]\'<>=]*)|'
-                  r'(\((?:[a-z]+:)?[<a-zA-Z0-9>#]+[A-Za-z]*\)))', (2, 1, 6, 5, 4), 3)
+TOKEN_PATTERN = re.compile(r"""\s*(?:
+    (?P<punctuation>[(){},])
+  | (?P<string>"(?:[^"\\]|\\.)*")
+  | (?P<number>[0-9]+(?:\.[0-9]+)?)(?![\w\-:\[])
+  | (?P<name>(?:[A-Za-z_][\w\-]*:)?[\w\-]+(?:\[[^\]]*\])?)
+)""", re.VERBOSE)
 
-PATTERNS = (NOT_PATTERN, TRIPLE_PATTERN)
-
-RESERVED = {"True": True, "False": False, "integer": int}
+RESERVED = {"True": True, "False": False, "integer": int, "Thing": Thing}
 
 XSD_LITERAL_DATATYPE_MAP = {
     'integer': int,
@@ -63,7 +78,7 @@ def check_constraint_data_types(expression: str) -> ConstrainedDatatype or str:
     """
     constraint_pattern = r'([A-z]+)(?:\[(.+)\])$'
     facet_pattern = r'(?:([A-z]+|[<>=]{0,2})) ?(.+)'
-    m = match(constraint_pattern, expression)
+    m = re.match(constraint_pattern, expression)
     if m is None:
         return expression
     literal = get_imp_literal_type(m.group(1))
@@ -71,7 +86,7 @@ def check_constraint_data_types(expression: str) -> ConstrainedDatatype or str:
     raw_facets = m.group(2)
     facets = raw_facets.split(",")
     for facet in facets:
-        m = match(facet_pattern, facet.strip())
+        m = re.match(facet_pattern, facet.strip())
         if m is None:
             continue
         operator, val = m.group(1), m.group(2)
@@ -105,72 +120,217 @@ def get_individual_from_literal(onto: Ontology, name: str,
     # individual.name = name
 
 
-class TokenInfo:
-    """Contains the information of a Token"""
-    def __init__(self, onto: Ontology):
-        self.keyword = None
-        self.sub_tokens: Tuple[Union[TokenInfo,str], ...] = tuple()
-        self.is_class = False
-        self.onto = onto
-        self.start_index = 0
-        self.end_index = 0
-        self.is_individual = False
-
-    @property
-    def count(self):
-        return self.end_index - self.start_index
-
-    def get_repr(self):
-        return f"<TK#{id(self)}>"
-
-    @property
-    def construct(self) -> Union[ClassConstruct, type, bool, int]:
-        try:
-            if self.is_class:
-                self.keyword = None
-                new_str = self.sub_tokens[0]
-                if '[' in new_str:
-                    return check_constraint_data_types(new_str)
-                if new_str.isdigit():
-                    return int(new_str)
-                if new_str in GENERATED_TYPES:
-                    return GENERATED_TYPES[new_str]
-                if new_str in RESERVED:
-                    return RESERVED[new_str]
-                if ":" in self.sub_tokens[0]:
-                    new_str = self.sub_tokens[0].split(":")[1]
-                base_cls = Thing
-                if self.keyword in QUANTIFIER_RESTRICTION_KEYWORDS:
-                    base_cls = ObjectProperty
-                if self.is_individual:
-                    raise AssertionError(f'The individual "{new_str}" is missing.')
-                return get_class_from_literal(self.onto, new_str, base_cls)
-            elif self.keyword in CARDINALITY_RESTRICTION_KEYWORDS:
-                first, second, third = self.sub_tokens
-                return getattr(first.construct, self.keyword)(third.construct, second.construct)
-            elif self.keyword in TRIPLE_KEYWORDS:
-                first, second = self.sub_tokens
-                if self.keyword in QUANTIFIER_RESTRICTION_KEYWORDS + ("value", ):
-                    if self.keyword == "value":
-                        second.is_individual = True
-                    return getattr(first.construct, self.keyword)(second.construct)
-                elif self.keyword == "and":
-                    return first.construct & second.construct
-                elif self.keyword == "or":
-                    return first.construct | second.construct
-            elif self.keyword == "not":
-                return Not(self.sub_tokens[0].construct)
-        except AttributeError as e:
-            raise SyntaxError("Unable to construct from Class Expression syntax!" + str(e))
+class Token(NamedTuple):
+    kind: str  # `punctuation`, `string`, `number`, `name` or `keyword`
+    text: str
+    position: int
+
+
+def tokenize(expression: str) -> Iterator[Token]:
+    """Splits a given Class Expression into Tokens
+
+    Examples:
+        >>> [token.text for token in tokenize("hasTopping some (mao:Cheese or integer[>= 18])")]
+        ['hasTopping', 'some', '(', 'mao:Cheese', 'or', 'integer[>= 18]', ')']
+    """
+    position, end = 0, len(expression.rstrip())
+    while position < end:
+        m = TOKEN_PATTERN.match(expression, position)
+        if m is None:
+            raise SyntaxError(f"Unexpected character {expression[position:].lstrip()[0]!r} "
+                              f"in Class Expression: {expression}")
+        kind = m.lastgroup
+        text, start = m.group(kind), m.start(kind)
+        if kind == 'name' and text in KEYWORDS:
+            kind = 'keyword'
+        yield Token(kind, text, start)
+        position = m.end()
+
 
-    def __repr__(self):
-        if self.keyword == "not":
-            return f"^{self.keyword}({self.sub_tokens[0]})"
-        elif self.is_class:
-            return self.sub_tokens[0]
-        else:
-            return f"^({self.sub_tokens[0]}) {self.keyword} " \
-                   f"({self.sub_tokens[1] if len(self.sub_tokens) > 1 else ''})"
+class NameNode(NamedTuple):
+    """A Class, Property, Individual or Datatype, resolved by its name when lowered"""
+    name: str
+
+
+class LiteralNode(NamedTuple):
+    value: Union[str, int, float]
+
+
+class NotNode(NamedTuple):
+    operand: 'Node'
+
+
+class AndNode(NamedTuple):
+    operands: Tuple['Node', ...]
+
+
+class OrNode(NamedTuple):
+    operands: Tuple['Node', ...]
+
+
+class OneOfNode(NamedTuple):
+    names: Tuple[str, ...]
+
+
+class RestrictionNode(NamedTuple):
+    prop: NameNode
+    keyword: str  # One of `PROPERTY_RESTRICTION_KEYWORDS` or `CARDINALITY_RESTRICTION_KEYWORDS`
+    filler: Optional['Node']
+    cardinality: Optional[int] = None
+
+
+Node = Union[NameNode, LiteralNode, NotNode, AndNode, OrNode, OneOfNode, RestrictionNode]
+
+
+class _Parser:
+    """A recursive descent parser of the grammar of this module"""
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        self.tokens: List[Token] = list(tokenize(expression))
+        self.index = 0
+
+    def error(self, message: str) -> SyntaxError:
+        return SyntaxError(f"{message} in Class Expression: {self.expression}")
+
+    def describe_next(self) -> str:
+        token = self.peek()
+        return repr(token.text) if token is not None else "the end"
+
+    def peek(self) -> Optional[Token]:
+        return self.tokens[self.index] if self.index < len(self.tokens) else None
+
+    def accept(self, text: str) -> bool:
+        token = self.peek()
+        if token is not None and token.kind in ('keyword', 'punctuation') and token.text == text:
+            self.index += 1
+            return True
+        return False
+
+    def expect(self, text: str):
+        if not self.accept(text):
+            raise self.error(f"Expected {text!r} but found {self.describe_next()}")
+
+    def parse(self) -> Node:
+        node = self.expression_()
+        if self.peek() is not None:
+            raise self.error(f"Unexpected {self.describe_next()}")
+        return node
+
+    def expression_(self) -> Node:
+        operands = [self.conjunction()]
+        while self.accept("or"):
+            operands.append(self.conjunction())
+        return operands[0] if len(operands) == 1 else OrNode(tuple(operands))
+
+    def conjunction(self) -> Node:
+        operands = [self.primary()]
+        while self.accept("and"):
+            operands.append(self.primary())
+        return operands[0] if len(operands) == 1 else AndNode(tuple(operands))
+
+    def primary(self) -> Node:
+        if self.accept("not"):
+            return NotNode(self.primary())
+        node = self.atomic()
+        token = self.peek()
+        if token is None or token.kind != 'keyword' or token.text not in RESTRICTION_KEYWORDS:
+            return node
+        if not isinstance(node, NameNode):
+            raise self.error(f"Expected a property before {token.text!r}")
+        self.index += 1
+        if token.text in QUANTIFIER_RESTRICTION_KEYWORDS:
+            return RestrictionNode(node, token.text, self.primary())
+        if token.text == "value":
+            return RestrictionNode(node, token.text, self.atomic())
+        cardinality = self.peek()
+        if cardinality is None or cardinality.kind != 'number' or not cardinality.text.isdigit():
+            raise self.error(f"Expected a cardinality after {token.text!r}")
+        self.index += 1
+        filler = None
+        following = self.peek()
+        if following is not None and (following.kind in ('name', 'string', 'number')
+                                      or following.text in ("(", "{", "not")):
+            filler = self.primary()
+        return RestrictionNode(node, token.text, filler, int(cardinality.text))
+
+    def atomic(self) -> Node:
+        token = self.peek()
+        if token is None:
+            raise self.error("Unexpected end")
+        if self.accept("("):
+            node = self.expression_()
+            self.expect(")")
+            return node
+        if self.accept("{"):
+            names = [self.name()]
+            while self.accept(","):
+                names.append(self.name())
+            self.expect("}")
+            return OneOfNode(tuple(names))
+        self.index += 1
+        if token.kind == 'name':
+            return NameNode(token.text)
+        if token.kind == 'number':
+            return LiteralNode(float(token.text) if "." in token.text else int(token.text))
+        if token.kind == 'string':
+            return LiteralNode(re.sub(r'\\(.)', r'\1', token.text[1:-1]))
+        raise self.error(f"Unexpected {token.text!r}")
+
+    def name(self) -> str:
+        token = self.peek()
+        if token is None or token.kind != 'name':
+            raise self.error(f"Expected a name but found {self.describe_next()}")
+        self.index += 1
+        return token.text
+
+
+@lru_cache(maxsize=None)
+def parse_class_expression(expression: str) -> Node:
+    """Parses a Class Expression into its abstract syntax tree, which is cached by the text of the expression
+
+    Args:
+        expression: An expression in Class Expression Syntax of Protege
+
+    Returns:
+        The root Node of the expression
+
+    Raises:
+        SyntaxError: If the expression does not follow the grammar of this module
+
+    Examples:
+        >>> parse_class_expression("Food and not Cheese")
+        AndNode(operands=(NameNode(name='Food'), NotNode(operand=NameNode(name='Cheese'))))
+        >>> parse_class_expression("hasTopping some Cheese") is parse_class_expression("hasTopping some Cheese")
+        True
+    """
+    return _Parser(expression).parse()
+
+
+def iter_names(node: Node) -> Iterator[str]:
+    """Yields the names of the entities a parsed Class Expression refers to, as written in the expression
+
+    Examples:
+        >>> list(iter_names(parse_class_expression("Food and (hasTopping some (Cheese or {Mozzarella}))")))
+        ['Food', 'hasTopping', 'Cheese', 'Mozzarella']
+    """
+    if isinstance(node, NameNode):
+        yield node.name
+    elif isinstance(node, NotNode):
+        yield from iter_names(node.operand)
+    elif isinstance(node, (AndNode, OrNode)):
+        for operand in node.operands:
+            yield from iter_names(operand)
+    elif isinstance(node, OneOfNode):
+        yield from node.names
+    elif isinstance(node, RestrictionNode):
+        yield node.prop.name
+        if node.filler is not None:
+            yield from iter_names(node.filler)
+
+
+def _short_name(name: str) -> str:
+    return name.split(":", 1)[1] if ":" in name else name
 
 
 class ClassExpToConstruct:
@@ -178,60 +338,62 @@ class ClassExpToConstruct:
     A class to convert a Class Expression of `Protege` to a Class Construct of `owlready2`
     """
     def __init__(self, onto: Ontology):
-        self.reg_tokens: Dict[str, TokenInfo] = {}
         self.ontology = onto
-        self.existing_constructs = []
-
-    def match_registered(self, str_match: str) -> TokenInfo:
-        str_match = str_match.replace("(", "").replace(")", "")
-        if str_match in self.reg_tokens:
-            return self.reg_tokens[str_match]
-        else:
-            tk = TokenInfo(self.ontology)
-            result = self._cls_to_residue(str_match)
-            if result == str_match:
-                tk.sub_tokens = (result,)
-                tk.is_class = True
-            else:
-                return self.match_registered(result)
-            return tk
-
-    def get_match(self, re_pattern: Tuple, recv_string: str):
-        result = recv_string
-        m = Match
-        while m is not None:
-            m = search(re_pattern[0], result)
-            if m is None:
-                break
-            tk = TokenInfo(self.ontology)
-            tk.sub_tokens = [self.match_registered(n)
-                             for n in [m.group(e) for e in re_pattern[1]]
-                             if n is not None]
-            tk.start_index, tk.end_index = m.span()
-            if len(re_pattern) == 3:
-                tk.keyword = m.group(re_pattern[2])
-            else:
-                tk.keyword = "not"
-            result = result[:tk.start_index] + tk.get_repr() + result[tk.end_index:]
-            self.reg_tokens[tk.get_repr()] = tk
-        return result
-
-    def _match_one_of(self, exp):
-        m = search(r'^{(.+)}$', exp)
-        if m is None:
-            return exp
-        y = OneOf([get_individual_from_literal(self.ontology, y.strip()) for y in m.group(1).split(",")])
-        self.existing_constructs.append(y)
-        return
-
-    def _cls_to_residue(self, expression: str):
-        residue = expression
-        residue = self._match_one_of(residue)
-        if residue is None:
-            return residue
-        for p in PATTERNS:
-            residue = self.get_match(p, residue)
-        return residue
+
+    def resolve(self, name: str, base_cls: Type[Thing] = Thing, is_individual: bool = False):
+        """Returns the `owlready2` entity, datatype or value with a given name, creating a missing entity
+
+        Args:
+            name: The name of an entity with or without its prefix, or of a reserved value
+            base_cls: The type of the entity to create if it is missing
+            is_individual: Whether the name is the one of an Individual, which is never created
+
+        Returns:
+            The respective entity, datatype or value
+        """
+        short_name = _short_name(name)
+        if '[' in short_name:
+            return check_constraint_data_types(short_name)
+        if short_name in GENERATED_TYPES:
+            return GENERATED_TYPES[short_name]
+        if short_name in RESERVED:
+            return RESERVED[short_name]
+        if is_individual:
+            raise AssertionError(f'The individual "{short_name}" is missing.')
+        return get_class_from_literal(self.ontology, short_name, base_cls)
+
+    def lower(self, node: Node) -> Union[ClassConstruct, type, bool, int, float, str]:
+        """Converts a parsed Class Expression to an ``owlready2`` Class Construct
+
+        Args:
+            node: The root Node of an expression, see `parse_class_expression`
+
+        Returns:
+            The respective Class Construct, or entity or value for an atomic expression
+        """
+        if isinstance(node, NameNode):
+            return self.resolve(node.name)
+        if isinstance(node, LiteralNode):
+            return node.value
+        if isinstance(node, NotNode):
+            return Not(self.lower(node.operand))
+        if isinstance(node, AndNode):
+            return reduce(operator.and_, map(self.lower, node.operands))
+        if isinstance(node, OrNode):
+            return reduce(operator.or_, map(self.lower, node.operands))
+        if isinstance(node, OneOfNode):
+            return OneOf([get_individual_from_literal(self.ontology, _short_name(name)) for name in node.names])
+        base_cls = ObjectProperty if node.keyword in QUANTIFIER_RESTRICTION_KEYWORDS else Thing
+        prop = self.resolve(node.prop.name, base_cls)
+        if node.keyword == "value":
+            if isinstance(node.filler, NameNode):
+                return prop.value(self.resolve(node.filler.name, is_individual=True))
+            return prop.value(self.lower(node.filler))
+        if node.keyword in CARDINALITY_RESTRICTION_KEYWORDS:
+            if node.filler is None:
+                return getattr(prop, node.keyword)(node.cardinality)
+            return getattr(prop, node.keyword)(node.cardinality, self.lower(node.filler))
+        return getattr(prop, node.keyword)(self.lower(node.filler))
 
     def to_construct(self, expression: str) -> ClassConstruct:
         """
@@ -242,13 +404,14 @@ class ClassExpToConstruct:
 
         Returns:
             An owlready2 ClassConstruct counterpart of the given expression
+
+        Raises:
+            SyntaxError: If the expression cannot be parsed, or its entities cannot be combined this way
         """
-        self._cls_to_residue(expression)
-        construct_list = [j.construct for j in self.reg_tokens.values()]
-        construct_list.extend(self.existing_constructs)
-        self.reg_tokens.clear()
-        self.existing_constructs.clear()
-        return construct_list[-1]
+        try:
+            return self.lower(parse_class_expression(expression))
+        except AttributeError as e:
+            raise SyntaxError("Unable to construct from Class Expression syntax!" + str(e))
 
 
 if __name__ == '__main__':
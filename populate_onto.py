@@ -4,19 +4,28 @@ from pprint import pprint
 
 from django.db.models import Field, AutoField, ManyToOneRel
 
+from start_dj import start_django_lite
+
+start_django_lite()
+
 from app.models import Genre
 from ontogen.converter import OntogenConverter
+from ontogen.manifest import EntityManifest
 from ontogen.mixins.base import DjModelOntogenMixin
 from ontogen.primitives.properties import OwlProperty, OwlObjectProperty
 from ontogen.utils.basics import absolutize_entity_name
-import start_dj
 from dirs import ROOT_DIR
 from django.db import models
 
-from ontogen import Ontology
+from ontogen import Ontology, open_world
+from settings import OWL_WORLD_EXCLUSIVE, OWL_WORLD_PATH
 
 from ontogen.wrapper import all_subclasses
 
+OWL_FILE = ROOT_DIR / "mao.owl"
+# The entities actualized into OWL_FILE, so that the next run only actualizes what changed
+MANIFEST_FILE = ROOT_DIR / "mao.manifest.json"
+
 
 def add_individuals(converter: OntogenConverter) -> None:
     for cls in all_subclasses(DjModelOntogenMixin):
@@ -36,9 +45,14 @@ def add_individuals(converter: OntogenConverter) -> None:
 
 
 if __name__ == '__main__':
-    converter = OntogenConverter.load_from_spec(ROOT_DIR / "mao.yaml")
+    world = open_world(OWL_WORLD_PATH or None, exclusive=OWL_WORLD_EXCLUSIVE)
+    converter = OntogenConverter.load_from_spec(ROOT_DIR / "mao.yaml", world=world)
 
     add_individuals(converter)
 
-    onto: Ontology = converter.sync_with_ontology()
-    onto.save_to_file(ROOT_DIR / "mao.owl")
+    # Only the changes since the OWL file saved along with the manifest are actualized
+    manifest = EntityManifest.load(MANIFEST_FILE)
+    onto: Ontology = converter.sync_with_ontology(manifest=manifest, existing_file=OWL_FILE)
+    onto.save_to_file(OWL_FILE)
+    onto.save_world()
+    manifest.save(MANIFEST_FILE)
@@ -0,0 +1,119 @@
+"""Checkpoints to resume an interrupted `insert_xsv_data` from the byte offset of its last commit."""
+import json
+import os
+from io import BytesIO
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterator, NamedTuple, Optional, Union
+
+import pandas as pd
+
+__all__ = ['Checkpoint', 'load_checkpoint', 'save_checkpoint', 'remove_checkpoint', 'XsvChunkReader']
+
+
+class Checkpoint(NamedTuple):
+    """The state of a load after a commit.
+
+    Attributes:
+        table: The name of the table being loaded.
+        filename: The name of the file being read.
+        offset: The byte offset of the first line that is not committed yet.
+        rows: The number of data rows committed (or skipped) so far.
+    """
+    table: str
+    filename: str
+    offset: int
+    rows: int
+
+
+def load_checkpoint(path: Union[str, Path]) -> Optional[Checkpoint]:
+    """Returns the checkpoint saved at `path` or None if there is none."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return Checkpoint(**json.load(f))
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(path: Union[str, Path], checkpoint: Checkpoint) -> None:
+    """Saves `checkpoint` at `path`.
+
+    The checkpoint is written to a temporary file first, then moved over `path`,
+    so a crash while saving leaves the previous checkpoint intact.
+    """
+    path = Path(path)
+    temp = path.with_name(path.name + '.tmp')
+    with open(temp, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint._asdict(), f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, path)
+
+
+def remove_checkpoint(path: Union[str, Path]) -> None:
+    """Removes the checkpoint at `path` if it exists."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class XsvChunkReader:
+    """Reads a CSV/TSV file in chunks of `chunksize` lines and keeps track of the byte offset.
+
+    Unlike `pd.read_csv(chunksize=...)`, it can start from any line boundary, so rows
+    before `offset` or the first `skip_rows` data rows are never parsed. Each record
+    must fit on one line, which holds for the IMDb TSV files.
+
+    Attributes:
+        offset: The byte offset right after the last chunk yielded.
+        done: Whether the whole file was read.
+    """
+
+    def __init__(self,
+                 filename: Union[str, Path],
+                 *,
+                 chunksize: int,
+                 encoding: str,
+                 dialect: str,
+                 offset: int = None,
+                 skip_rows: int = 0,
+                 read_options: Dict[str, Any] = None):
+        """
+        Args:
+            filename: The file to read. Its first line must be the column header.
+            chunksize: The number of data lines per chunk.
+            encoding: The encoding of the file.
+            dialect: The `csv` dialect passed to `pd.read_csv`.
+            offset: The byte offset to start from. Defaults to the line after the header.
+            skip_rows: The number of data lines after `offset` to skip without parsing.
+            read_options: Other keyword arguments for `pd.read_csv`.
+        """
+        self.filename = Path(filename)
+        self.chunksize = chunksize
+        self.encoding = encoding
+        self.dialect = dialect
+        self.read_options = read_options or {}
+        self._start_offset = offset
+        self._skip_rows = skip_rows
+        self.offset = offset
+        self.done = False
+
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        with open(self.filename, 'rb') as f:
+            header = f.readline()
+            if self._start_offset is not None:
+                f.seek(self._start_offset)
+            for _ in islice(f, self._skip_rows):
+                pass
+            self.offset = f.tell()
+            while True:
+                lines = list(islice(f, self.chunksize))
+                if not lines:
+                    break
+                data = b''.join(lines)
+                chunk = pd.read_csv(BytesIO(header + data), encoding=self.encoding, dialect=self.dialect,
+                                    **self.read_options)
+                self.offset += len(data)
+                yield chunk
+        self.done = True
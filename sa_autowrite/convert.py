@@ -0,0 +1,121 @@
+from datetime import date
+from typing import Any, Callable, Dict, List, Type
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.sql.sqltypes import TypeEngine
+
+from sa_autowrite.hint import DeclaredModel
+from sa_autowrite.model import TYPE_CONVERTER
+from utils.date import parse_date
+
+__all__ = ['get_converter', 'convert_series', 'convert_chunk']
+
+INT_PATTERN = r'\s*[+-]?\d+\s*'
+INT64_MIN, INT64_MAX = np.iinfo(np.int64).min, np.iinfo(np.int64).max
+
+
+def get_converter(col_type: TypeEngine) -> Callable[[str], Any]:
+    if col_type.python_type == str:
+        return str
+    return TYPE_CONVERTER[col_type.python_type]
+
+
+def _to_str(series: pd.Series) -> pd.Series:
+    return series.map(str)
+
+
+def _to_int(series: pd.Series) -> pd.Series:
+    """Parses integers at once, only accepting the values that `int` would and that fit in 64 bits."""
+    invalid = ~series.astype(str).str.fullmatch(INT_PATTERN)
+    if invalid.any():
+        raise ValueError(f"invalid literal for int(): {series[invalid].iloc[0]!r}")
+    try:
+        return series.astype('int64').astype(object)
+    except OverflowError:
+        value = next(v for v in series if not INT64_MIN <= int(v) <= INT64_MAX)
+        raise ValueError(f"integer out of the 64-bit range: {value!r}") from None
+
+
+def _to_float(series: pd.Series) -> pd.Series:
+    return pd.to_numeric(series).astype(float).astype(object)
+
+
+def _to_date(series: pd.Series) -> pd.Series:
+    """Parses ISO dates at once and only falls back to `parse_date` for the other formats."""
+    parsed = pd.to_datetime(series, format='%Y-%m-%d', errors='coerce')
+    values = np.array(parsed.dt.date, dtype=object)
+    failed = parsed.isna().to_numpy()
+    if failed.any():
+        values[failed] = _convert_unique(series[failed], parse_date).to_numpy()
+    return pd.Series(values, index=series.index, dtype=object)
+
+
+def _convert_unique(series: pd.Series, convert: Callable[[Any], Any]) -> pd.Series:
+    """Converts each distinct value of `series` only once."""
+    unique = series.unique()
+    return series.map(dict(zip(unique, map(convert, unique)))).astype(object)
+
+
+VECTOR_CONVERTER: Dict[type, Callable[[pd.Series], pd.Series]] = {
+    str: _to_str,
+    int: _to_int,
+    float: _to_float,
+    date: _to_date,
+}
+
+
+def convert_series(series: pd.Series, col_type: TypeEngine) -> pd.Series:
+    """Returns `series` converted to the python type of `col_type` with None for missing values.
+
+    Raises:
+        ValueError: When a value cannot be converted.
+    """
+    values = np.full(len(series), None, dtype=object)
+    not_null = series.notna().to_numpy()
+    if not_null.any():
+        try:
+            convert = VECTOR_CONVERTER[col_type.python_type]
+        except KeyError:
+            values[not_null] = _convert_unique(series[not_null], get_converter(col_type)).to_numpy()
+        else:
+            values[not_null] = convert(series[not_null]).to_numpy()
+    return pd.Series(values, index=series.index, dtype=object)
+
+
+def convert_chunk(cls: Type[DeclaredModel], chunk: pd.DataFrame,
+                  *,
+                  null_values: List[str] = None,
+                  ignore_cols: List[str] = None,
+                  ) -> List[Dict[str, Any]]:
+    """Returns the rows of `chunk` as dicts ready to be inserted into the table of `cls`.
+
+    Each column is converted as a whole according to `cls.__table__.columns`
+    and no model instance is created.
+
+    Args:
+        cls: The model whose column types decide the conversion of each column.
+        chunk: The data read from the file.
+        null_values: Values to insert as NULL, in addition to missing values.
+        ignore_cols: Columns of the model to leave out.
+
+    Raises:
+        ValueError: When a value cannot be converted, naming its column.
+    """
+    if ignore_cols is None:
+        ignore_cols = []
+
+    columns = {}
+    for col in cls.__table__.columns:
+        if col.name in ignore_cols:
+            continue
+        series = chunk[col.name]
+        if null_values:
+            series = series.mask(series.isin(null_values))
+        try:
+            columns[col.name] = convert_series(series, col.type).tolist()
+        except ValueError as e:
+            raise ValueError(f"Column {col.name!r}: {e}") from e
+
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*columns.values())]
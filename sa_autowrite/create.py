@@ -1,16 +1,17 @@
 import re
 from pathlib import Path
-from typing import IO, Any, Dict, List, Union
+from typing import IO, Any, Dict, Iterable, List, Union
 
 import pandas as pd
 
-from extended_csv import get_dialect_from_suffix, read_xsv_file
+from extended_csv import get_dialect_from_suffix, read_xsv_file, read_xsv_file_batches
+from sa_autowrite.infer import SchemaBuilder
 from sa_autowrite.model import Table
 from utils.dict import select_not_null
 from utils.io import open_and_write_file
 from utils.str import snake_case, snake_to_capwords
 
-__all__ = ['write_models', 'write_model', 'write_base']
+__all__ = ['write_models', 'write_model', 'write_model_from_rows', 'write_base']
 
 
 def write_model(file: Union[IO, str, Path],
@@ -29,6 +30,24 @@ def write_model(file: Union[IO, str, Path],
     open_and_write_file(file, table.as_python())
 
 
+def write_model_from_rows(file: Union[IO, str, Path],
+                          model_name: str,
+                          rows: Iterable[Dict[str, str]],
+                          *,
+                          gen_pk: bool = True,
+                          pk_cols: List[str] = None,
+                          sample_size: int = None):
+    """Like `write_model` but reads `rows` one at a time with `SchemaBuilder` instead of keeping them.
+
+    Args:
+        sample_size: If given, infers the columns from a uniform sample of this many rows.
+    """
+    builder = SchemaBuilder(sample_size=sample_size)
+    builder.add_rows(rows)
+    table = builder.to_table(model_name, gen_pk=gen_pk, pk_cols=pk_cols)
+    open_and_write_file(file, table.as_python())
+
+
 def write_base(file: Union[IO, str, Path]) -> None:
     """Writes the file that defines SQL Alchemy declarative base.
 
@@ -71,7 +90,9 @@ def _get_info_from_filename(filename: str) -> dict:
 def write_models(in_directory: Union[str, Path],
                  out_directory: Union[str, Path],
                  *,
-                 max_lines: int = None
+                 max_lines: int = None,
+                 streaming: bool = False,
+                 sample_size: int = None,
                  ) -> None:
     """Writes models in `out_directory` from all CSV/TSV data in the `in_directory` to models.
 
@@ -81,6 +102,9 @@ def write_models(in_directory: Union[str, Path],
         in_directory: Data directory to read from.
         out_directory: Models directory to write to.
         max_lines: Maximum number of lines of data to read.
+        streaming: If True, reads the files one row at a time with bounded memory,
+            so `max_lines` can be None for files that do not fit in memory.
+        sample_size: When streaming, infers the columns from a uniform sample of this many rows.
 
     Returns:
         None
@@ -100,9 +124,15 @@ def write_models(in_directory: Union[str, Path],
         module_name = snake_case(model_name)
         class_name = snake_to_capwords(module_name)
         module_class.append((module_name, class_name))
-        write_model(out_directory / f'{module_name}.py',
-                    class_name,
-                    read_xsv_file(csvfile, encoding='utf-8', dialect=dialect, load_at_most=max_lines))
+        if streaming:
+            builder = SchemaBuilder(sample_size=sample_size)
+            for batch in read_xsv_file_batches(csvfile, dialect, encoding='utf-8', load_at_most=max_lines):
+                builder.add_batch(batch)
+            open_and_write_file(out_directory / f'{module_name}.py', builder.to_table(class_name).as_python())
+        else:
+            write_model(out_directory / f'{module_name}.py',
+                        class_name,
+                        read_xsv_file(csvfile, encoding='utf-8', dialect=dialect, load_at_most=max_lines))
         print(f"Writing to {(out_directory / f'{snake_case(model_name)}.py')}\n")
 
     # Check for required files
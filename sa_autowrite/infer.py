@@ -0,0 +1,314 @@
+"""Infers `Table` columns from rows in one pass with bounded memory.
+
+Instead of keeping every value like `Table(name, data)`, `SchemaBuilder` keeps for each
+column the types that still fit all values read so far, their min/max and an estimate
+of the number of distinct values, so that models can be written from files that do not
+fit in memory.
+"""
+import math
+import random
+from hashlib import blake2b
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set
+
+from extended_csv import RecordBatch
+from sa_autowrite.model import TYPE_CHECKER, TYPE_CONVERTER, Table
+
+__all__ = ['HyperLogLog', 'DistinctCounter', 'ColumnSummary', 'ColumnStats', 'SchemaBuilder']
+
+
+class HyperLogLog:
+    """Estimates the number of distinct values with 2 ** `precision` one-byte registers.
+
+    The relative error is about 1.04 / sqrt(2 ** `precision`), i.e. 0.8% by default.
+
+    Examples:
+        >>> hll = HyperLogLog()
+        >>> for i in range(100_000):
+        ...     hll.add(str(i % 50_000))
+        >>> abs(len(hll) - 50_000) < 50_000 * 0.03
+        True
+    """
+
+    def __init__(self, precision: int = 14):
+        if not 4 <= precision <= 18:
+            raise ValueError(f"precision must be between 4 and 18, got {precision}")
+        self.precision = precision
+        self.num_registers = 1 << precision
+        self.registers = bytearray(self.num_registers)
+
+    def add(self, value: Any) -> None:
+        h = int.from_bytes(blake2b(str(value).encode('utf-8'), digest_size=8).digest(), 'big')
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def __len__(self) -> int:
+        m = self.num_registers
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+
+class DistinctCounter:
+    """Counts distinct values exactly until there are more than `threshold`, then estimates with a `HyperLogLog`.
+
+    Examples:
+        >>> counter = DistinctCounter(threshold=3)
+        >>> for value in 'aabbc':
+        ...     counter.add(value)
+        >>> len(counter), counter.is_exact
+        (3, True)
+    """
+
+    def __init__(self, threshold: int = 20_000):
+        self.threshold = threshold
+        self.values: Optional[Set] = set()
+        self.hll: Optional[HyperLogLog] = None
+
+    @property
+    def is_exact(self) -> bool:
+        return self.hll is None
+
+    def add(self, value: Any) -> None:
+        if self.hll is not None:
+            self.hll.add(value)
+            return
+        self.values.add(value)
+        if len(self.values) > self.threshold:
+            self.hll = HyperLogLog()
+            for v in self.values:
+                self.hll.add(v)
+            self.values = None
+
+    def update(self, values: Iterable) -> None:
+        if self.hll is None:
+            self.values.update(values)
+            if len(self.values) <= self.threshold:
+                return
+            values, self.values = self.values, None
+            self.hll = HyperLogLog()
+        for value in values:
+            self.hll.add(value)
+
+    def __len__(self) -> int:
+        if self.hll is None:
+            return len(self.values)
+        return len(self.hll)
+
+
+class ColumnSummary(NamedTuple):
+    """What `model.Column.comment` shows about a column read by `SchemaBuilder`."""
+    unique: int
+    unique_is_exact: bool = True
+    min: Any = None
+    max: Any = None
+    lengths: Optional[List[int]] = None  # distinct lengths of str values, if less than 10
+    min_length: Optional[int] = None
+    max_length: Optional[int] = None
+
+
+class _Candidate:
+    """A type that every value of a column converted to so far."""
+    __slots__ = ('convert', 'distinct', 'min', 'max')
+
+    def __init__(self, convert: Callable[[str], Any], threshold: int):
+        self.convert = convert
+        self.distinct = DistinctCounter(threshold)
+        self.min = None
+        self.max = None
+
+    def add(self, value: str) -> None:
+        """Raises ValueError when `value` cannot be converted."""
+        converted = self.convert(value)
+        self.distinct.add(converted)
+        if self.min is None or converted < self.min:
+            self.min = converted
+        if self.max is None or converted > self.max:
+            self.max = converted
+
+    def add_many(self, values: List[str]) -> None:
+        """Raises ValueError when a value cannot be converted, in which case nothing is added."""
+        converted = list(map(self.convert, values))
+        self.distinct.update(converted)
+        low, high = min(converted), max(converted)
+        if self.min is None or low < self.min:
+            self.min = low
+        if self.max is None or high > self.max:
+            self.max = high
+
+
+class ColumnStats:
+    """Running statistics of the values of a column, used to choose its type like `Table` does."""
+
+    def __init__(self, name: str, *, distinct_threshold: int = 20_000):
+        self.name = name
+        self.count = 0
+        self.checks = dict(TYPE_CHECKER)
+        self.candidates: Dict[type, _Candidate] = {
+            type_: _Candidate(convert, distinct_threshold) for type_, convert in TYPE_CONVERTER.items()
+        }
+        self.distinct = DistinctCounter(distinct_threshold)
+        self.lengths: Optional[Set[int]] = set()
+        self.min_length = None
+        self.max_length = None
+
+    def add(self, value: Optional[str]) -> None:
+        if value is None:
+            value = ''
+        self.count += 1
+        for type_, check in list(self.checks.items()):
+            if not check(value):
+                del self.checks[type_]
+        for type_, candidate in list(self.candidates.items()):
+            try:
+                candidate.add(value)
+            except ValueError:
+                del self.candidates[type_]
+
+        self.distinct.add(value)
+        length = len(value)
+        if self.min_length is None or length < self.min_length:
+            self.min_length = length
+        if self.max_length is None or length > self.max_length:
+            self.max_length = length
+        if self.lengths is not None:
+            self.lengths.add(length)
+            if len(self.lengths) >= 10:
+                self.lengths = None
+
+    def add_many(self, values: List[Optional[str]]) -> None:
+        """The same as calling `add` for each of `values`, but one type at a time."""
+        if not values:
+            return
+        values = ['' if value is None else value for value in values]
+        self.count += len(values)
+        for type_, check in list(self.checks.items()):
+            if not all(map(check, values)):
+                del self.checks[type_]
+        for type_, candidate in list(self.candidates.items()):
+            try:
+                candidate.add_many(values)
+            except ValueError:
+                del self.candidates[type_]
+
+        self.distinct.update(values)
+        lengths = set(map(len, values))
+        low, high = min(lengths), max(lengths)
+        if self.min_length is None or low < self.min_length:
+            self.min_length = low
+        if self.max_length is None or high > self.max_length:
+            self.max_length = high
+        if self.lengths is not None:
+            self.lengths.update(lengths)
+            if len(self.lengths) >= 10:
+                self.lengths = None
+
+    @property
+    def type(self) -> type:
+        """The first type of `TYPE_CHECKER` whose check passed for every value,
+        else the first type of `TYPE_CONVERTER` that converted every value, else str."""
+        for type_ in TYPE_CHECKER:
+            if type_ in self.checks and type_ in self.candidates:
+                return type_
+        for type_ in TYPE_CONVERTER:
+            if type_ in self.candidates:
+                return type_
+        return str
+
+    def summary(self) -> ColumnSummary:
+        type_ = self.type
+        if type_ == str:
+            return ColumnSummary(len(self.distinct), self.distinct.is_exact,
+                                 lengths=None if self.lengths is None else sorted(self.lengths),
+                                 min_length=self.min_length, max_length=self.max_length)
+        candidate = self.candidates[type_]
+        return ColumnSummary(len(candidate.distinct), candidate.distinct.is_exact, candidate.min, candidate.max)
+
+
+class SchemaBuilder:
+    """Builds a `Table` from rows read one at a time.
+
+    Examples:
+        >>> builder = SchemaBuilder()
+        >>> builder.add_rows([{'id': '1', 'name': 'Apple', 'added': '2020-01-02'},
+        ...                   {'id': '2', 'name': 'Banana', 'added': '2020-03-04'}])
+        >>> table = builder.to_table('Fruit', pk_cols=['id'])
+        >>> [(col.name, col.type.__name__) for col in table.columns]
+        [('id', 'int'), ('name', 'str'), ('added', 'date')]
+        >>> table.columns[1].comment
+        '# unique: 2, len = {5,6}'
+    """
+
+    def __init__(self, *, sample_size: int = None, distinct_threshold: int = 20_000, seed: int = None):
+        """
+        Args:
+            sample_size: If given, keeps a uniform random sample of this many rows
+                (reservoir sampling) and only infers the columns from it.
+            distinct_threshold: The number of distinct values per column counted
+                exactly before switching to an estimate.
+            seed: The seed of the sampling.
+        """
+        self.sample_size = sample_size
+        self.distinct_threshold = distinct_threshold
+        self.num_rows = 0
+        self.columns: Dict[str, ColumnStats] = {}
+        self.reservoir: List[Dict[str, str]] = []
+        self._random = random.Random(seed)
+
+    def add(self, row: Dict[str, str]) -> None:
+        self.num_rows += 1
+        if self.sample_size is None:
+            self._add_to_stats(row)
+        elif len(self.reservoir) < self.sample_size:
+            self.reservoir.append(row)
+        else:
+            i = self._random.randrange(self.num_rows)
+            if i < self.sample_size:
+                self.reservoir[i] = row
+
+    def add_rows(self, rows: Iterable[Dict[str, str]]) -> None:
+        for row in rows:
+            self.add(row)
+
+    def add_batch(self, batch: RecordBatch) -> None:
+        """Adds the rows of `batch` column by column. The extra values of long rows are ignored."""
+        if self.sample_size is not None:
+            for row in zip(*batch.columns):
+                self.add(dict(zip(batch.fieldnames, row)))
+            return
+        self.num_rows += len(batch)
+        for name, values in zip(batch.fieldnames, batch.columns):
+            try:
+                stats = self.columns[name]
+            except KeyError:
+                stats = self.columns[name] = ColumnStats(name, distinct_threshold=self.distinct_threshold)
+            stats.add_many(values)
+
+    def _add_to_stats(self, row: Dict[str, str]) -> None:
+        for name, value in row.items():
+            try:
+                stats = self.columns[name]
+            except KeyError:
+                stats = self.columns[name] = ColumnStats(name, distinct_threshold=self.distinct_threshold)
+            stats.add(value)
+
+    def _flush_reservoir(self) -> None:
+        for row in self.reservoir:
+            self._add_to_stats(row)
+        self.reservoir = []
+        self.sample_size = None
+
+    def to_table(self, name: str, *, gen_pk: bool = True, pk_cols: List[str] = None) -> Table:
+        """Returns the table of the rows added so far. No row can be added afterwards if sampling.
+
+        See `Table` for the arguments.
+        """
+        if self.sample_size is not None:
+            self._flush_reservoir()
+        return Table.from_stats(name, self.columns.values(), self.num_rows, gen_pk=gen_pk, pk_cols=pk_cols)
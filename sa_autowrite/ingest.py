@@ -0,0 +1,215 @@
+"""Loads several IMDb files into their tables at the same time.
+
+Each table is loaded by its own worker process, which both parses the file and
+writes the rows, so there is exactly one writer per table and the wall time is
+bounded by the largest file instead of the sum of all files.
+"""
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from multiprocessing import Manager
+from pathlib import Path
+from queue import Empty
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, Type, Union
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from engine import engine as default_engine
+from sa_autowrite.hint import DeclaredModel
+from sa_autowrite.insert import insert_list_data, insert_xsv_data
+
+__all__ = ['DROP_POLICIES', 'IngestJob', 'get_imdb_filename', 'imdb_jobs', 'prepare_table', 'ingest']
+
+DROP_POLICIES = ('keep', 'drop', 'delete')
+"""What `ingest` does with the existing tables before loading:
+
+- keep: creates missing tables and appends to the existing ones.
+- drop: drops and recreates the tables.
+- delete: creates missing tables and deletes all rows of the existing ones.
+"""
+
+
+class IngestJob(NamedTuple):
+    """A file to load into the table of `model_cls`. Files ending in .list are parsed as IMDb .list files."""
+    filename: Path
+    model_cls: Type[DeclaredModel]
+    chunksize: int = 20_000
+    null_values: Tuple[str, ...] = ('\\N',)
+    ignore_cols: Tuple[str, ...] = ('_id',)
+    encoding: str = None
+
+    @property
+    def table_name(self) -> str:
+        return self.model_cls.__tablename__
+
+
+def get_imdb_filename(model_cls: Type[DeclaredModel]) -> str:
+    """Returns the name of the IMDb file the table of `model_cls` is loaded from.
+
+    Examples:
+        >>> from autogen_db_models.imdb import NameBasics, ProductionCompanies
+        >>> get_imdb_filename(NameBasics)
+        'name.basics.tsv'
+        >>> get_imdb_filename(ProductionCompanies)
+        'production-companies.list'
+    """
+    name = model_cls.__tablename__
+    if hasattr(model_cls, 'create_instance'):
+        return f"{name.replace('_', '-')}.list"
+    return f"{name.replace('_', '.')}.tsv"
+
+
+def imdb_jobs(folder: Union[str, Path],
+              models: Iterable[Type[DeclaredModel]] = None,
+              *,
+              chunksize: int = 20_000) -> List[IngestJob]:
+    """Returns the jobs to load the IMDb files in `folder`.
+
+    Args:
+        folder: The folder that contains the IMDb files.
+        models: The models to load. Defaults to `autogen_db_models.imdb.models`.
+        chunksize: The number of rows committed at once.
+
+    Raises:
+        FileNotFoundError: When the file of a model is not in `folder`.
+    """
+    if models is None:
+        from autogen_db_models.imdb import models
+    folder = Path(folder)
+
+    jobs = []
+    for model_cls in dict.fromkeys(models):
+        filename = folder / get_imdb_filename(model_cls)
+        if not filename.exists():
+            raise FileNotFoundError(f"'{filename}' for table '{model_cls.__tablename__}' does not exist")
+        if hasattr(model_cls, 'create_instance'):
+            jobs.append(IngestJob(filename, model_cls, chunksize=chunksize, null_values=(), ignore_cols=()))
+        else:
+            jobs.append(IngestJob(filename, model_cls, chunksize=chunksize))
+    return jobs
+
+
+def prepare_table(model_cls: Type[DeclaredModel], drop_policy: str, engine: Engine = default_engine) -> None:
+    """Creates the table of `model_cls` in `engine` according to `drop_policy`. See `DROP_POLICIES`.
+
+    Raises:
+        ValueError: When `drop_policy` is not one of `DROP_POLICIES`.
+    """
+    if drop_policy not in DROP_POLICIES:
+        raise ValueError(f"drop_policy must be one of {DROP_POLICIES}, got '{drop_policy}'")
+    table = model_cls.__table__
+    if drop_policy == 'drop':
+        table.drop(engine, checkfirst=True)
+    table.create(engine, checkfirst=True)
+    if drop_policy == 'delete':
+        with engine.begin() as conn:
+            conn.execute(table.delete())
+
+
+def _run_job(job: IngestJob, queue, bulk: bool, url: str, checkpoint: Optional[Path]) -> int:
+    """Loads `job` in a worker process with its own engine and returns the number of rows read."""
+    engine = create_engine(url)
+
+    def on_commit(rows: int) -> None:
+        queue.put((job.table_name, rows))
+
+    kwargs = dict(chunksize=job.chunksize, ignore_cols=list(job.ignore_cols), encoding=job.encoding,
+                  skip_rows_data=0, verbose=0, bulk=bulk, on_commit=on_commit)
+    try:
+        with Session(engine) as session:
+            if job.filename.suffix == '.list':
+                return insert_list_data(job.filename, job.model_cls, session=session, **kwargs)
+            return insert_xsv_data(job.filename, job.model_cls, session=session, checkpoint=checkpoint,
+                                   null_values=list(job.null_values), **kwargs)
+    finally:
+        engine.dispose()
+
+
+def _print_progress(table_name: str, rows: int, done: bool) -> None:
+    print(f"{table_name}: {'done, ' if done else ''}{rows:,} rows")
+
+
+def ingest(jobs: Iterable[IngestJob],
+           *,
+           max_workers: Optional[int] = None,
+           drop_policy: str = 'keep',
+           bulk: bool = True,
+           engine: Engine = default_engine,
+           checkpoint_dir: Union[str, Path] = None,
+           report: Callable[[str, int, bool], None] = _print_progress,
+           ) -> Dict[str, int]:
+    """Loads every job into its table in parallel.
+
+    The tables are prepared in this process first, then each job is loaded by a
+    worker of a process pool. On SQLite the writers still take turns on the database
+    lock, but each of them only holds it while committing its current chunk.
+
+    Args:
+        jobs: The files to load. Each table must appear at most once.
+        max_workers: The number of tables loaded at the same time. Defaults to the number of CPUs.
+        drop_policy: See `DROP_POLICIES`.
+        bulk: See `insert_xsv_data`.
+        engine: The database to load into. The workers connect to its URL.
+        checkpoint_dir: A folder to keep a checkpoint per table in, see `insert_xsv_data`.
+            A table with a checkpoint resumes from it and is never dropped or emptied.
+            Only CSV/TSV jobs are checkpointed.
+        report: Called with the table name, the number of rows read so far and whether
+            the table is done, after each commit and when a table is done.
+
+    Returns:
+        The number of rows read per table name.
+
+    Raises:
+        ValueError: When `drop_policy` is invalid or a table appears more than once.
+        Exception: The first error raised by a worker, after the other jobs are finished.
+    """
+    jobs = list(jobs)
+    table_names = [job.table_name for job in jobs]
+    if len(set(table_names)) != len(table_names):
+        raise ValueError("each table must be loaded by only one job")
+    if drop_policy not in DROP_POLICIES:
+        raise ValueError(f"drop_policy must be one of {DROP_POLICIES}, got '{drop_policy}'")
+    checkpoints: Dict[str, Optional[Path]] = {}
+    for job in jobs:
+        checkpoint = None
+        if checkpoint_dir is not None and job.filename.suffix != '.list':
+            checkpoint = Path(checkpoint_dir) / f'{job.table_name}.json'
+        checkpoints[job.table_name] = checkpoint
+        resuming = checkpoint is not None and checkpoint.exists()
+        prepare_table(job.model_cls, 'keep' if resuming else drop_policy, engine)
+    if checkpoint_dir is not None:
+        Path(checkpoint_dir).mkdir(parents=True, exist_ok=True)
+    url = engine.url.render_as_string(hide_password=False)
+
+    results: Dict[str, int] = {}
+    errors: List[BaseException] = []
+    with Manager() as manager, ProcessPoolExecutor(max_workers=max_workers) as executor:
+        queue = manager.Queue()
+        pending: Dict[Future, IngestJob] = {
+            executor.submit(_run_job, job, queue, bulk, url, checkpoints[job.table_name]): job for job in jobs
+        }
+
+        def drain() -> None:
+            while True:
+                try:
+                    table_name, rows = queue.get_nowait()
+                except Empty:
+                    return
+                report(table_name, rows, False)
+
+        while pending:
+            done, _ = wait(pending, timeout=1, return_when=FIRST_COMPLETED)
+            drain()
+            for future in done:
+                job = pending.pop(future)
+                try:
+                    rows = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    print(f"{job.table_name}: failed with {e!r}")
+                else:
+                    results[job.table_name] = rows
+                    report(job.table_name, rows, True)
+    if errors:
+        raise errors[0]
+    return results
@@ -1,17 +1,19 @@
 from importlib import import_module
 from pathlib import Path
-from typing import Any, Callable, Dict, Iterator, List, Tuple, Type, Union
+from typing import Callable, Dict, Iterator, List, Tuple, Type, Union
 
 import pandas as pd
-from sqlalchemy.sql.sqltypes import TypeEngine
+from sqlalchemy.orm import Session as OrmSession
 
 from dirs import ROOT_DIR
 from engine import Session
 from extended_csv import get_dialect_from_suffix
+from sa_autowrite.checkpoint import Checkpoint, XsvChunkReader, load_checkpoint, remove_checkpoint, save_checkpoint
+from sa_autowrite.convert import convert_chunk
 from sa_autowrite.create import _get_info_from_filename
 from sa_autowrite.hint import DeclaredModel
 from sa_autowrite.model import DEF_TYPE, TYPE_CONVERTER
-from sa_autowrite.parsers import parse_imdb_list
+from sa_autowrite.parsers import parse_imdb_list_fast, parse_imdb_list_parallel
 from utils.misc import depreciated
 from utils.str import snake_case, snake_to_capwords
 
@@ -25,36 +27,22 @@ from utils.str import snake_case, snake_to_capwords
 #         yield data
 
 
-def get_converter(col_type: TypeEngine) -> Callable[[str], Any]:
-    if col_type.python_type == str:
-        return str
-    return TYPE_CONVERTER[col_type.python_type]
+def bulk_insert_chunk(session: OrmSession, cls: Type[DeclaredModel], chunk: pd.DataFrame,
+                      *,
+                      null_values: List[str],
+                      ignore_cols: List[str],
+                      ) -> None:
+    """Inserts `chunk` into the table of `cls` with a single executemany-style Core insert.
 
-
-def create_instance(cls: Type[DeclaredModel], row: pd.Series,
-                    *,
-                    null_values: List[str] = None,
-                    ignore_cols: List[str] = None,
-                    ) -> DeclaredModel:
-    if null_values is None:
-        null_values = []
-    if ignore_cols is None:
-        ignore_cols = []
-
-    data = {}
-
-    for col in cls.__table__.columns:
-        if col.name in ignore_cols:
-            continue
-
-        val = row.get(col.name)
-        assert val is not None
-        if val in null_values:
-            val = None
-        else:
-            val = get_converter(col.type)(val)
-        data[col.name] = val
-    return cls(**data)
+    Models defining their own `create_instance` still build their instances,
+    but those are written with `bulk_save_objects` to skip the unit of work.
+    """
+    if hasattr(cls, 'create_instance'):
+        session.bulk_save_objects([cls.create_instance(series) for _, series in chunk.iterrows()])
+        return
+    records = convert_chunk(cls, chunk, null_values=null_values, ignore_cols=ignore_cols)
+    if records:
+        session.execute(cls.__table__.insert(), records)
 
 
 def _clean_insert_data(*,
@@ -89,30 +77,46 @@ def _handle_reader(reader: Iterator[pd.DataFrame],
                    ignore_cols: List[str],
                    skip_rows_data: int,
                    read_until: int,
-                   verbose: int):
-    session = Session()
-    counter = 0
+                   verbose: int,
+                   bulk: bool = False,
+                   session: OrmSession = None,
+                   on_commit: Callable[[int], None] = None,
+                   start_row: int = 0) -> int:
+    """Inserts the chunks of `reader` and returns the number of rows read, including skipped ones.
+
+    `start_row` is the number of rows the reader already left out.
+    """
+    if session is None:
+        session = Session()
+    counter = start_row
     for chunk in reader:
         chunk: pd.DataFrame
         if counter < skip_rows_data:
             counter += chunksize
             continue
-        for row in chunk.iterrows():
-            line, series = row
-            counter += 1
-            if hasattr(model_cls, 'create_instance'):
-                instance = model_cls.create_instance(series)
-            else:
-                instance = create_instance(model_cls, series, null_values=null_values, ignore_cols=ignore_cols)
-            session.add(instance)
-            if verbose > 1:
-                if counter % 5000 == 0:
-                    print(f"Added till row {counter}")
+        if bulk:
+            bulk_insert_chunk(session, model_cls, chunk, null_values=null_values, ignore_cols=ignore_cols)
+            counter += len(chunk)
+        elif hasattr(model_cls, 'create_instance'):
+            for row in chunk.iterrows():
+                line, series = row
+                counter += 1
+                session.add(model_cls.create_instance(series))
+                if verbose > 1:
+                    if counter % 5000 == 0:
+                        print(f"Added till row {counter}")
+        else:
+            records = convert_chunk(model_cls, chunk, null_values=null_values, ignore_cols=ignore_cols)
+            session.add_all([model_cls(**record) for record in records])
+            counter += len(records)
         session.commit()
         if verbose > 0:
             print(f'Committed till row {counter}')
+        if on_commit is not None:
+            on_commit(counter)
         if read_until is not None and counter == read_until:
             break
+    return counter
 
 
 def insert_xsv_data(filename: Union[str, Path],
@@ -124,8 +128,30 @@ def insert_xsv_data(filename: Union[str, Path],
                     encoding: str = None,
                     skip_rows_data: int = None,
                     read_lines_data: int = None,
-                    verbose: int = 2
-                    ) -> None:
+                    verbose: int = 2,
+                    bulk: bool = False,
+                    session: OrmSession = None,
+                    on_commit: Callable[[int], None] = None,
+                    checkpoint: Union[str, Path] = None,
+                    ) -> int:
+    """Inserts the rows of a CSV/TSV file into the table of `model_cls`.
+
+    Args:
+        bulk: If True, converts each chunk column by column and writes it with one
+            executemany-style insert instead of adding a model instance per row.
+        session: The session to write with. Uses a new `engine.Session` if None.
+        on_commit: Called with the number of rows read so far after each commit.
+        checkpoint: A JSON file to save a `Checkpoint` to after each commit. If it exists,
+            the load resumes from its byte offset instead of `skip_rows_data`.
+            It is removed once the whole file is inserted. The checkpoint is saved
+            right after the commit, so a crash in between inserts that chunk again.
+
+    Returns:
+        The number of rows read, including skipped ones.
+
+    Raises:
+        ValueError: When `checkpoint` belongs to another table or file.
+    """
     filename, encoding, skip_rows_data, read_until = _clean_insert_data(filename=filename,
                                                                         chunksize=chunksize,
                                                                         encoding=encoding,
@@ -136,13 +162,46 @@ def insert_xsv_data(filename: Union[str, Path],
     dialect = get_dialect_from_suffix(info['format'])
     print(f"Opening {filename.name}")
 
-    reader = pd.read_csv(filename, encoding=encoding, dialect=dialect, chunksize=chunksize)
+    read_options = {}
+    if not hasattr(model_cls, 'create_instance'):
+        # Leave the conversion to `convert_chunk` and only read `null_values` as missing
+        read_options = {'dtype': str, 'keep_default_na': False, 'na_values': null_values}
+    if checkpoint is None:
+        reader = pd.read_csv(filename, encoding=encoding, dialect=dialect, chunksize=chunksize, **read_options)
+        return _handle_reader(reader, model_cls,
+                              chunksize=chunksize,
+                              null_values=null_values, ignore_cols=ignore_cols,
+                              skip_rows_data=skip_rows_data, read_until=read_until,
+                              verbose=verbose, bulk=bulk, session=session, on_commit=on_commit)
+
+    table_name = model_cls.__tablename__
+    saved = load_checkpoint(checkpoint)
+    if saved is None:
+        reader = XsvChunkReader(filename, chunksize=chunksize, encoding=encoding, dialect=dialect,
+                                skip_rows=skip_rows_data, read_options=read_options)
+        start_row = skip_rows_data
+    elif (saved.table, saved.filename) != (table_name, filename.name):
+        raise ValueError(f"checkpoint '{checkpoint}' is for table '{saved.table}' and file '{saved.filename}'")
+    else:
+        print(f"Resuming {filename.name} from row {saved.rows}")
+        reader = XsvChunkReader(filename, chunksize=chunksize, encoding=encoding, dialect=dialect,
+                                offset=saved.offset, read_options=read_options)
+        start_row = saved.rows
 
-    _handle_reader(reader, model_cls,
-                   chunksize=chunksize,
-                   null_values=null_values, ignore_cols=ignore_cols,
-                   skip_rows_data=skip_rows_data, read_until=read_until,
-                   verbose=verbose)
+    def save_and_notify(rows: int) -> None:
+        save_checkpoint(checkpoint, Checkpoint(table_name, filename.name, reader.offset, rows))
+        if on_commit is not None:
+            on_commit(rows)
+
+    counter = _handle_reader(reader, model_cls,
+                             chunksize=chunksize,
+                             null_values=null_values, ignore_cols=ignore_cols,
+                             skip_rows_data=skip_rows_data, read_until=read_until,
+                             verbose=verbose, bulk=bulk, session=session, on_commit=save_and_notify,
+                             start_row=start_row)
+    if reader.done:
+        remove_checkpoint(checkpoint)
+    return counter
 
 
 def insert_list_data(filename: Union[str, Path],
@@ -153,8 +212,24 @@ def insert_list_data(filename: Union[str, Path],
                      encoding: str = None,
                      skip_rows_data: int = None,
                      read_lines_data: int = None,
-                     verbose: int = 2
-                     ) -> None:
+                     verbose: int = 2,
+                     bulk: bool = False,
+                     session: OrmSession = None,
+                     on_commit: Callable[[int], None] = None,
+                     workers: int = 1,
+                     ) -> int:
+    """Inserts the entries of an IMDb .list file into the table of `model_cls`.
+
+    Args:
+        bulk: See `insert_xsv_data`.
+        session: See `insert_xsv_data`.
+        on_commit: See `insert_xsv_data`.
+        workers: The number of processes parsing the file, see `parse_imdb_list_parallel`.
+            None uses all CPUs and 1 parses in this process.
+
+    Returns:
+        The number of rows read, including skipped ones.
+    """
     filename, encoding, skip_rows_data, read_until = _clean_insert_data(filename=filename,
                                                                         chunksize=chunksize,
                                                                         encoding=encoding,
@@ -162,13 +237,16 @@ def insert_list_data(filename: Union[str, Path],
                                                                         read_lines_data=read_lines_data,
                                                                         default_encoding='windows-1252')
 
-    reader = parse_imdb_list(filename, chunksize=chunksize, encoding=encoding)
+    if workers == 1:
+        reader = parse_imdb_list_fast(filename, chunksize=chunksize, encoding=encoding)
+    else:
+        reader = parse_imdb_list_parallel(filename, chunksize=chunksize, encoding=encoding, workers=workers)
 
-    _handle_reader(reader, model_cls,
-                   chunksize=chunksize,
-                   null_values=[], ignore_cols=ignore_cols,
-                   skip_rows_data=skip_rows_data, read_until=read_until,
-                   verbose=verbose)
+    return _handle_reader(reader, model_cls,
+                          chunksize=chunksize,
+                          null_values=[], ignore_cols=ignore_cols,
+                          skip_rows_data=skip_rows_data, read_until=read_until,
+                          verbose=verbose, bulk=bulk, session=session, on_commit=on_commit)
 
 
 @depreciated('n/a')
@@ -1,11 +1,14 @@
 from datetime import date, datetime
-from typing import List
+from typing import TYPE_CHECKING, Iterable, List
 
 from pandas import DataFrame, Series
 
 from utils.date import parse_date
 from utils.str import camel_to_snake
 
+if TYPE_CHECKING:
+    from sa_autowrite.infer import ColumnStats, ColumnSummary
+
 
 class Table:
     """ Represents a database table/model. """
@@ -58,9 +61,45 @@ class Table:
                     col.data = data.get(col.name)
             self.columns.append(col)
 
+        self._set_pk(gen_pk, len(self.data))
+
+    @classmethod
+    def from_stats(cls,
+                   name: str,
+                   stats: Iterable['ColumnStats'],
+                   num_rows: int,
+                   *,
+                   gen_pk: bool = True,
+                   pk_cols: List[str] = None) -> 'Table':
+        """Creates the table from the statistics collected by `sa_autowrite.infer.SchemaBuilder`.
+
+        The data itself is not kept, so `data` and `Column.data` are None.
+
+        Args:
+            name: The name of the model.
+            stats: The statistics of each column.
+            num_rows: The number of rows read.
+            gen_pk: See `Table`.
+            pk_cols: See `Table`.
+
+        Raises:
+            ValueError: See `Table`.
+        """
+        from sa_autowrite.infer import ColumnSummary
+
+        table = cls.__new__(cls)
+        table.name = name
+        table.data = None
+        table.pk_cols = pk_cols
+        table.columns = [Column(col.name, type_=col.type, summary=col.summary()) for col in stats]
+        table._set_pk(gen_pk, num_rows, ColumnSummary(num_rows, min=0, max=num_rows - 1) if num_rows else None)
+        return table
+
+    def _set_pk(self, gen_pk: bool, num_rows: int, summary: 'ColumnSummary' = None) -> None:
         if self.pk_cols is None:
             if gen_pk:
-                self.columns.insert(0, Column('_id', Series(range(len(self.data))), type_=int, is_pk=True))
+                data = None if summary is not None else Series(range(num_rows))
+                self.columns.insert(0, Column('_id', data, type_=int, is_pk=True, summary=summary))
             else:
                 raise ValueError(f"Table '{self.name}' will have no primary key if not specified")
         elif self.pk_cols:
@@ -95,11 +134,13 @@ class Table:
 
 class Column:
     """ Object to store column data to use in `Table`. """
-    def __init__(self, name: str, data: Series = None, *, type_: type = None, is_pk: bool = False):
+    def __init__(self, name: str, data: Series = None, *, type_: type = None, is_pk: bool = False,
+                 summary: 'ColumnSummary' = None):
         self.name = name
         self.data: Series = data
         self.type: type = type_
         self.is_pk = is_pk
+        self.summary = summary  # Used instead of `data` when the data isn't kept
         self.comments: List[str] = []
 
     def __str__(self):
@@ -120,6 +161,8 @@ class Column:
 
     @property
     def comment(self) -> str:
+        if self.summary is not None:
+            return self._summary_comment()
         self.comments.append(f'unique: {len(self.data.unique())}')
         if self.type in [int, float, date]:
             self.comments.append(f'val = [{self.data.min()},{self.data.max()}]')
@@ -132,6 +175,18 @@ class Column:
                 self.comments.append(f'len = [{lens.min()},{lens.max()}]')
         return "# " + ', '.join(self.comments)
 
+    def _summary_comment(self) -> str:
+        summary = self.summary
+        comments = self.comments + [f"unique: {'' if summary.unique_is_exact else '~'}{summary.unique}"]
+        if self.type in [int, float, date]:
+            comments.append(f'val = [{summary.min},{summary.max}]')
+        elif self.type == str:
+            if summary.lengths is not None:
+                comments.append(f"len = {{{','.join(map(str, summary.lengths))}}}")
+            else:
+                comments.append(f'len = [{summary.min_length},{summary.max_length}]')
+        return "# " + ', '.join(comments)
+
 
 TYPE_DEF = {
     str: 'String',
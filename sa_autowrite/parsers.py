@@ -1,13 +1,17 @@
+import mmap
+import os
 import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import IO, Iterator, Tuple, Union
+from typing import IO, Dict, Iterator, List, Optional, Tuple, Union
 
 import pandas as pd
 
 from utils.dict import select_not_null
 from utils.misc import depreciated
 
-__all__ = ['parse_imdb_list']
+__all__ = ['parse_imdb_list', 'parse_imdb_list_fast', 'parse_imdb_list_parallel']
 
 
 @depreciated('n/a')
@@ -237,6 +241,291 @@ def parse_imdb_list(filename: Union[str, Path], *, chunksize: int, encoding: str
                 yield pd.DataFrame(lst)
                 lst = []
 
+
+LIST_COLUMNS = ['title', 'year', 'roman', 'type', 'episode_info', 'data']
+ROMAN_CHARS = frozenset('IVXLCDM')
+
+
+def _parse_tail(tail: str) -> Optional[tuple]:
+    """Parses what follows the title, e.g. '(2000/II) (TV) {Pilot (#1.1)}', without its leading space.
+
+    Returns:
+        year, roman, type and episode_info, or None if `tail` has another format.
+    """
+    # (year[/roman])
+    if len(tail) < 6 or tail[0] != '(':
+        return None
+    year = tail[1:5]
+    if not (year.isdecimal() or year == '????'):
+        return None
+    pos = 5
+    roman = None
+    if tail[pos] == '/':
+        end = pos + 1
+        while end < len(tail) and tail[end] in ROMAN_CHARS:
+            end += 1
+        if end == pos + 1:
+            return None
+        roman = tail[pos + 1:end]
+        pos = end
+    if pos >= len(tail) or tail[pos] != ')':
+        return None
+    rest = tail[pos + 1:]
+
+    # ( (type))?( {episode_info})?
+    type_ = None
+    if rest.startswith(' ('):
+        body = rest[2:]
+        if not body or body[0].isspace():
+            return None
+        # The type cannot contain whitespace, so it ends right before the first one
+        space = len(body.split(None, 1)[0])
+        if body[space - 1] != ')':
+            return None
+        type_ = body[:space - 1]
+        rest = body[space:]
+    if not rest:
+        return year, roman, type_, None
+    if len(rest) >= 3 and rest.startswith(' {') and rest[-1] == '}':
+        return year, roman, type_, rest[2:-1]
+    return None
+
+
+def parse_line_fast(line: str) -> dict:
+    """Parse a line in IMDB list file without a backtracking regex.
+
+    Returns the same dict as `parse_line_re`. The title, year, roman, type and episode
+    are split from the right of the part before the first tab. Lines whose data part
+    could also be read as part of the title, i.e. contains ')\\t' or '}\\t', are passed
+    to `parse_line_re` so that the result is always the same.
+
+    Args:
+        line: The line to parse
+
+    Examples:
+        >>> parse_line_fast('"#1 Single" (2006) {Wingman (#1.6)}\\t\\t\\tStick Figure Productions [us]\\n')
+        {'title': '#1 Single', 'year': 2006, 'roman': None, 'type': None, 'episode_info': 'Wingman (#1.6)', \
+'data': 'Stick Figure Productions [us]'}
+        >>> parse_line_fast('Les Misérables (1998/II) (V)\\t\\tFrance\\n')['roman']
+        'II'
+
+    Raises:
+        ValueError when line does not match regex
+    """
+    result = _parse_line_fast(line.rstrip('\n'))
+    if result is None:
+        return parse_line_re(line)
+    return dict(zip(LIST_COLUMNS, result))
+
+
+def _parse_line_fast(line: str) -> Optional[tuple]:
+    """Returns the values of `LIST_COLUMNS` for `line` (without newline), or None to use `parse_line_re`."""
+    head, _, data = line.partition('\t')
+    if not head or not data:
+        return None
+    data = data.lstrip('\t')
+    if ')\t' in data or '}\t' in data:
+        return None
+    if head[-1] == ')' and head[-7:-5] == ' (':
+        # The most common tail: ' (year)'
+        year = head[-6:-2]
+        if year.isdecimal():
+            title = head[:-7]
+            if title:
+                return title[1:-1] if title[0] == title[-1] == '"' else title, int(year), None, None, None, data
+        elif year == '????':
+            title = head[:-7]
+            if title:
+                return title[1:-1] if title[0] == title[-1] == '"' else title, None, None, None, None, data
+    # The title is greedy, so the rightmost ' (' that starts a valid tail wins
+    start = head.rfind(' (')
+    while start > 0:
+        parsed = _parse_tail(head[start + 1:])
+        if parsed is not None:
+            title = head[:start]
+            year, roman, type_, episode_info = parsed
+            return (title[1:-1] if title[0] == title[-1] == '"' else title,
+                    None if year == '????' else int(year),
+                    roman, type_, episode_info, data)
+        start = head.rfind(' (', 0, start)
+    return None
+
+
+def _iter_data_line_blocks(filename: Union[str, Path], encoding: str, block_size: int) -> Iterator[List[str]]:
+    """Yields the data lines found by `get_data_lines` in lists, reading `block_size` characters at once.
+
+    The lines are without newline and the closing '---' line is not included.
+    """
+    with open(filename, 'r', encoding=encoding) as file:
+        line = ''
+        while not line.startswith('---'):
+            line = file.readline()
+            if not line:
+                return
+        while not line.startswith('==='):
+            line = file.readline()
+            if not line:
+                return
+        rest = ''
+        while True:
+            block = file.read(block_size)
+            if not block:
+                if rest and not rest.startswith('---'):
+                    yield [rest]
+                return
+            lines = (rest + block).split('\n')
+            rest = lines.pop()
+            for i, line in enumerate(lines):
+                if line.startswith('---'):
+                    yield lines[:i]
+                    return
+            yield lines
+
+
+def parse_imdb_list_fast(filename: Union[str, Path],
+                         *,
+                         chunksize: int,
+                         encoding: str = 'windows-1252',
+                         block_size: int = 1 << 20,
+                         ) -> Iterator[pd.DataFrame]:
+    """Parses the data section of an IMDb .list file in DataFrames of `chunksize` rows.
+
+    The same as `parse_imdb_list` but reads the file in blocks of `block_size` characters,
+    parses the lines with `parse_line_fast` into tuples and builds each DataFrame from them
+    at once instead of from a dict per line.
+    Unlike `parse_imdb_list`, the last DataFrame may have less than `chunksize` rows.
+
+    Raises:
+        ValueError when a data line does not match `parse_line_re`
+    """
+    rows = []
+    append = rows.append
+    for lines in _iter_data_line_blocks(filename, encoding, block_size):
+        for line in lines:
+            values = _parse_line_fast(line)
+            if values is None:
+                values = tuple(parse_line_re(line).values())
+            append(values)
+            if len(rows) == chunksize:
+                yield pd.DataFrame(rows, columns=LIST_COLUMNS)
+                rows.clear()
+    if rows:
+        yield pd.DataFrame(rows, columns=LIST_COLUMNS)
+
+
+def find_data_range(filename: Union[str, Path]) -> Tuple[int, int]:
+    """Returns the byte offsets of the data lines found by `get_data_lines`, without the closing '---' line.
+
+    The encoding of the file must be ASCII compatible, e.g. windows-1252 or utf-8.
+    """
+    with open(filename, 'rb') as file:
+        line = b''
+        while not line.startswith(b'---'):
+            line = file.readline()
+            if not line:
+                return file.tell(), file.tell()
+        while not line.startswith(b'==='):
+            line = file.readline()
+            if not line:
+                return file.tell(), file.tell()
+        start = file.tell()
+        size = os.fstat(file.fileno()).st_size
+        if start == size:
+            return start, start
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[start:start + 3] == b'---':
+                return start, start
+            end = mm.find(b'\n---', start)
+    return start, size if end == -1 else end + 1
+
+
+def split_data_range(filename: Union[str, Path], start: int, end: int, size: int) -> List[Tuple[int, int]]:
+    """Splits the bytes from `start` to `end` into ranges of about `size` bytes that end after a newline."""
+    ranges = []
+    with open(filename, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        while start < end:
+            stop = mm.find(b'\n', min(start + size, end) - 1, end)
+            stop = end if stop == -1 else stop + 1
+            ranges.append((start, stop))
+            start = stop
+    return ranges
+
+
+def _parse_range(filename: Union[str, Path], start: int, end: int, encoding: str) -> pd.DataFrame:
+    """Parses the data lines between the byte offsets `start` and `end` into one DataFrame."""
+    with open(filename, 'rb') as file:
+        file.seek(start)
+        text = file.read(end - start).decode(encoding)
+    if '\r' in text:
+        # Same as the universal newlines of `get_data_lines`
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    lines = text.split('\n')
+    if lines and not lines[-1]:
+        lines.pop()
+    rows = []
+    for line in lines:
+        values = _parse_line_fast(line)
+        if values is None:
+            values = tuple(parse_line_re(line).values())
+        rows.append(values)
+    return pd.DataFrame(rows, columns=LIST_COLUMNS)
+
+
+def parse_imdb_list_parallel(filename: Union[str, Path],
+                             *,
+                             chunksize: int,
+                             encoding: str = 'windows-1252',
+                             workers: int = None,
+                             shard_size: int = 1 << 23,
+                             ) -> Iterator[pd.DataFrame]:
+    """Parses the data section of an IMDb .list file with a pool of worker processes.
+
+    The data section is split into byte ranges of about `shard_size` bytes aligned to
+    line boundaries. Each range is parsed by a worker into one DataFrame and the
+    results are merged in order into DataFrames of `chunksize` rows, the last one
+    possibly shorter, like `parse_imdb_list_fast`. At most two ranges per worker are
+    parsed ahead of the consumer. The dtypes of a column are inferred per range,
+    so a chunk may get float years where `parse_imdb_list_fast` gives ints.
+
+    Args:
+        filename: The .list file. Its encoding must be ASCII compatible.
+        chunksize: The number of rows of each DataFrame.
+        encoding: The encoding of the file.
+        workers: The number of worker processes. Defaults to the number of CPUs.
+        shard_size: The approximate number of bytes parsed by a worker at once.
+
+    Raises:
+        ValueError when a data line does not match `parse_line_re`
+    """
+    start, end = find_data_range(filename)
+    ranges = split_data_range(filename, start, end, shard_size)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    def parsed_ranges() -> Iterator[pd.DataFrame]:
+        if workers == 1:
+            for range_start, range_end in ranges:
+                yield _parse_range(filename, range_start, range_end, encoding)
+            return
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for range_start, range_end in ranges:
+                if len(pending) == 2 * workers:
+                    yield pending.popleft().result()
+                pending.append(executor.submit(_parse_range, filename, range_start, range_end, encoding))
+            while pending:
+                yield pending.popleft().result()
+
+    buffer = None
+    for df in parsed_ranges():
+        buffer = df if buffer is None else pd.concat([buffer, df], ignore_index=True)
+        while len(buffer) >= chunksize:
+            yield buffer.iloc[:chunksize].reset_index(drop=True)
+            buffer = buffer.iloc[chunksize:]
+    if buffer is not None and len(buffer):
+        yield buffer.reset_index(drop=True)
+
+
 MAP = {
     'csv': parse_csv,
     'tsv': parse_tsv,
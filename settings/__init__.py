@@ -5,6 +5,9 @@ from decouple import config
 OWL_FILEPATH = config('OWL_FILE_PATH', default="proto-movie.owl")
 OUT_PATH = config('OUT_PATH', default="out/")
 OUT_FILENAME = config('OUT_FILENAME', default="out.owl")
+# The SQLite quadstore of the owlready2 World, or empty for an in-memory World
+OWL_WORLD_PATH = config('OWL_WORLD_PATH', default="")
+OWL_WORLD_EXCLUSIVE = config('OWL_WORLD_EXCLUSIVE', default=True, cast=bool)
 
 DB_NAME = config('DB_NAME', default="mao")
 DB_HOST = config('DB_HOST', default="localhost:3306")
@@ -1,124 +1,239 @@
-from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
 import pickle
+import sqlite3
 
-import spacy
 import typing
 
 from dirs import ROOT_DIR
-from utils.misc import depreciated
 
-nlp = spacy.load("en_core_web_sm")
-
-
-class M:
-    file = 'mapping/{}.pickle'
-    resources = {}
-
-    @classmethod
-    def write_resource(cls, name: str, value: object):
-        cls.resources[name] = value
-        cls.dump_resource(name)
-
-    @classmethod
-    def load_resource(cls, name: str) -> typing.List[str]:
-        with open(ROOT_DIR / cls.file.format(name), 'rb') as file:
-            cls.resources[name] = pickle.load(file)
-            return cls.resources[name]
-
-    @classmethod
-    def dump_resource(cls, name: str):
-        with open(ROOT_DIR / cls.file.format(name), 'wb') as file:
-            pickle.dump(cls.resources[name], file)
-
-
-@depreciated("Use get_resources() instead")
-@contextmanager
-def get_person_names():
-    # Code to acquire resource, e.g.:
-    person_names = M.load_resource('person_names')
-    try:
-        yield person_names
-    finally:
-        # Code to release resource, e.g.:
-        M.dump_resource('person_names')
-
-
-@contextmanager
-def get_resources(*names):
-    # Code to acquire resource, e.g.:
-    resources = [M.load_resource(name) for name in names]
-    try:
-        yield resources
-    finally:
-        # Code to release resource, e.g.:
-        for name in names:
-            M.dump_resource(name)
+MODEL = "en_core_web_sm"
+# Only the entity recognizer is used
+UNUSED_PIPES = ('tagger', 'parser', 'attribute_ruler', 'lemmatizer', 'senter')
+DEFAULT_CACHE = ROOT_DIR / 'mapping/classifications.sqlite3'
+
+
+@lru_cache(maxsize=None)
+def get_nlp():
+    """Returns the spaCy pipeline, loading it on the first call."""
+    import spacy
+
+    nlp = spacy.load(MODEL)
+    nlp.select_pipes(disable=[pipe for pipe in UNUSED_PIPES if pipe in nlp.pipe_names])
+    return nlp
+
+
+class ClassificationCache:
+    """Whether names are of a person or an organization, kept in a SQLite database.
+
+    Every decision is written as soon as it is made, so nothing is lost if a run
+    stops, and the whole store is read once into a dict for the lookups. A new store
+    starts with the names of `mapping/person_names.pickle` and `mapping/org_names.pickle`.
+    The names found to be neither are kept as `NONE`, so they are not recognized again.
+
+    Examples:
+        >>> cache = ClassificationCache(':memory:', pickle_dir=None)
+        >>> cache.add('Taiwan', 'ORG', 'manual')
+        >>> cache.add('Hamlet', ClassificationCache.NONE, 'ner')
+        >>> cache.get('Taiwan'), cache.get('Hamlet'), 'Hamlet' in cache, 'Fredric March' in cache
+        ('ORG', None, True, False)
+    """
+    KINDS = ('PERSON', 'ORG')
+    NONE = 'NONE'
+
+    def __init__(self, path: typing.Union[str, Path] = DEFAULT_CACHE, *,
+                 pickle_dir: typing.Optional[Path] = ROOT_DIR / 'mapping'):
+        """
+        Args:
+            path: The SQLite database to keep the decisions in.
+            pickle_dir: The folder of the pickled name lists imported into a new store.
+        """
+        self.connection = sqlite3.connect(str(path))
+        self.connection.execute('CREATE TABLE IF NOT EXISTS classification '
+                                '(name TEXT PRIMARY KEY, kind TEXT NOT NULL, source TEXT NOT NULL)')
+        self.kinds: typing.Dict[str, str] = dict(self.connection.execute('SELECT name, kind FROM classification'))
+        if not self.kinds and pickle_dir is not None:
+            self._import_pickles(Path(pickle_dir))
+
+    def _import_pickles(self, pickle_dir: Path) -> None:
+        for name, kind in (('org_names', 'ORG'), ('person_names', 'PERSON')):
+            try:
+                with open(pickle_dir / f'{name}.pickle', 'rb') as file:
+                    names = pickle.load(file)
+            except FileNotFoundError:
+                continue
+            self.add_many(dict.fromkeys(names, kind), 'imported')
+
+    def get(self, name: str) -> typing.Optional[str]:
+        """Returns 'PERSON', 'ORG' or None if `name` is neither or was never classified."""
+        kind = self.kinds.get(name)
+        return None if kind == self.NONE else kind
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.kinds
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def add(self, name: str, kind: str, source: str) -> None:
+        """Records that `name` is of `kind`, or `NONE`, as decided by `source`, e.g. 'ner' or 'manual'."""
+        self.add_many({name: kind}, source)
+
+    def add_many(self, kinds: typing.Dict[str, str], source: str) -> None:
+        for kind in set(kinds.values()):
+            if kind not in self.KINDS and kind != self.NONE:
+                raise ValueError(f"kind must be one of {self.KINDS} or '{self.NONE}', got '{kind}'")
+        with self.connection:
+            self.connection.executemany('INSERT OR REPLACE INTO classification VALUES (?, ?, ?)',
+                                        ((name, kind, source) for name, kind in kinds.items()))
+        self.kinds.update(kinds)
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+@lru_cache(maxsize=None)
+def get_classification_cache() -> ClassificationCache:
+    """Returns the classification cache at `DEFAULT_CACHE`, opening it on the first call."""
+    return ClassificationCache()
+
+
+def get_entity_labels(texts: typing.Iterable[str],
+                      *,
+                      batch_size: int = 256,
+                      n_process: int = 1) -> typing.Dict[str, typing.Tuple[str, ...]]:
+    """Returns the labels of the entities found in each distinct text, in order.
+
+    The texts are run through `nlp.pipe` in batches of `batch_size` by `n_process` processes.
+    """
+    texts = list(dict.fromkeys(texts))
+    docs = get_nlp().pipe(texts, batch_size=batch_size, n_process=n_process)
+    return {text: tuple(ent.label_ for ent in doc.ents) for text, doc in zip(texts, docs)}
+
+
+def _first_kind(labels: typing.Iterable[str]) -> typing.Optional[str]:
+    return next((label for label in labels if label in ClassificationCache.KINDS), None)
+
+
+def classify_names(names: typing.Iterable[str],
+                   *,
+                   batch_size: int = 256,
+                   n_process: int = 1,
+                   cache: ClassificationCache = None) -> typing.Dict[str, typing.Optional[str]]:
+    """Returns 'PERSON' or 'ORG' for each name like `categorize`, or None if no such entity is found.
+
+    Unlike `categorize`, the names are recognized in batches and nothing is asked.
+    Only the names missing from `cache` are recognized, and what is found is added to it,
+    including the names that are neither.
+
+    Args:
+        cache: Defaults to `get_classification_cache()`.
+    """
+    if cache is None:
+        cache = get_classification_cache()
+    kinds = {name: cache.get(name) for name in names}
+    unknown = [name for name in kinds if name not in cache]
+    if unknown:
+        found = {}
+        for name, labels in get_entity_labels(unknown, batch_size=batch_size, n_process=n_process).items():
+            kinds[name] = _first_kind(labels)
+            found[name] = cache.NONE if kinds[name] is None else kinds[name]
+        cache.add_many(found, 'ner')
+    return kinds
+
+
+def _both_persons(s1: str, s2: str, cache: ClassificationCache) -> bool:
+    return cache.get(s1) == 'PERSON' and cache.get(s2) == 'PERSON'
+
+
+def _pick_known(s1: str, s2: str, cache: ClassificationCache) -> typing.Optional[str]:
+    """Returns the one of `s1` and `s2` that is not a person according to `cache`,
+    or None if unknown or if both are persons.
+    """
+    person1 = cache.get(s1) == 'PERSON'
+    person2 = cache.get(s2) == 'PERSON'
+    if person1 == person2:
+        return None
+    return s2 if person1 else s1
+
+
+def pick_not_person_names(pairs: typing.Iterable[typing.Tuple[str, str]],
+                          *,
+                          batch_size: int = 256,
+                          n_process: int = 1,
+                          cache: ClassificationCache = None) -> typing.List[typing.Optional[str]]:
+    """Returns the one of each pair that is not a person's name like `get_not_person_name`,
+    or None if no person is known or recognized in either of them, or if both are known persons.
+
+    The names of the pairs not decided by `cache` that are missing from it are recognized
+    in one `get_entity_labels` call and added to it. Nothing is asked.
+
+    Args:
+        cache: Defaults to `get_classification_cache()`.
+    """
+    if cache is None:
+        cache = get_classification_cache()
+    pairs = list(pairs)
+    picks = [_pick_known(s1, s2, cache) for s1, s2 in pairs]
+    # A pair of two known names, e.g. two persons, is left as None, recognizing them again would not tell more
+    unknown = [s for (s1, s2), pick in zip(pairs, picks) if pick is None for s in (s1, s2) if s not in cache]
+    if not unknown:
+        return picks
+
+    labels = get_entity_labels(unknown, batch_size=batch_size, n_process=n_process)
+    cache.add_many({s: 'PERSON' if 'PERSON' in s_labels else _first_kind(s_labels) or cache.NONE
+                    for s, s_labels in labels.items()}, 'ner')
+    return [_pick_known(s1, s2, cache) if pick is None else pick for (s1, s2), pick in zip(pairs, picks)]
 
 
 def categorize(s: str) -> typing.Tuple[str, str]:
-    doc = nlp(s)
+    cache = get_classification_cache()
+    kind = cache.get(s)
+    if kind is not None:
+        return kind, s
+
+    doc = get_nlp()(s)
     for ent in doc.ents:
-        if ent.label_ == 'PERSON':
-            person = ent.text
-            return 'PERSON', s
-        elif ent.label_ == 'ORG':
-            organization = ent.text
-            return 'ORG', s
+        if ent.label_ in ClassificationCache.KINDS:
+            cache.add(s, ent.label_, 'ner')
+            return ent.label_, s
         print(ent.text, ent.start_char, ent.end_char, ent.label_)
 
-    with get_resources('person_names', 'org_names') as (person_names, org_names):
-        if s in person_names:
-            return 'PERSON', s
-        if s in org_names:
-            return 'ORG', s
-
-        res = input(f"Is '{s}' a person or an organization? (1/2) or replace ('r'): ")
-        if res == '1':
-            person_names.append(s)
-            return 'PERSON', s
-        if res == '2':
-            org_names.append(s)
-            return 'ORG', s
-        if res == 'r':
-            repl = input("Replace with: ")
-            return categorize(repl)
+    res = input(f"Is '{s}' a person or an organization? (1/2) or replace ('r'): ")
+    if res == '1':
+        cache.add(s, 'PERSON', 'manual')
+        return 'PERSON', s
+    if res == '2':
+        cache.add(s, 'ORG', 'manual')
+        return 'ORG', s
+    if res == 'r':
+        repl = input("Replace with: ")
+        return categorize(repl)
 
 
 def get_not_person_name(s1: str, s2: str) -> str:
     """ Returns one of the two inputs that are not people names. """
     if s1 is None or s2 is None:
         raise TypeError(f"s1 and s2 must be str, not {s1} {s2}")
-    person = None
-    doc = nlp(s1)
-    for ent in doc.ents:
-        if ent.label_ == 'PERSON':
-            person = ent.text
-        print(ent.text, ent.start_char, ent.end_char, ent.label_)
-    if person is not None:
+    cache = get_classification_cache()
+    if _both_persons(s1, s2, cache):
+        raise ValueError(f"Both '{s1}' and '{s2}' are names")
+    known = _pick_known(s1, s2, cache)
+    if known is not None:
+        return known
+
+    for person, other in ((s1, s2), (s2, s1)):
+        doc = get_nlp()(person)
+        for ent in doc.ents:
+            print(ent.text, ent.start_char, ent.end_char, ent.label_)
+        if any(ent.label_ == 'PERSON' for ent in doc.ents):
+            cache.add(person, 'PERSON', 'ner')
+            return other
+
+    res = input(f"Choose between '{s1}' or '{s2}' as the person (1/2): ")
+    if res == '1':
+        cache.add(s1, 'PERSON', 'manual')
         return s2
-
-    doc = nlp(s2)
-    for ent in doc.ents:
-        if ent.label_ == 'PERSON':
-            person = ent.text
-        print(ent.text, ent.start_char, ent.end_char, ent.label_)
-    if person is not None:
+    if res == '2':
+        cache.add(s2, 'PERSON', 'manual')
         return s1
-
-    with get_resources('person_names') as person_names:
-        if s1 in person_names:
-            if s2 not in person_names:
-                return s2
-            else:
-                raise ValueError(f"Both '{s1}' and '{s2}' are names")
-        elif s2 in person_names:
-            return s1
-        else:
-            res = input(f"Choose between '{s1}' or '{s2}' as the person (1/2): ")
-            if res == '1':
-                person_names.append(s1)
-                return s2
-            if res == '2':
-                person_names.append(s2)
-                return s1
-        # raise ValueError(f"IDK who is a person! between {s1} and {s2}")
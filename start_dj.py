@@ -1,9 +1,22 @@
 import os
+import sys
 
 from django.apps import apps
 from django.conf import settings
 
+from dirs import ROOT_DIR
 
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mao_dj.mysite.settings")
-if not apps.loading:
-    apps.populate(settings.INSTALLED_APPS)
+
+def start_django_lite(database: str = None) -> None:
+    """Loads the models of the Django app so they can be used outside of `manage.py`.
+
+    Args:
+        database: The SQLite database to use instead of the one in the settings, e.g. ':memory:'.
+    """
+    if str(ROOT_DIR / 'mao_dj') not in sys.path:
+        sys.path.append(str(ROOT_DIR / 'mao_dj'))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mao_dj.mysite.settings")
+    if database is not None:
+        settings.DATABASES['default']['NAME'] = database
+    if not apps.ready and not apps.loading:
+        apps.populate(settings.INSTALLED_APPS)
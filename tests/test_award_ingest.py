@@ -0,0 +1,115 @@
+import unittest
+from unittest import mock
+
+from django.core.management import call_command
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from start_dj import start_django_lite
+
+start_django_lite(':memory:')
+
+from app import models
+from autogen_db_models.awards import Bafta, Oscar
+from autogen_db_models.awards.base import Base
+import award_ingest
+from award_ingest import ORG, PERSON, SkippedRow, add_awards, classify_agents
+from spacy_nlp import ClassificationCache
+
+FILMS = [
+    ('tt0108052', "Schindler's List", 1993),
+    ('tt0190332', 'Crouching Tiger, Hidden Dragon', 2000),
+]
+
+OSCARS = [
+    # ceremony, year_film, category, name, film, winner
+    (66, 1993, 'DIRECTING', 'Steven Spielberg', "Schindler's List", True),
+    (66, 1993, 'BEST PICTURE', 'Steven Spielberg, Gerald R. Molen and Branko Lustig', "Schindlers List", True),
+    (73, 2000, 'FOREIGN LANGUAGE FILM', 'Taiwan', 'Crouching Tiger, Hidden Dragon', True),
+    (73, 2000, 'DIRECTING', 'Steven Soderbergh', 'Traffic', True),
+    (73, 2000, 'NOT A CATEGORY', 'Someone', 'Crouching Tiger, Hidden Dragon', False),
+]
+
+BAFTAS = [
+    # year, category, nominee, workers, winner
+    (1994, 'Film | Director in 1994', 'Steven Spielberg', "Schindler's List", True),
+    (1994, 'Film | Film in 1994', "Schindler's List", 'Steven Spielberg, Gerald R. Molen, Branko Lustig', True),
+    (2001, 'Film | Film Not in the English Language in 2001', 'Crouching Tiger, Hidden Dragon', None, True),
+    (2001, 'Film | Film in 2001', 'Gladiator', 'Douglas Wick, David Franzoni, Branko Lustig', True),
+]
+
+
+def setUpModule():
+    call_command('migrate', 'app', verbosity=0)
+
+
+class TestAwardIngest(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.session.add_all(Oscar(year_film=year, year_ceremony=year + 1, ceremony=ceremony, category=category,
+                                   name=name, film=film, winner=winner)
+                             for ceremony, year, category, name, film, winner in OSCARS)
+        self.session.add_all(Bafta(year=year, category=category, nominee=nominee, workers=workers, winner=winner)
+                             for year, category, nominee, workers, winner in BAFTAS)
+        self.session.commit()
+        for model_cls in (models.NominationSituation, models.AwardCeremony, models.AwardCategory,
+                          models.Award, models.Agent, models.Film):
+            model_cls.objects.all().delete()
+        self.films = [models.Film.objects.create(t_const=tconst, hasTitle=title, hasInitialReleaseYear=year)
+                      for tconst, title, year in FILMS]
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def test_classify_agents(self):
+        kinds = classify_agents(['Taiwan', 'Steven Spielberg', 'Walt Disney'],
+                                known={'Taiwan': ORG},
+                                classify=lambda names: {'Steven Spielberg': PERSON},
+                                default_kind=None)
+        self.assertEqual({'Taiwan': ORG, 'Steven Spielberg': PERSON, 'Walt Disney': None}, kinds)
+
+    def test_load_agent_kinds(self):
+        cache = ClassificationCache(':memory:', pickle_dir=None)
+        cache.add_many({'Taiwan': ORG, 'Gladiator': ClassificationCache.NONE}, 'ner')
+        with mock.patch.object(award_ingest, 'get_classification_cache', return_value=cache):
+            # The names that are neither are left to `classify`, which finds them in the cache too
+            self.assertEqual({'Taiwan': ORG}, award_ingest.load_agent_kinds())
+        cache.close()
+
+    def test_add_awards(self):
+        report = add_awards(self.session, verbose=0, known={}, classify=lambda names: {'Taiwan': ORG})
+        self.assertEqual(5, report.nominations)
+        self.assertEqual([SkippedRow('oscar', 4, 'no matching film'),
+                          SkippedRow('oscar', 5, "unknown category 'NOT A CATEGORY'"),
+                          SkippedRow('bafta', 3, 'no nominee'),
+                          SkippedRow('bafta', 4, 'no matching film')], report.skipped)
+
+        self.assertEqual(5, models.NominationSituation.objects.count())
+        self.assertEqual([('BAFTA', 46, 1994, 1993), ('Oscars', 66, 1994, 1993), ('Oscars', 73, 2001, 2000)],
+                         sorted(models.AwardCeremony.objects.values_list('hasAward__hasNickname', 'hasEditionNumber',
+                                                                         'yearHeld', 'yearScreened')))
+        schindler = models.NominationSituation.objects.filter(forFilm=self.films[0])
+        self.assertEqual({'Best Director', 'Best Picture', 'Director', 'Film'},
+                         {nom.hasAwardCategory.label for nom in schindler})
+        # The same nominee is the same agent in both awards
+        self.assertEqual(1, models.Person.objects.filter(hasName='Steven Spielberg').count())
+        self.assertEqual(['Taiwan'], [org.hasName for org in models.Organization.objects.all()])
+
+        # Adding them again changes nothing
+        report = add_awards(self.session, verbose=0, known={}, classify=lambda names: {'Taiwan': ORG})
+        self.assertEqual(5, report.nominations)
+        self.assertEqual(5, models.NominationSituation.objects.count())
+
+    def test_add_awards_unknown_nominee(self):
+        report = add_awards(self.session, awards_to_add=('Oscars',), verbose=0, known={},
+                            classify=lambda names: {'Taiwan': ORG}, default_kind=None)
+        self.assertEqual(1, report.nominations)
+        self.assertEqual(4, len(report.skipped))
+
+
+if __name__ == '__main__':
+    unittest.main()
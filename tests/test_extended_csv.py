@@ -1,7 +1,15 @@
 import unittest
+from doctest import DocTestSuite
+from io import StringIO
 
+import extended_csv
 from dirs import ROOT_DIR
-from extended_csv import read_xsv_file
+from extended_csv import read_xsv, read_xsv_file, read_xsv_file_batches
+
+
+def load_tests(loader: unittest.TestLoader, tests: unittest.TestSuite, ignore) -> unittest.TestSuite:
+    tests.addTests(DocTestSuite(extended_csv))
+    return tests
 
 
 class TestExtendedCsv(unittest.TestCase):
@@ -18,6 +26,21 @@ class TestExtendedCsv(unittest.TestCase):
             with self.subTest(f"{file=},{to_read=},{read=},{skip=}"):
                 result = read_xsv_file(ROOT_DIR / f'tests/data/csv/{file}', dialect='excel', load_at_most=to_read, discard=skip)
                 self.assertEqual(read, len(result))
+                batches = list(read_xsv_file_batches(ROOT_DIR / f'tests/data/csv/{file}', dialect='excel',
+                                                     load_at_most=to_read, discard=skip, batch_size=7))
+                self.assertEqual(read, sum(map(len, batches)))
+                self.assertTrue(all(len(batch) == 7 for batch in batches[:-1]))
+                self.assertEqual(result, [row for batch in batches for row in batch.to_dicts()])
+
+    def test_read_xsv_irregular_rows(self):
+        text = 'a,b\n1,2\n\n3\n4,5,6,7\n'
+        self.assertEqual([
+            {'a': '1', 'b': '2'},
+            {'a': '3', 'b': None},
+            {'a': '4', 'b': '5', None: ['6', '7']},
+        ], list(read_xsv(StringIO(text), 'excel')))
+        self.assertEqual({'Column 1': 'a', 'Column 2': 'b'},
+                         next(iter(read_xsv(StringIO(text), 'excel', first_line_is_column_header=False))))
 
 
 if __name__ == '__main__':
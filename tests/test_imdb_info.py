@@ -0,0 +1,143 @@
+import unittest
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from start_dj import start_django_lite
+
+start_django_lite(':memory:')
+
+import add_individuals
+from app import models
+from autogen_db_models.imdb import ProductionCompanies, TitleAkas, TitleBasics
+from autogen_db_models.imdb.base import Base
+from imdb_info import ImdbInfo, fetch_imdb_info
+
+TITLE_BASICS = [
+    ('tt0108052', "Schindler's List", 0, 1993, '195', 'Biography,Drama,History'),
+    ('tt0190332', 'Wo hu cang long', 0, 2000, '120', 'Action,Adventure,Fantasy'),
+    ('tt0120338', 'Titanic', 0, 1997, '\\N', None),
+    ('tt0046435', 'Titanic', 1, 1953, '98', 'Drama'),
+]
+
+TITLE_AKAS = [
+    ('tt0108052', 1, "Schindler's List", 1),
+    ('tt0190332', 1, 'Wo hu cang long', 1),
+    ('tt0190332', 2, 'Crouching Tiger, Hidden Dragon', 0),
+    ('tt0120338', 1, 'Titanic', 1),
+    ('tt0046435', 1, 'Titanic', 1),
+]
+
+PRODUCTION_COMPANIES = [
+    ("Schindler's List", 1993, 'Amblin Entertainment', 'us'),
+    ('Crouching Tiger, Hidden Dragon', 2000, 'Sony Pictures Classics', 'us'),
+    ('Wo hu cang long', 2000, 'Asia Union Film & Entertainment Ltd.', None),
+    ('Wo hu cang long', 2000, 'China Film Co-Production Corporation', 'cn'),
+    ('Wo hu cang long', 2000, 'Columbia Pictures Film Production Asia', 'hk'),
+    ('Titanic', 1997, 'Twentieth Century Fox', 'us'),
+    ('Titanic', 1953, 'Twentieth Century Fox', 'us'),
+    ('Titanic', 1943, 'Tobis Filmkunst', 'de'),
+]
+
+
+def setUpModule():
+    call_command('migrate', 'app', verbosity=0)
+
+
+class ImdbTablesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+        Base.metadata.create_all(self.engine, tables=[TitleAkas.__table__, TitleBasics.__table__,
+                                                      ProductionCompanies.__table__])
+        self.session = sessionmaker(bind=self.engine)()
+        self.session.add_all(TitleBasics(tconst=tconst, titleType='movie', primaryTitle=title, originalTitle=title,
+                                         isAdult=is_adult, startYear=year, runtimeMinutes=runtime, genres=genres)
+                             for tconst, title, is_adult, year, runtime, genres in TITLE_BASICS)
+        self.session.add_all(TitleAkas(titleId=tconst, ordering=ordering, title=title, isOriginalTitle=original)
+                             for tconst, ordering, title, original in TITLE_AKAS)
+        self.session.add_all(ProductionCompanies(title=title, year=year, production_company=company,
+                                                 country_code=country_code)
+                             for title, year, company, country_code in PRODUCTION_COMPANIES)
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+
+class TestFetchImdbInfo(ImdbTablesTestCase):
+
+    def test_fetch_imdb_info(self):
+        infos = fetch_imdb_info(self.session, ['tt0108052', 'tt0190332', 'tt0120338', 'tt0046435', 'tt9999999'],
+                                batch_size=3)
+        self.assertEqual({
+            'tt0108052': ImdbInfo('tt0108052', False, 195, ['Biography', 'Drama', 'History'], 'us'),
+            # Only the companies of the original title count
+            'tt0190332': ImdbInfo('tt0190332', False, 120, ['Action', 'Adventure', 'Fantasy'], 'cn'),
+            'tt0120338': ImdbInfo('tt0120338', False, None, [], 'us'),
+            'tt0046435': ImdbInfo('tt0046435', True, 98, ['Drama'], 'us'),
+        }, infos)
+
+    def test_fetch_imdb_info_empty(self):
+        self.assertEqual({}, fetch_imdb_info(self.session, []))
+
+
+class TestAddImdbInfo(ImdbTablesTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for model_cls in (models.Film, models.Genre, models.Country):
+            model_cls.objects.all().delete()
+        self.us = models.Country.objects.create(label='United States of America', alpha_2='US', alpha_3='USA')
+        self.taiwan = models.Country.objects.create(label='Taiwan', alpha_2='TW', alpha_3='TWN')
+
+    def add_imdb_info(self, **kwargs) -> int:
+        with mock.patch.object(add_individuals, 'Session', return_value=self.session):
+            return add_individuals.add_imdb_info(verbose=0, **kwargs)
+
+    def create_films(self, tconsts) -> None:
+        models.Film.objects.all().delete()
+        # No country has the code of the production company of Wo hu cang long, so it keeps this one
+        models.Film.objects.bulk_create(models.Film(t_const=tconst, hasCountryOfOrigin=self.taiwan)
+                                        for tconst in tconsts)
+
+    def test_add_imdb_info(self):
+        self.create_films(['tt0108052', 'tt0190332', 'tt0046435', 'tt9999999'])
+        self.assertEqual(3, self.add_imdb_info(batch_size=2))
+        films = {film.t_const: film for film in models.Film.objects.all()}
+        schindler = films['tt0108052']
+        self.assertEqual((False, 195, self.us),
+                         (schindler.isAdult, schindler.hasFeatureLengthInMinutes, schindler.hasCountryOfOrigin))
+        self.assertEqual(self.taiwan, films['tt0190332'].hasCountryOfOrigin)
+        self.assertTrue(films['tt0046435'].isAdult)
+        self.assertIsNone(films['tt9999999'].isAdult)
+        self.assertEqual(['Biography', 'Drama', 'History'], sorted(genre.label for genre in schindler.hasGenre.all()))
+        self.assertEqual(['Drama'], [genre.label for genre in films['tt0046435'].hasGenre.all()])
+        self.assertEqual(6, models.Genre.objects.count())
+
+        # Adding them again changes nothing
+        self.assertEqual(3, self.add_imdb_info(batch_size=2))
+        self.assertEqual(3, schindler.hasGenre.count())
+        self.assertEqual(6, models.Genre.objects.count())
+
+    def count_queries(self, tconsts) -> int:
+        self.create_films(tconsts)
+        self.add_imdb_info()
+        # Again, once every film has a country
+        with CaptureQueriesContext(connection) as queries:
+            self.add_imdb_info()
+        return len(queries)
+
+    def test_queries_per_batch(self):
+        # The same number for a batch of 2 films as for a batch of 4
+        self.assertEqual(self.count_queries(['tt0108052', 'tt0190332']),
+                         self.count_queries(['tt0108052', 'tt0190332', 'tt0120338', 'tt0046435']))
+
+
+if __name__ == '__main__':
+    unittest.main()
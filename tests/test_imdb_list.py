@@ -1,8 +1,13 @@
+import tempfile
 import unittest
 from doctest import DocTestSuite
+from pathlib import Path
+
+import pandas as pd
 
 from sa_autowrite import parsers
-from sa_autowrite.parsers import parse_line_re
+from sa_autowrite.parsers import (find_data_range, parse_imdb_list, parse_imdb_list_fast, parse_imdb_list_parallel,
+                                  parse_line_fast, parse_line_re)
 
 
 def load_tests(loader: unittest.TestLoader, tests: unittest.TestSuite, ignore) -> unittest.TestSuite:
@@ -10,66 +15,137 @@ def load_tests(loader: unittest.TestLoader, tests: unittest.TestSuite, ignore) -
     return tests
 
 
+TEST_CASES = [
+    (
+        '"!Next?" (1994)\t\t\t\t\t\tItaly\n', {
+            'title': '!Next?',
+            'year': 1994,
+            'roman': None,
+            'type': None,
+            'episode_info': None,
+            'data': 'Italy',
+        }
+    ),
+    (
+        '"#15SecondScare" (2015)\t\t\t\t\tUSA\n', {
+            'title': '#15SecondScare',
+            'year': 2015,
+            'roman': None,
+            'type': None,
+            'episode_info': None,
+            'data': 'USA',
+        }
+    ),
+    (
+        '"#15SecondScare" (2015) {Because We Don\'t Want You to Fall Asleep (#1.3)}\tUSA\n', {
+            'title': '#15SecondScare',
+            'year': 2015,
+            'roman': None,
+            'type': None,
+            'episode_info': "Because We Don't Want You to Fall Asleep (#1.3)",
+            'data': 'USA',
+        }
+    ),
+    (
+        '"#1 Single" (2006) {Wingman (#1.6)}\t\t\tStick Figure Productions [us]\n', {
+            'title': '#1 Single',
+            'year': 2006,
+            'roman': None,
+            'type': None,
+            'episode_info': "Wingman (#1.6)",
+            'data': 'Stick Figure Productions [us]',
+        },
+    ),
+    (
+        '"#LoveMonkeyChocolateFlowers" (2014)\t\t\tUK:PG\n', {
+            'title': '#LoveMonkeyChocolateFlowers',
+            'year': 2014,
+            'roman': None,
+            'type': None,
+            'episode_info': None,
+            'data': 'UK:PG',
+        },
+    ),
+]
+
+PARITY_CASES = [
+    'Les Misérables (1998/II) (V)\t\tFrance\n',
+    '"18 Wheels of Justice" (2000) {(2000-03-29)}\t\tUSA\n',
+    '"1714. El preu de la llibertat" (2014) {{SUSPENDED}}\tSpain\n',
+    'Movie (1999) (2000)\t\tUSA\n',
+    'Movie (1999) (TV) {Part (2000)}\tUSA\n',
+    'Unknown (????/IV)\t\tUSA\n',
+    'Odd (2000) (TV)\tdata (2001)\tmore\n',
+    'Odd (2000) {Episode}\tdata}\tmore\n',
+    '"" (2000)\tUSA\n',
+    'Movie (2000) ()\tUSA\n',
+    'Movie (2000) {}\t\n',
+]
+
+LIST_FILE = (
+    '-' * 80 + '\n'
+    'COUNTRIES LIST\n'
+    '==============\n'
+    '"!Next?" (1994)\t\t\t\t\t\tItaly\n'
+    '"#15SecondScare" (2015)\t\t\t\t\tUSA\n'
+    '"#15SecondScare" (2015) {Because We Don\'t Want You to Fall Asleep (#1.3)}\tUSA\n'
+    '"#1 Single" (2006) {Wingman (#1.6)}\t\t\tUSA\n'
+    'Les Misérables (1998/II) (V)\t\tFrance\n'
+    'Unknown (????)\t\t\tUSA\n'
+    '"1714. El preu de la llibertat" (2014)\tSpain\n'
+    + '-' * 80 + '\n'
+)
+
+
+def _rows(chunks) -> list:
+    df = pd.concat(chunks, ignore_index=True).astype(object)
+    return df.where(df.notna(), None).values.tolist()
+
+
 class TestParsers(unittest.TestCase):
 
     def test_parse_line_re(self):
-        test_cases = [
-            (
-                '"!Next?" (1994)\t\t\t\t\t\tItaly\n', {
-                    'title': '!Next?',
-                    'year': 1994,
-                    'roman': None,
-                    'type': None,
-                    'episode_info': None,
-                    'data': 'Italy',
-                }
-            ),
-            (
-                '"#15SecondScare" (2015)\t\t\t\t\tUSA\n', {
-                    'title': '#15SecondScare',
-                    'year': 2015,
-                    'roman': None,
-                    'type': None,
-                    'episode_info': None,
-                    'data': 'USA',
-                }
-            ),
-            (
-                '"#15SecondScare" (2015) {Because We Don\'t Want You to Fall Asleep (#1.3)}\tUSA\n', {
-                    'title': '#15SecondScare',
-                    'year': 2015,
-                    'roman': None,
-                    'type': None,
-                    'episode_info': "Because We Don't Want You to Fall Asleep (#1.3)",
-                    'data': 'USA',
-                }
-            ),
-            (
-                '"#1 Single" (2006) {Wingman (#1.6)}\t\t\tStick Figure Productions [us]\n', {
-                    'title': '#1 Single',
-                    'year': 2006,
-                    'roman': None,
-                    'type': None,
-                    'episode_info': "Wingman (#1.6)",
-                    'data': 'Stick Figure Productions [us]',
-                },
-            ),
-            (
-                '"#LoveMonkeyChocolateFlowers" (2014)\t\t\tUK:PG\n', {
-                    'title': '#LoveMonkeyChocolateFlowers',
-                    'year': 2014,
-                    'roman': None,
-                    'type': None,
-                    'episode_info': None,
-                    'data': 'UK:PG',
-                },
-            ),
-        ]
-        for string, expected in test_cases:
+        for string, expected in TEST_CASES:
             with self.subTest(f"{string=},{expected=}"):
                 result = parse_line_re(string)
                 self.assertEqual(expected, result)
 
+    def test_parse_line_fast(self):
+        for string, expected in TEST_CASES:
+            with self.subTest(f"{string=},{expected=}"):
+                self.assertEqual(expected, parse_line_fast(string))
+        for string in PARITY_CASES:
+            with self.subTest(f"{string=}"):
+                self.assertEqual(parse_line_re(string), parse_line_fast(string))
+
+    def test_parse_imdb_list_fast(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            filename = Path(tempdir) / 'countries.list'
+            with open(filename, 'w', encoding='windows-1252') as f:
+                f.write(LIST_FILE)
+            expected = pd.concat(parse_imdb_list(filename, chunksize=2), ignore_index=True)
+            chunks = list(parse_imdb_list_fast(filename, chunksize=2, block_size=16))
+        self.assertEqual([2, 2, 2, 1], [len(chunk) for chunk in chunks])
+        # parse_imdb_list leaves out the last incomplete chunk
+        pd.testing.assert_frame_equal(expected, pd.concat(chunks[:-1], ignore_index=True))
+        self.assertEqual(['Spain', 2014, None], chunks[-1].loc[0, ['data', 'year', 'episode_info']].tolist())
+
+    def test_parse_imdb_list_parallel(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            filename = Path(tempdir) / 'countries.list'
+            with open(filename, 'w', encoding='windows-1252', newline='') as f:
+                f.write(LIST_FILE)
+            start, end = find_data_range(filename)
+            self.assertEqual(LIST_FILE.index('"!Next?"'), start)
+            self.assertEqual(len(LIST_FILE.encode('windows-1252')) - 81, end)
+            expected = list(parse_imdb_list_fast(filename, chunksize=3))
+            for workers in (1, 2):
+                with self.subTest(f"{workers=}"):
+                    chunks = list(parse_imdb_list_parallel(filename, chunksize=3, workers=workers, shard_size=40))
+                    self.assertEqual([3, 3, 1], [len(chunk) for chunk in chunks])
+                    # Only the dtypes may differ, since they are inferred per range instead of per chunk
+                    self.assertEqual(_rows(expected), _rows(chunks))
+
 
 if __name__ == '__main__':
     unittest.main()
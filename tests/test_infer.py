@@ -0,0 +1,78 @@
+import tempfile
+import unittest
+from doctest import DocTestSuite
+from io import StringIO
+from pathlib import Path
+
+import pandas as pd
+
+from dirs import ROOT_DIR
+from extended_csv import read_xsv_file, read_xsv_file_batches
+from sa_autowrite import infer
+from sa_autowrite.create import write_model, write_model_from_rows, write_models
+from sa_autowrite.infer import DistinctCounter, SchemaBuilder
+
+
+def load_tests(loader: unittest.TestLoader, tests: unittest.TestSuite, ignore) -> unittest.TestSuite:
+    tests.addTests(DocTestSuite(infer))
+    return tests
+
+
+class TestInfer(unittest.TestCase):
+
+    def test_same_as_table(self):
+        args = [
+            ('Nutrient', 'csv/nutrient-100.csv', {'pk_cols': ['id']}),
+            ('BrandedFood', 'csv/branded_food-10000.csv', {}),
+            ('SrLegacyFood', 'csv/sr_legacy_food-150.csv', {}),
+            ('FoodCategory', 'csv/food_category-28.csv', {}),
+        ]
+        for name, in_, options in args:
+            with self.subTest(f'{in_=}'):
+                data = read_xsv_file(ROOT_DIR / f'tests/data/{in_}', dialect='excel')
+                expected = StringIO()
+                write_model(expected, name, data, **options)
+                output = StringIO()
+                write_model_from_rows(output, name, iter(data), **options)
+                self.assertEqual(expected.getvalue(), output.getvalue())
+
+                builder = SchemaBuilder()
+                for batch in read_xsv_file_batches(ROOT_DIR / f'tests/data/{in_}', 'excel', batch_size=30):
+                    builder.add_batch(batch)
+                self.assertEqual(expected.getvalue(), builder.to_table(name, **options).as_python())
+
+    def test_sample(self):
+        rows = [{'n': str(i), 'text': 'x' * (i % 3)} for i in range(1, 1001)]
+        builder = SchemaBuilder(sample_size=50, seed=0)
+        builder.add_rows(rows)
+        self.assertEqual(50, len(builder.reservoir))
+        table = builder.to_table('Sample')
+        self.assertEqual(['_id', 'n', 'text'], [col.name for col in table.columns])
+        self.assertEqual('# unique: 1000, val = [0,999]', table.columns[0].comment)
+        self.assertIs(int, table.columns[1].type)
+        self.assertEqual(50, table.columns[1].summary.unique)
+
+    def test_distinct_estimate(self):
+        counter = DistinctCounter(threshold=1000)
+        for i in range(30_000):
+            counter.add(i % 20_000)
+        self.assertFalse(counter.is_exact)
+        self.assertAlmostEqual(20_000, len(counter), delta=20_000 * 0.03)
+
+    def test_write_models_streaming(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            in_directory = Path(tempdir) / 'in'
+            in_directory.mkdir()
+            pd.read_csv(ROOT_DIR / 'tests/data/csv/food_category-28.csv', dtype=str) \
+                .to_csv(in_directory / 'food_category.csv', index=False)
+            for streaming in (False, True):
+                out_directory = Path(tempdir) / f'out-{streaming}'
+                out_directory.mkdir()
+                write_models(in_directory, out_directory, streaming=streaming)
+            for name in ('food_category.py', '__init__.py', 'base.py'):
+                self.assertEqual((Path(tempdir) / 'out-False' / name).read_text(),
+                                 (Path(tempdir) / 'out-True' / name).read_text())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import tempfile
+import unittest
+from doctest import DocTestSuite
+from pathlib import Path
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.exc import IntegrityError
+
+from autogen_db_models.imdb import NameBasics, TitleAkas
+from sa_autowrite import ingest as ingest_module
+from sa_autowrite.ingest import imdb_jobs, ingest, prepare_table
+
+NAME_BASICS = (
+    'nconst\tprimaryName\tbirthYear\tdeathYear\tprimaryProfession\tknownForTitles\n'
+    'nm0000001\tFred Astaire\t1899\t1987\tsoundtrack,actor,miscellaneous\ttt0072308,tt0050419\n'
+    'nm0000002\tLauren Bacall\t1924\t2014\tactress,soundtrack\ttt0038355,tt0117057\n'
+    'nm0000003\tBrigitte Bardot\t1934\t\\N\tactress,soundtrack,music_department\ttt0054452,tt0049189\n'
+)
+
+TITLE_AKAS = (
+    'titleId\tordering\ttitle\tregion\tlanguage\ttypes\tattributes\tisOriginalTitle\n'
+    'tt0000001\t1\tKarmencita\tUS\t\\N\timdbDisplay\t\\N\t0\n'
+    'tt0000001\t2\tCarmencita\t\\N\t\\N\toriginal\t\\N\t1\n'
+)
+
+
+def load_tests(loader, tests, ignore):
+    tests.addTests(DocTestSuite(ingest_module))
+    return tests
+
+
+class TestIngest(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.folder = Path(self.tempdir.name)
+        (self.folder / 'name.basics.tsv').write_text(NAME_BASICS, encoding='utf-8')
+        (self.folder / 'title.akas.tsv').write_text(TITLE_AKAS, encoding='utf-8')
+        self.engine = create_engine(f"sqlite:///{self.folder / 'test.sqlite3'}")
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tempdir.cleanup()
+
+    def _count(self, model_cls) -> int:
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(model_cls.__table__)).scalar()
+
+    def test_ingest(self):
+        jobs = imdb_jobs(self.folder, [NameBasics, TitleAkas, TitleAkas], chunksize=2)
+        self.assertEqual(2, len(jobs))
+        progress = []
+        results = ingest(jobs, max_workers=2, drop_policy='drop', engine=self.engine,
+                         report=lambda *args: progress.append(args))
+        self.assertEqual({'name_basics': 3, 'title_akas': 2}, results)
+        self.assertEqual(3, self._count(NameBasics))
+        self.assertEqual(2, self._count(TitleAkas))
+        self.assertIn(('name_basics', 2, False), progress)
+        self.assertIn(('name_basics', 3, True), progress)
+
+        # The rows are kept, so loading the same keys again fails
+        with self.assertRaises(IntegrityError):
+            ingest(jobs[:1], max_workers=1, drop_policy='keep', engine=self.engine, report=lambda *args: None)
+        self.assertEqual(3, self._count(NameBasics))
+        ingest(jobs, max_workers=1, drop_policy='delete', engine=self.engine, report=lambda *args: None)
+        self.assertEqual(3, self._count(NameBasics))
+        self.assertEqual(2, self._count(TitleAkas))
+
+    def test_missing_file(self):
+        self.assertRaises(FileNotFoundError, imdb_jobs, self.folder)
+
+    def test_invalid_drop_policy(self):
+        self.assertRaises(ValueError, prepare_table, NameBasics, 'truncate', self.engine)
+        jobs = imdb_jobs(self.folder, [NameBasics])
+        self.assertRaises(ValueError, ingest, jobs + jobs, engine=self.engine)
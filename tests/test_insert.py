@@ -0,0 +1,135 @@
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import Column, Date, Float, Integer, String, create_engine
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import sessionmaker
+
+from autogen_db_models.imdb import TitleAkas
+from autogen_db_models.imdb.base import Base
+from sa_autowrite.checkpoint import XsvChunkReader, load_checkpoint, save_checkpoint
+from sa_autowrite.convert import convert_chunk
+from sa_autowrite.insert import insert_xsv_data
+
+TITLE_AKAS = (
+    'titleId\tordering\ttitle\tregion\tlanguage\ttypes\tattributes\tisOriginalTitle\n'
+    'tt0000001\t1\tKarmencita\tUS\t\\N\timdbDisplay\t\\N\t0\n'
+    'tt0000001\t2\tCarmencita\t\\N\t\\N\toriginal\t\\N\t1\n'
+    'tt0000002\t1\tLe clown et ses chiens\tFR\t\\N\timdbDisplay\t\\N\t\\N\n'
+    'tt0000002\t2\tThe Clown and His Dogs\tUS\t\\N\t\\N\tliteral English title\t0\n'
+)
+
+
+class TestInsert(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.filename = Path(self.tempdir.name) / 'title.akas.tsv'
+        with open(self.filename, 'w', encoding='utf-8') as f:
+            f.write(TITLE_AKAS)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def _insert(self, **kwargs) -> list:
+        engine = create_engine('sqlite://')
+        Base.metadata.create_all(engine, tables=[TitleAkas.__table__])
+        session = sessionmaker(bind=engine)()
+        insert_xsv_data(self.filename, TitleAkas, chunksize=2,
+                        null_values=['\\N'], ignore_cols=['_id'],
+                        skip_rows_data=0, verbose=0, session=session, **kwargs)
+        rows = session.execute(TitleAkas.__table__.select().order_by('titleId', 'ordering')).fetchall()
+        session.close()
+        return [tuple(row) for row in rows]
+
+    def test_bulk_matches_orm(self):
+        expected = self._insert()
+        self.assertEqual(4, len(expected))
+        self.assertEqual(('tt0000001', 2, 'Carmencita', None, None, 'original', None, 1), expected[1])
+        self.assertEqual(expected, self._insert(bulk=True))
+
+    def test_resume_from_checkpoint(self):
+        expected = self._insert()
+        checkpoint = Path(self.tempdir.name) / 'title_akas.json'
+        engine = create_engine('sqlite://')
+        Base.metadata.create_all(engine, tables=[TitleAkas.__table__])
+        session = sessionmaker(bind=engine)()
+
+        def crash(rows):
+            raise KeyboardInterrupt
+
+        kwargs = dict(chunksize=2, null_values=['\\N'], ignore_cols=['_id'],
+                      skip_rows_data=0, verbose=0, session=session, checkpoint=checkpoint)
+        with self.assertRaises(KeyboardInterrupt):
+            insert_xsv_data(self.filename, TitleAkas, on_commit=crash, **kwargs)
+        saved = load_checkpoint(checkpoint)
+        self.assertEqual(('title_akas', 'title.akas.tsv', 2), (saved.table, saved.filename, saved.rows))
+
+        self.assertEqual(4, insert_xsv_data(self.filename, TitleAkas, **kwargs))
+        self.assertFalse(checkpoint.exists())
+        rows = session.execute(TitleAkas.__table__.select().order_by('titleId', 'ordering')).fetchall()
+        self.assertEqual(expected, [tuple(row) for row in rows])
+
+        save_checkpoint(checkpoint, saved._replace(table='name_basics'))
+        self.assertRaises(ValueError, insert_xsv_data, self.filename, TitleAkas, **kwargs)
+        session.close()
+
+    def test_chunk_reader(self):
+        reader = XsvChunkReader(self.filename, chunksize=2, encoding='utf-8', dialect='excel-tab', skip_rows=1,
+                                read_options={'dtype': str})
+        chunks = list(reader)
+        self.assertEqual([2, 1], [len(chunk) for chunk in chunks])
+        expected = pd.read_csv(self.filename, dialect='excel-tab', dtype=str).iloc[1:].reset_index(drop=True)
+        pd.testing.assert_frame_equal(expected, pd.concat(chunks, ignore_index=True))
+        self.assertTrue(reader.done)
+        self.assertEqual(self.filename.stat().st_size, reader.offset)
+
+
+FoodBase = declarative_base()
+
+
+class Food(FoodBase):
+    __tablename__ = 'test_food'
+
+    _id = Column(Integer, primary_key=True)
+    description = Column(String)
+    amount = Column(Float)
+    publication_date = Column(Date)
+
+
+class TestConvert(unittest.TestCase):
+
+    def test_convert_chunk(self):
+        chunk = pd.DataFrame({
+            '_id': ['1', '2', '3'],
+            'description': ['Apple', '\\N', '0042'],
+            'amount': ['1.5', '2', '\\N'],
+            'publication_date': ['2019-04-01', '4/1/2019', '\\N'],
+        }, dtype=str)
+        expected = [
+            {'_id': 1, 'description': 'Apple', 'amount': 1.5, 'publication_date': date(2019, 4, 1)},
+            {'_id': 2, 'description': None, 'amount': 2.0, 'publication_date': date(2019, 4, 1)},
+            {'_id': 3, 'description': '0042', 'amount': None, 'publication_date': None},
+        ]
+        self.assertEqual(expected, convert_chunk(Food, chunk, null_values=['\\N']))
+
+    def test_convert_chunk_invalid(self):
+        chunk = pd.DataFrame({'_id': ['1', 'x'], 'description': ['a', 'b'], 'amount': ['1', '2'],
+                              'publication_date': ['2019-04-01', '2019-04-02']}, dtype=str)
+        with self.assertRaises(ValueError):
+            convert_chunk(Food, chunk)
+
+    def test_convert_chunk_not_int(self):
+        for value in ['1.5', '1.0', '9223372036854775808']:
+            with self.subTest(value=value):
+                chunk = pd.DataFrame({'_id': ['1', value], 'description': ['a', 'b'], 'amount': ['1', '2'],
+                                      'publication_date': ['2019-04-01', '2019-04-02']}, dtype=str)
+                with self.assertRaisesRegex(ValueError, f"'_id'.*'{value}'"):
+                    convert_chunk(Food, chunk)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,19 +1,53 @@
+import tempfile
 import unittest
+from doctest import DocTestSuite
 from pathlib import Path
 import os
-from unittest import TestCase
+from unittest import TestCase, mock
+
+import yaml
+from owlready2 import World
+from rdflib import BNode, Graph
 from dirs import ROOT_DIR
 
-from ontogen import Ontology, OwlIndividual
-from ontogen.actualizers.owlready2 import cleanup
+from ontogen import Ontology, OwlIndividual, open_world
+from ontogen.actualizers.owlready2 import Owlready2Actualizer, cleanup
+from ontogen.actualizers.schedule import schedule
+from ontogen.base.vars import GENERATED_TYPES
+from ontogen import manifest as manifest_module
+from ontogen import specs as specs_module
+from ontogen.base import index as index_module
+from ontogen.base.index import EntityIndex
+from ontogen.base import namespaces
+from ontogen.base.namespaces import WELL_KNOWN_PREFIXES, PrefixRegistry, build_prefixes, lookup_iri
 from ontogen.converter import OntogenConverter
-from ontogen.primitives import OwlClass, OwlObjectProperty, OwlAnnotationProperty
+from ontogen.manifest import EntityManifest
+from ontogen.primitives import OwlClass, OwlDataProperty, OwlObjectProperty, OwlAnnotationProperty
 from ontogen.primitives.datatypes import Datatype
-from ontogen.utils.classexp import ClassExpToConstruct
+from ontogen.primitives.errors import OntologyConsistencyError
+from ontogen.utils import classexp
+from ontogen.utils.classexp import ClassExpToConstruct, parse_class_expression
 
 from settings import OWL_FILEPATH, OUT_PATH, OUT_FILENAME
 
 
+def load_tests(loader: unittest.TestLoader, tests: unittest.TestSuite, ignore) -> unittest.TestSuite:
+    tests.addTests(DocTestSuite(manifest_module))
+    tests.addTests(DocTestSuite(classexp))
+    tests.addTests(DocTestSuite(specs_module))
+    tests.addTests(DocTestSuite(index_module))
+    tests.addTests(DocTestSuite(namespaces))
+    return tests
+
+
+def close_world(world: World):
+    """Closes a World, after forgetting the types generated in it for the other tests"""
+    for name, generated in list(GENERATED_TYPES.items()):
+        if getattr(generated, 'namespace', None) is not None and generated.namespace.world is world:
+            del GENERATED_TYPES[name]
+    world.close()
+
+
 def count_files(directory: str) -> int:
     return len([name for name in os.listdir(directory)
                 if os.path.isfile(os.path.join(directory, name))])
@@ -114,11 +148,353 @@ class TestOntogenFamily(TestCase):
         self.assertEqual("http://www.co-ode.org/ontologies/pizza/pizza.owl#", onto.base_iri)
         onto.save_to_file("out/pizza.owl")
 
+    def test_schedule(self):
+        world = open_world()
+        converter = OntogenConverter.load_from_spec(ROOT_DIR / f"tests/specs/{SPEC_VERSION}/test_case1.yaml",
+                                                    world=world)
+        names = [entity.name for entity in schedule(converter.ontology)]
+        self.assertEqual(len(set(names)), len(names))
+        for dependency, entity in [("Food", "Pizza"), ("Pizza", "NamedPizza"), ("NamedPizza", "Margherita"),
+                                   ("PizzaTopping", "MozzarellaTopping"), ("MozzarellaTopping", "Margherita"),
+                                   ("hasTopping", "Rosa"), ("topObjectProperty", "hasBase")]:
+            self.assertLess(names.index(dependency), names.index(entity))
+
+        onto = converter.sync_with_ontology()
+        pizza_topping = onto.get_entity("pizza:PizzaTopping").actualized_entity
+        self.assertEqual([pizza_topping], onto.get_entity("pizza:MozzarellaTopping").actualized_entity.is_a)
+        # In a cycle with Pizza, whose equivalent class names it
+        has_base = onto.get_entity("pizza:hasBase").actualized_entity
+        self.assertEqual([onto.get_entity("pizza:Pizza").actualized_entity], has_base.domain)
+        self.assertEqual([onto.get_entity("pizza:PizzaBase").actualized_entity], has_base.range)
+        close_world(world)
+
     # def test_movie_ontology(self):
     #     o = Ontology.load_from_file(OWL_FILEPATH)
     #     print(o.implementation.metadata.deprecated)
 
 
+class TestIncrementalActualization(TestCase):
+    MAO = "http://www.semanticweb.org/movie-ontology/ontologies/2020/9/mao#"
+
+    def setUp(self):
+        self.manifest = EntityManifest()
+        self.onto = self.sync(range(3))
+
+    def tearDown(self):
+        cleanup(self.onto)
+
+    def load(self, film_ids, changed_id: int = None) -> OntogenConverter:
+        converter = OntogenConverter.load_from_spec(ROOT_DIR / "mao.yaml")
+        country = OwlIndividual("mao:Country_1")
+        country.be_type_of(converter.get_entity("mao:Country"))
+        converter.ontology.add_entity(country)
+        for i in film_ids:
+            film = OwlIndividual(f"mao:Film_{i}")
+            film.be_type_of(converter.get_entity("mao:Film"))
+            film.add_property_assertion("mao:hasTitle", f"Film {i}" + (" (restored)" if i == changed_id else ""))
+            film.add_property_assertion("mao:hasCountryOfOrigin", "mao:Country_1")
+            converter.ontology.add_entity(film)
+        return converter
+
+    def sync(self, film_ids, changed_id: int = None) -> Ontology:
+        return self.load(film_ids, changed_id).sync_with_ontology(manifest=self.manifest)
+
+    def get(self, name: str):
+        return self.onto.implementation.world[f"{self.MAO}{name}"]
+
+    def count(self) -> tuple:
+        imp = self.onto.implementation
+        return (len(list(imp.individuals())), len(list(imp.classes())), len(list(imp.rules())),
+                len(list(imp.disjoints())))
+
+    def test_manifest(self):
+        self.assertIn("mao:Film_0", self.manifest)
+        changes = self.manifest.diff(self.load([0, 1, 3], changed_id=1).build_manifest())
+        self.assertEqual(({"mao:Film_3"}, {"mao:Film_1"}, {"mao:Film_2"}, False), changes)
+        # The rules are part of the Ontology entry
+        changes = self.manifest.diff(EntityManifest.from_ontology(self.load(range(3)).ontology, rules={}))
+        self.assertEqual(({"owl:Ontology"}, True), (changes.changed, changes.schema_changed))
+        with tempfile.TemporaryDirectory() as folder:
+            self.manifest.save(Path(folder) / "manifest.json")
+            self.assertEqual(self.manifest.entries, EntityManifest.load(Path(folder) / "manifest.json").entries)
+            self.assertEqual(0, len(EntityManifest.load(Path(folder) / "missing.json")))
+
+    def test_incremental(self):
+        before = self.count()
+        self.sync([0, 1, 3, 4], changed_id=1)
+        self.assertEqual(before[0] + 1, self.count()[0])
+        self.assertEqual(before[1:], self.count()[1:])
+        self.assertIsNone(self.get("Film_2"))
+        film = self.get("Film_1")
+        self.assertEqual(["Film 1 (restored)"], film.hasTitle)
+        self.assertEqual([self.get("Film")], film.is_a)
+        for name in ("Film_0", "Film_3", "Film_4"):
+            self.assertEqual([self.get("Country_1")], self.get(name).hasCountryOfOrigin)
+        self.assertFalse(self.manifest.diff(self.load([0, 1, 3, 4], changed_id=1).build_manifest()))
+
+    def test_schema_change(self):
+        before = self.count()
+        converter = self.load(range(3))
+        documentary = OwlClass("mao:Documentary")
+        documentary.add_superclass(converter.get_entity("mao:Film"))
+        converter.ontology.add_entity(documentary)
+        converter.sync_with_ontology(manifest=self.manifest)
+        # Everything is actualized again, without duplicates
+        self.assertEqual((before[0], before[1] + 1) + before[2:], self.count())
+        self.assertEqual([self.get("Film")], self.get("Documentary").is_a)
+        self.assertEqual([self.get("Country_1")], self.get("Film_0").hasCountryOfOrigin)
+
+
+class TestPersistentWorld(TestCase):
+    MAO = "http://www.semanticweb.org/movie-ontology/ontologies/2020/9/mao#"
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.folder = Path(self.tempdir.name)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def load(self, world, film_ids) -> OntogenConverter:
+        converter = OntogenConverter.load_from_spec(ROOT_DIR / "mao.yaml", world=world)
+        for i in film_ids:
+            film = OwlIndividual(f"mao:Film_{i}")
+            film.be_type_of(converter.get_entity("mao:Film"))
+            film.add_property_assertion("mao:hasTitle", f"Film {i}")
+            converter.ontology.add_entity(film)
+        return converter
+
+    def sync(self, world, manifest: EntityManifest, film_ids, existing_file: Path = None) -> Ontology:
+        return self.load(world, film_ids).sync_with_ontology(manifest=manifest, existing_file=existing_file)
+
+    def test_quadstore(self):
+        manifest = EntityManifest()
+        world = open_world(self.folder / "mao.sqlite3")
+        onto = self.sync(world, manifest, range(2))
+        self.assertIs(world, onto.implementation.world)
+        onto.save_world()
+        world.save(str(self.folder / "mao.owl"))
+        close_world(world)
+
+        # The next process reads the quadstore and only actualizes the new film
+        world = open_world(self.folder / "mao.sqlite3", exclusive=False)
+        onto = self.sync(world, manifest, range(3))
+        self.assertEqual(["Film 0"], world[f"{self.MAO}Film_0"].hasTitle)
+        self.assertEqual(["Film 2"], world[f"{self.MAO}Film_2"].hasTitle)
+        self.assertTrue(onto.sparql_query("ASK { mao:Film_2 rdf:type mao:Film }"))
+        close_world(world)
+
+    def test_load_from_file(self):
+        world = open_world()
+        self.sync(world, EntityManifest(), range(2)).implementation.save(str(self.folder / "mao.owl"))
+        close_world(world)
+        for _ in range(2):
+            # Parsed the first time, read from the quadstore the second time
+            world = open_world(self.folder / "mao.sqlite3")
+            onto = Ontology.load_from_file(str(self.folder / "mao.owl"), world=world)
+            self.assertEqual(self.MAO, onto.base_iri)
+            self.assertEqual(["Film 1"], onto.implementation.Film_1.hasTitle)
+            onto.save_world()
+            close_world(world)
+
+    def test_sync_with_existing_file(self):
+        owl_file, manifest_file = self.folder / "mao.owl", self.folder / "mao.manifest.json"
+        manifest = EntityManifest()
+        world = open_world()
+        self.sync(world, manifest, range(2)).save_to_file(owl_file)
+        manifest.save(manifest_file)
+        close_world(world)
+
+        # As populate_onto does: the spec first, then the file loaded into the same World
+        world = open_world()
+        converter = self.load(world, range(3))
+        manifest = EntityManifest.load(manifest_file)
+        with mock.patch.object(converter.actualizer, 'clear', side_effect=AssertionError("actualized again")):
+            converter.sync_with_ontology(manifest=manifest, existing_file=owl_file)
+        self.assertEqual(["http://anonymous/", self.MAO], list(world.ontologies))
+        self.assertEqual(["Film 0"], world[f"{self.MAO}Film_0"].hasTitle)
+        self.assertEqual(["Film 2"], world[f"{self.MAO}Film_2"].hasTitle)
+        self.assertIn("mao:Film_2", manifest)
+        close_world(world)
+
+        # Without the file, everything is actualized again
+        world = open_world()
+        onto = self.sync(world, EntityManifest.load(manifest_file), range(1), self.folder / "missing.owl")
+        self.assertEqual(["Film 0"], world[f"{self.MAO}Film_0"].hasTitle)
+        self.assertTrue(onto.sparql_query("ASK { mao:Film rdf:type owl:Class }"))
+        close_world(world)
+
+
+class TestSpecs(TestCase):
+    FAMILY = ROOT_DIR / f"tests/specs/{SPEC_VERSION}/test_case2.yaml"
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.folder = Path(self.tempdir.name)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_cache(self):
+        spec = self.folder / "family.yaml"
+        spec.write_text(self.FAMILY.read_text())
+        cache_dir = self.folder / "cache"
+        parsed = specs_module.load_spec(spec)
+        self.assertEqual(parsed, specs_module.load_spec(spec, cache_dir))
+        with mock.patch.object(specs_module.yaml, 'load', side_effect=AssertionError("parsed again")):
+            self.assertEqual(parsed, specs_module.load_spec(spec, cache_dir))
+            # The same content with another modification time
+            os.utime(spec, ns=(0, 0))
+            self.assertEqual(parsed, specs_module.load_spec(spec, cache_dir))
+        spec.write_text(self.FAMILY.read_text().replace("family:Aunt1", "family:Aunt2"))
+        self.assertIn("family:Aunt2", specs_module.load_spec(spec, cache_dir)["owl:Individual"])
+
+    def test_individual_shards(self):
+        spec = specs_module.load_spec(self.FAMILY)
+        individuals = list(spec["owl:Individual"].items())
+        shards = []
+        for i, part in enumerate((individuals[:3], individuals[3:6], individuals[6:])):
+            shards.append(self.folder / f"individuals_{i}.yaml")
+            shards[-1].write_text(yaml.dump({"owl:Individual": dict(part)}))
+        schema = self.folder / "family.yaml"
+        schema.write_text(yaml.dump(dict(spec, **{"owl:Individual": {}})))
+
+        world = open_world()
+        converter = OntogenConverter.load_from_spec(schema, world=world, individual_shards=shards, max_workers=2)
+        self.assertEqual(spec, converter._dct)
+        self.assertEqual([name for name, _ in individuals], list(converter.individuals))
+        onto = converter.sync_with_ontology()
+        self.assertEqual([onto.get_entity("family:Father1").actualized_entity],
+                         onto.get_entity("family:Aunt1").actualized_entity.isSiblingOf)
+        close_world(world)
+        with self.assertRaises(OntologyConsistencyError):
+            OntogenConverter.load_from_spec(self.FAMILY, individual_shards=shards[:1])
+
+
+class TestEntityIndex(TestCase):
+    def test_indexes(self):
+        entities = EntityIndex()
+        film = OwlClass("mao:Film")
+        award = OwlClass("mao:Award")
+        parasite = OwlIndividual("mao:Parasite")
+        parasite.be_type_of(film)
+        entities.update({"mao:Film": film, "mao:Award": award, "mao:Parasite": parasite,
+                         "mao:hasTitle": OwlDataProperty("mao:hasTitle")})
+        classes = entities.of_type(OwlClass)
+        films = entities.individuals_of("mao:Film")
+        self.assertEqual(["mao:Film", "mao:Award"], list(classes))
+        self.assertEqual(["mao:hasTitle"], list(entities.of_type(OwlDataProperty)))
+        self.assertEqual({"mao:Parasite": parasite}, dict(films))
+        with self.assertRaises(TypeError):
+            classes["mao:Person"] = OwlClass("mao:Person")
+
+        # The views are kept up to date
+        parasite.be_type_of(award)
+        self.assertEqual(["mao:Parasite"], list(entities.individuals_of(award)))
+        entities["mao:Award"] = OwlIndividual("mao:Award")
+        self.assertEqual(["mao:Film"], list(classes))
+        del entities["mao:Parasite"]
+        self.assertEqual({}, dict(films))
+        self.assertEqual(["mao:Award"], list(entities.of_type(OwlIndividual)))
+        # No longer in the index, so not indexed again
+        parasite.be_type_of(OwlClass("mao:Person"))
+        self.assertEqual({}, dict(entities.individuals_of("mao:Person")))
+
+    def test_ontology(self):
+        converter = OntogenConverter.load_from_spec(ROOT_DIR / f"tests/specs/{SPEC_VERSION}/test_case2.yaml")
+        onto = converter.ontology
+        self.assertEqual({name for name, entity in onto.entities.items() if isinstance(entity, OwlIndividual)},
+                         set(onto.individuals))
+        self.assertEqual({name for name, entity in onto.entities.items() if isinstance(entity, OwlObjectProperty)},
+                         set(onto.object_properties))
+        person = onto.get_entity("family:Person")
+        self.assertEqual({i.name_with_prefix for i in person.individuals}, set(onto.individuals_of(person)))
+
+
+class TestPrefixRegistry(TestCase):
+    MAO = "http://www.semanticweb.org/movie-ontology/ontologies/2020/9/mao#"
+
+    def test_lookup(self):
+        iris = PrefixRegistry({"mao": self.MAO, "Film": "http://example.org/film#"})
+        self.assertEqual(self.MAO, iris.lookup_iri("MAO"))
+        # The prefixes are looked up in lowercase, as before
+        with self.assertRaises(KeyError):
+            iris.lookup_iri("Film")
+        self.assertEqual("mao", iris.lookup_prefix(self.MAO))
+        self.assertEqual(f"{self.MAO}Film", iris.expand("Film", "mao"))
+        self.assertEqual(lookup_iri("mao", {"mao": self.MAO}), lookup_iri("mao", iris))
+
+        # The well-known prefixes take precedence
+        iris["owl"] = "http://example.org/owl#"
+        self.assertEqual(WELL_KNOWN_PREFIXES["owl"], iris.lookup_iri("owl"))
+        self.assertEqual("owl", iris.lookup_prefix("http://example.org/owl#"))
+
+        iris["movie"] = self.MAO
+        self.assertEqual("movie", iris.lookup_prefix(self.MAO))
+        del iris["movie"]
+        self.assertEqual("mao", iris.lookup_prefix(self.MAO))
+        iris["mao"] = "http://example.org/mao#"
+        with self.assertRaises(KeyError):
+            iris.lookup_prefix(self.MAO)
+        self.assertEqual({"http://example.org/mao#": "mao", "http://example.org/film#": "Film",
+                          "http://example.org/owl#": "owl"}, dict(iris.iri_to_prefixes))
+
+    def test_build_prefixes(self):
+        prefixes = {"mao": self.MAO}
+        self.assertIn(f"PREFIX owl: <{WELL_KNOWN_PREFIXES['owl']}>\n", build_prefixes(prefixes))
+        self.assertEqual({"mao": self.MAO}, prefixes)
+
+    def test_ontology(self):
+        onto = Ontology(self.MAO, "mao", world=World())
+        onto.create()
+        onto.define_prefix("movie", self.MAO)
+        self.assertEqual({"mao": self.MAO}, dict(onto.iris))
+        self.assertEqual("mao", onto.lookup_prefix(self.MAO))
+        self.assertEqual(f"{self.MAO}Film", OwlClass("mao:Film").get_iri(onto))
+        onto.sparql_query("ASK { ?s ?p ?o }")
+        self.assertEqual({"mao": self.MAO}, dict(onto.iris))
+        onto.world.close()
+
+
+class TestSaveToFile(TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.folder = Path(self.tempdir.name)
+        self.world = open_world()
+        converter = OntogenConverter.load_from_spec(ROOT_DIR / "mao.yaml", world=self.world)
+        film = OwlIndividual("mao:Film_1")
+        film.be_type_of(converter.get_entity("mao:Film"))
+        film.add_property_assertion("mao:hasTitle", 'The "Film"\\\n')
+        film.add_property_assertion("mao:hasInitialReleaseYear", 1999)
+        converter.ontology.add_entity(film)
+        self.onto = converter.sync_with_ontology()
+
+    def tearDown(self):
+        close_world(self.world)
+        self.tempdir.cleanup()
+
+    def test_streamed_formats(self):
+        def ground_triples(graph) -> set:
+            return {triple for triple in graph if not any(isinstance(term, BNode) for term in triple)}
+
+        expected = self.world.as_rdflib_graph().get_context(self.onto.implementation)
+        for file_format, rdflib_format in (("nt", "nt"), ("ttl", "turtle")):
+            with self.subTest(file_format):
+                filename = self.folder / f"mao.{file_format}"
+                self.onto.save_to_file(str(filename), file_format)
+                graph = Graph().parse(str(filename), format=rdflib_format)
+                self.assertEqual(len(expected), len(graph))
+                self.assertEqual(ground_triples(expected), ground_triples(graph))
+        # The prefixes of the Ontology abbreviate the IRIs in Turtle
+        self.assertIn("mao:Film_1 a owl:NamedIndividual", (self.folder / "mao.ttl").read_text("utf-8"))
+
+    def test_xml(self):
+        self.onto.save_to_file(str(self.folder / "mao.owl"))
+        onto = Ontology.load_from_file(str(self.folder / "mao.owl"), world=open_world())
+        self.assertEqual([1999], onto.implementation.Film_1.hasInitialReleaseYear)
+
+
 FIXTURES = (
     ("(Mo) and (Ding)", "mao.Mo & mao.Ding"),
     ("{Male, Female, NonBinary}", "OneOf([mao.Male, mao.Female, mao.NonBinary])"),
@@ -146,8 +522,9 @@ class OntogenClassExpressionTestCase(TestCase):
     def setUp(self):
         self.onto = Ontology("http://www.semanticweb.org/movie-ontology/ontologies/2020/9/mao#")
         self.onto.create()
+        self.actualizer = Owlready2Actualizer()
         obj_prop = OwlObjectProperty("mao:hasPet")
-        obj_prop.actualize(self.onto)
+        self.actualizer.property_actualizer.actualize(obj_prop, self.onto)
 
     def test_basic(self):
         c = OwlClass("mao:Gender")
@@ -160,6 +537,7 @@ class OntogenClassExpressionTestCase(TestCase):
         i = OwlIndividual("mao:NonBinary")
         i.be_type_of(c)
         # i.actualize(self.onto)
+        self.actualizer.class_actualizer.actualize(c, self.onto)
         cls = ClassExpToConstruct(self.onto)
         for fixture in FIXTURES:
             exp, expected = fixture
@@ -167,6 +545,27 @@ class OntogenClassExpressionTestCase(TestCase):
                 construct = cls.to_construct(exp)
                 self.assertEqual(expected, str(construct))
 
+    def test_grammar(self):
+        cls = ClassExpToConstruct(self.onto)
+        # `and` binds tighter than `or`, and restrictions tighter than both
+        self.assertEqual("mao.Mo | (mao.Ding & mao.Bank)", str(cls.to_construct("Mo or Ding and Bank")))
+        self.assertEqual("mao.hasPet.some(mao.Cat) | mao.hasPet.only(Not(mao.Dog))",
+                         str(cls.to_construct("hasPet some Cat or hasPet only not Dog")))
+        self.assertEqual("mao.hasPet.some(mao.hasPet.exactly(1, mao.Cat | mao.Dog))",
+                         str(cls.to_construct("hasPet some hasPet exactly 1 (Cat or Dog)")))
+        self.assertEqual("mao.hasPet.min(1, owl.Thing)", str(cls.to_construct("hasPet min 1")))
+        for exp in ("Mo and", "(Mo or Ding", "Mo Ding", "hasPet min Cat", "(Mo or Ding) some Cat", "Mo $ Ding", ""):
+            with self.subTest(exp=exp):
+                with self.assertRaises(SyntaxError):
+                    cls.to_construct(exp)
+
+    def test_parse_cache(self):
+        tree = parse_class_expression("Mai and (hasPet exactly 2 Cat)")
+        self.assertIs(tree, parse_class_expression("Mai and (hasPet exactly 2 Cat)"))
+        # The constructs are not shared between the classes they are lowered for
+        cls = ClassExpToConstruct(self.onto)
+        self.assertIsNot(cls.to_construct("hasPet some Cat"), cls.to_construct("hasPet some Cat"))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,18 @@
+import subprocess
+import sys
+import unittest
+
+from dirs import ROOT_DIR
+
+
+class TestPopulateOnto(unittest.TestCase):
+
+    def test_import(self):
+        # In a new process, so that no other test has set up Django before
+        result = subprocess.run([sys.executable, '-c', 'import populate_onto'], cwd=ROOT_DIR,
+                                capture_output=True, text=True)
+        self.assertEqual(0, result.returncode, result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import importlib.util
+import pickle
+import tempfile
+import unittest
+from doctest import DocTestSuite
+from pathlib import Path
+from unittest import mock
+
+import spacy_nlp
+from spacy_nlp import ClassificationCache
+
+
+def load_tests(loader: unittest.TestLoader, tests: unittest.TestSuite, ignore) -> unittest.TestSuite:
+    tests.addTests(DocTestSuite(spacy_nlp))
+    return tests
+
+
+class TestClassificationCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.folder = Path(self.tempdir.name)
+        for name, names in (('person_names', ['Fredric March', 'RC Sherriff']), ('org_names', ['Denmark'])):
+            with open(self.folder / f'{name}.pickle', 'wb') as file:
+                pickle.dump(names, file)
+        self.path = self.folder / 'classifications.sqlite3'
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_import_and_persist(self):
+        cache = ClassificationCache(self.path, pickle_dir=self.folder)
+        self.assertEqual(3, len(cache))
+        self.assertEqual('PERSON', cache.get('Fredric March'))
+        self.assertEqual('ORG', cache.get('Denmark'))
+        cache.add('Walt Disney Productions', 'ORG', 'manual')
+        with self.assertRaises(ValueError):
+            cache.add('Paris', 'GPE', 'ner')
+        cache.close()
+
+        # The pickles are only imported into a new store
+        (self.folder / 'org_names.pickle').unlink()
+        cache = ClassificationCache(self.path, pickle_dir=self.folder)
+        self.assertEqual({'Fredric March': 'PERSON', 'RC Sherriff': 'PERSON', 'Denmark': 'ORG',
+                          'Walt Disney Productions': 'ORG'}, cache.kinds)
+        cache.close()
+
+    def test_cached_names_need_no_nlp(self):
+        cache = ClassificationCache(self.path, pickle_dir=self.folder)
+        self.assertEqual({'Denmark': 'ORG', 'Fredric March': 'PERSON'},
+                         spacy_nlp.classify_names(['Denmark', 'Fredric March'], cache=cache))
+        self.assertEqual(['The Best Years of Our Lives', 'Hamlet'],
+                         spacy_nlp.pick_not_person_names([('Fredric March', 'The Best Years of Our Lives'),
+                                                          ('Hamlet', 'RC Sherriff')], cache=cache))
+        # Two persons do not stop the batch
+        self.assertEqual([None, 'Hamlet'],
+                         spacy_nlp.pick_not_person_names([('Fredric March', 'RC Sherriff'), ('Hamlet', 'RC Sherriff')],
+                                                         cache=cache))
+        cache.close()
+
+    def test_negative_results_need_no_nlp(self):
+        cache = ClassificationCache(self.path, pickle_dir=self.folder)
+        labels = {'Hamlet': ('WORK_OF_ART',), 'The Third Man': (), 'Carol Reed': ('PERSON',)}
+        with mock.patch.object(spacy_nlp, 'get_entity_labels',
+                               side_effect=lambda texts, **kwargs: {text: labels[text] for text in texts}) as nlp:
+            for _ in range(2):
+                self.assertEqual({'Hamlet': None, 'The Third Man': None},
+                                 spacy_nlp.classify_names(['Hamlet', 'The Third Man'], cache=cache))
+                self.assertEqual(['The Third Man', None],
+                                 spacy_nlp.pick_not_person_names([('The Third Man', 'Carol Reed'),
+                                                                  ('Hamlet', 'The Third Man')], cache=cache))
+            # Only the first calls recognize anything, the second ones read the cache
+            self.assertEqual([['Hamlet', 'The Third Man'], ['Carol Reed']],
+                             [list(call.args[0]) for call in nlp.call_args_list])
+        self.assertEqual(cache.NONE, cache.kinds['Hamlet'])
+        self.assertIsNone(cache.get('Hamlet'))
+        self.assertIn('Hamlet', cache)
+        cache.close()
+        self.assertIn('The Third Man', ClassificationCache(self.path, pickle_dir=self.folder))
+
+
+@unittest.skipUnless(importlib.util.find_spec('spacy') and importlib.util.find_spec(spacy_nlp.MODEL),
+                     f"spacy and {spacy_nlp.MODEL} are not installed")
+class TestSpacyNlp(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = ClassificationCache(':memory:', pickle_dir=None)
+
+    def tearDown(self):
+        self.cache.close()
+
+    def test_get_nlp(self):
+        nlp = spacy_nlp.get_nlp()
+        self.assertIs(nlp, spacy_nlp.get_nlp())
+        self.assertIn('ner', nlp.pipe_names)
+        self.assertNotIn('parser', nlp.pipe_names)
+
+    def test_classify_names(self):
+        kinds = spacy_nlp.classify_names(['Steven Spielberg', 'Walt Disney Productions', 'Steven Spielberg'],
+                                         batch_size=2, cache=self.cache)
+        self.assertEqual(['Steven Spielberg', 'Walt Disney Productions'], list(kinds))
+        self.assertEqual('PERSON', kinds['Steven Spielberg'])
+        self.assertEqual('PERSON', self.cache.get('Steven Spielberg'))
+
+    def test_pick_not_person_names(self):
+        picks = spacy_nlp.pick_not_person_names([('Steven Spielberg', "Schindler's List"),
+                                                 ("Schindler's List", 'Steven Spielberg')], cache=self.cache)
+        self.assertEqual(["Schindler's List", "Schindler's List"], picks)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from autogen_db_models.imdb import TitleAkas, TitleBasics
+from autogen_db_models.imdb.base import Base
+from title_matching import TitleLookup, TitleMatch, build_title_lookup, ensure_title_lookup, match_titles
+
+TITLE_BASICS = [
+    ('tt0108052', 'movie', "Schindler's List", 1993),
+    ('tt0190332', 'movie', 'Wo hu cang long', 2000),
+    ('tt0120338', 'movie', 'Titanic', 1997),
+    ('tt0046435', 'movie', 'Titanic', 1953),
+    ('tt1234567', 'tvEpisode', 'Titanic', 1997),
+]
+
+TITLE_AKAS = [
+    ('tt0108052', 1, "Schindler's List"),
+    ('tt0108052', 2, 'Schindlers List'),
+    ('tt0108052', 3, 'La lista de Schindler'),
+    ('tt0190332', 1, 'Wo hu cang long'),
+    ('tt0190332', 2, 'Crouching Tiger, Hidden Dragon'),
+    ('tt0120338', 1, 'Titanic'),
+    ('tt0046435', 1, 'Titanic'),
+    ('tt1234567', 1, 'Titanic'),
+]
+
+
+class TestTitleMatching(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+        Base.metadata.create_all(self.engine, tables=[TitleAkas.__table__, TitleBasics.__table__])
+        self.session = sessionmaker(bind=self.engine)()
+        self.session.add_all(TitleBasics(tconst=tconst, titleType=title_type, primaryTitle=title,
+                                         originalTitle=title, startYear=year)
+                             for tconst, title_type, title, year in TITLE_BASICS)
+        self.session.add_all(TitleAkas(titleId=tconst, ordering=ordering, title=title)
+                             for tconst, ordering, title in TITLE_AKAS)
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def test_build_title_lookup(self):
+        # 'Schindlers List' normalizes like "Schindler's List"
+        self.assertEqual(7, build_title_lookup(self.session, chunksize=3, verbose=0))
+        self.assertEqual(7, self.session.query(TitleLookup).count())
+        ensure_title_lookup(self.session, verbose=0)
+        self.assertEqual(7, self.session.query(TitleLookup).count())
+
+    def test_match_titles(self):
+        ensure_title_lookup(self.session, verbose=0)
+        matches = match_titles(self.session, [
+            ('Schindlers list', 1993),
+            ('Crouching Tiger, Hidden Dragon', 2001),
+            ('Titanic', 1997),
+            ('Titanic', 1954),
+            ('Titanic', 1975),
+            ('Unknown', 2000),
+        ], batch_size=2)
+        self.assertEqual({
+            ('Schindlers list', 1993): TitleMatch('tt0108052', "Schindler's List", 1993),
+            ('Crouching Tiger, Hidden Dragon', 2001): TitleMatch('tt0190332', 'Crouching Tiger, Hidden Dragon', 2000),
+            ('Titanic', 1997): TitleMatch('tt0120338', 'Titanic', 1997),
+            ('Titanic', 1954): TitleMatch('tt0046435', 'Titanic', 1953),
+            ('Titanic', 1975): None,
+            ('Unknown', 2000): None,
+        }, matches)
+        self.assertIsNone(match_titles(self.session, [('Titanic', 1954)], year_tolerance=0)[('Titanic', 1954)])
+
+
+if __name__ == '__main__':
+    unittest.main()
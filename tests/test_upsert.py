@@ -0,0 +1,64 @@
+import unittest
+
+from django.core.management import call_command
+
+from start_dj import start_django_lite
+
+start_django_lite(':memory:')
+
+from app import models
+
+
+def setUpModule():
+    call_command('migrate', 'app', verbosity=0)
+
+
+class TestUpsertMany(unittest.TestCase):
+
+    def setUp(self):
+        for model_cls in (models.Genre, models.Country, models.AwardCeremony, models.Award):
+            model_cls.objects.all().delete()
+
+    def test_upsert_many(self):
+        drama = models.Genre.upsert(label='Drama')
+        genres = models.Genre.upsert_many([{'label': 'Comedy'}, {'label': 'Drama'}, {'label': 'Comedy'},
+                                           {'label': 'War', 'film': None}])
+        self.assertEqual(['Comedy', 'Drama', 'Comedy', 'War'], [genre.label for genre in genres])
+        self.assertEqual(drama.pk, genres[1].pk)
+        self.assertIs(genres[0], genres[2])
+        self.assertEqual(3, models.Genre.objects.count())
+        self.assertEqual([genre.pk for genre in genres],
+                         [models.Genre.upsert(label=label).pk for label in ('Comedy', 'Drama', 'Comedy', 'War')])
+
+    def test_upsert_many_identity_map(self):
+        identity_map = {}
+        first = models.Genre.upsert_many([{'label': 'Drama'}], identity_map=identity_map)
+        models.Genre.objects.all().delete()
+        # Found in the identity map without querying
+        self.assertEqual(first, models.Genre.upsert_many([{'label': 'Drama'}], identity_map=identity_map))
+
+    def test_upsert_many_ignore_conflicts(self):
+        genres = models.Genre.upsert_many([{'label': 'Drama'}, {'label': 'War'}], ignore_conflicts=True)
+        self.assertTrue(all(genre.pk is not None for genre in genres))
+
+    def test_upsert_many_several_fields(self):
+        award = models.Award.objects.create(hasNickname='Oscars')
+        existing = models.AwardCeremony.upsert(hasAward=award, yearHeld=1929, hasEditionNumber=1, yearScreened=1928)
+        rows = [dict(hasAward=award, yearHeld=1928 + i, hasEditionNumber=i, yearScreened=1927 + i)
+                for i in range(1, 4)]
+        rows.append(dict(hasAward=award, yearHeld='1929', hasEditionNumber='1', yearScreened='1928'))
+        ceremonies = models.AwardCeremony.upsert_many(rows, batch_size=2)
+        self.assertEqual(existing.pk, ceremonies[0].pk)
+        self.assertIs(ceremonies[0], ceremonies[3])
+        self.assertEqual([1, 2, 3], [ceremony.hasEditionNumber for ceremony in ceremonies[:3]])
+        self.assertEqual(3, models.AwardCeremony.objects.count())
+
+    def test_upsert_many_multi_table_inheritance(self):
+        countries = models.Country.upsert_many([{'label': 'Thailand', 'alpha_2': 'TH', 'alpha_3': 'THA'},
+                                                {'label': 'Thailand', 'alpha_2': 'TH', 'alpha_3': 'THA'}])
+        self.assertIs(countries[0], countries[1])
+        self.assertEqual(1, models.Place.objects.count())
+
+
+if __name__ == '__main__':
+    unittest.main()
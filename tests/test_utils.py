@@ -1,11 +1,11 @@
 import unittest
 from doctest import DocTestSuite
 
-from utils import date, dict, str
+from utils import date, dict, iter, str
 
 
 def load_tests(loader: unittest.TestLoader, tests: unittest.TestSuite, ignore) -> unittest.TestSuite:
-    tests.addTests(map(DocTestSuite, (date, dict, str)))
+    tests.addTests(map(DocTestSuite, (date, dict, iter, str)))
     return tests
 
 
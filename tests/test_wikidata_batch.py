@@ -0,0 +1,134 @@
+import unittest
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rdflib import Graph
+
+from start_dj import start_django_lite
+
+start_django_lite(':memory:')
+
+from app import models
+from wikidata_queries import base
+from wikidata_queries.client import WIKIDATA_PREFIXES, RdflibTransport, WikidataClient
+
+WIKIDATA_EXTRACT = '''
+wd:Q83495 wdt:P345 "tt0133093" ; wdt:P31 wd:Q11424 ; rdfs:label "The Matrix"@en ;
+    wdt:P495 wd:Q30 ; wdt:P364 wd:Q1860 ; wdt:P577 "1999-03-31"^^xsd:date, "1999-03-24"^^xsd:date ;
+    p:P1657 [ ps:P1657 wd:Q18665339 ] .
+wd:Q189600 wdt:P345 "tt0120338" ; wdt:P31 wd:Q11424 ; rdfs:label "Titanic"@en .
+wd:Q30 rdfs:label "United States of America"@en, "Etats-Unis"@fr .
+wd:Q1860 rdfs:label "English"@en .
+wd:P1657 wdt:P31 wd:Q24716199 ; wdt:P17 wd:Q30 ; rdfs:label "MPA film rating"@en ;
+    wikibase:claim p:P1657 ; wikibase:statementProperty ps:P1657 .
+wd:Q18665339 rdfs:label "R"@en .
+'''
+
+
+def setUpModule():
+    call_command('migrate', 'app', verbosity=0)
+
+
+def make_client() -> WikidataClient:
+    graph = Graph()
+    prefixes = dict(WIKIDATA_PREFIXES, xsd='http://www.w3.org/2001/XMLSchema#')
+    graph.parse(data=''.join(f'@prefix {prefix}: <{iri}> .\n' for prefix, iri in prefixes.items())
+                + WIKIDATA_EXTRACT, format='turtle')
+    return WikidataClient(RdflibTransport(graph), min_interval=0, cache_dir=None)
+
+
+class TestBatchQueries(unittest.TestCase):
+
+    def setUp(self):
+        self.client = make_client()
+
+    def test_get_from_imdb_ids(self):
+        with mock.patch.object(self.client, 'query_many', wraps=self.client.query_many) as query_many:
+            dfs = list(base.get_from_imdb_ids(['tt0133093', 'tt0120338', 'tt0000000', 'tt0133093'],
+                                              batch_size=2, client=self.client))
+        # The batches are sent at once
+        self.assertEqual(2, len(query_many.call_args.args[0]))
+        self.assertEqual(2, len(dfs))
+        self.assertEqual(2, self.client.requests)
+        self.assertEqual({'tt0133093': 'Q83495', 'tt0120338': 'Q189600'}, dfs[0]['film'].to_dict())
+        # No film has the last IMDb id
+        self.assertEqual(0, len(dfs[1]))
+        self.assertEqual(['film'], dfs[1].columns.tolist())
+
+    def test_get_single_valued_props(self):
+        df, = base.get_single_valued_props(['Q83495', 'Q189600'], client=self.client)
+        self.assertEqual({'hasCountryOfOrigin': 'United States of America', 'hasOriginalLanguage': 'English',
+                          'hasPublicationDate': '1999-03-24'}, df.loc['Q83495'].to_dict())
+        self.assertIsNone(df.loc['Q189600', 'hasCountryOfOrigin'])
+        with self.assertRaises(ValueError):
+            list(base.get_single_valued_props(['Q83495 } DELETE {'], client=self.client))
+
+    def test_unknown_films(self):
+        # The aggregate query still returns one row, with nothing bound
+        df, = base.get_single_valued_props(['Q1', 'Q2'], client=self.client)
+        self.assertEqual(0, len(df))
+        self.assertEqual(['hasCountryOfOrigin', 'hasOriginalLanguage', 'hasPublicationDate'], df.columns.tolist())
+        df, = base.get_content_ratings_for_films(['Q1'], client=self.client)
+        self.assertEqual(0, len(df))
+
+    def test_get_content_ratings_for_films(self):
+        df, = base.get_content_ratings_for_films(['Q83495', 'Q189600'], client=self.client)
+        self.assertEqual([('Q83495', 'MPA film rating', 'United States of America', 'R')],
+                         list(df.itertuples(name=None)))
+
+
+class TestSyncManyFromWikidata(unittest.TestCase):
+
+    def setUp(self):
+        models.Film.objects.all().delete()
+        self.films = [models.Film.objects.create(t_const=tconst, hasTitle=title)
+                      for tconst, title in (('tt0133093', 'The Matrix'), ('tt0120338', 'Titanic'),
+                                            ('tt0000000', 'Unknown'))]
+
+    def test_sync_many_from_wikidata(self):
+        client = make_client()
+        with mock.patch.object(base, 'builder', base.WikiDataQueryBuilder(client)):
+            synced = models.Film.sync_many_from_wikidata(self.films)
+        self.assertEqual(['tt0133093', 'tt0120338'], [film.t_const for film in synced])
+        self.assertEqual(2, client.requests)
+
+        matrix = models.Film.objects.get(t_const='tt0133093')
+        self.assertEqual('Q83495', matrix.hasWikidataId)
+        self.assertEqual('1999-03-24', matrix.dateReleased)
+        self.assertEqual('United States of America', matrix.hasCountryOfOrigin.label)
+        self.assertEqual('English', matrix.hasOriginalLanguage.label)
+        titanic = models.Film.objects.get(t_const='tt0120338')
+        self.assertEqual('Q189600', titanic.hasWikidataId)
+        self.assertIsNone(titanic.hasCountryOfOrigin)
+        self.assertIsNone(models.Film.objects.get(t_const='tt0000000').hasWikidataId)
+
+    def count_sync_queries(self, num_films: int) -> int:
+        models.Film.objects.all().delete()
+        country, = models.Country.upsert_many([{'label': 'United States of America'}])
+        language, = models.Language.upsert_many([{'label': 'English'}])
+        models.Film.objects.bulk_create(models.Film(t_const=f'tt{i:07}', hasWikidataId='Q83495',
+                                                    hasCountryOfOrigin=country, hasOriginalLanguage=language)
+                                        for i in range(num_films))
+        films = list(models.Film.objects.all())
+        with mock.patch.object(base, 'builder', base.WikiDataQueryBuilder(make_client())), \
+                CaptureQueriesContext(connection) as queries:
+            models.Film.sync_many_from_wikidata(films)
+        return len(queries)
+
+    def test_sync_queries(self):
+        # The countries and languages the films already have are not read for each of them
+        self.assertEqual(self.count_sync_queries(5), self.count_sync_queries(50))
+
+    def test_sync_unknown_wikidata_ids(self):
+        for i, film in enumerate(self.films):
+            film.hasWikidataId = f'Q{i + 1}'
+        with mock.patch.object(base, 'builder', base.WikiDataQueryBuilder(make_client())):
+            synced = models.Film.sync_many_from_wikidata(self.films)
+        self.assertEqual(self.films, synced)
+        self.assertIsNone(models.Film.objects.get(t_const='tt0133093').hasCountryOfOrigin)
+
+
+if __name__ == '__main__':
+    unittest.main()
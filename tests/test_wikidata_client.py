@@ -0,0 +1,171 @@
+import tempfile
+import threading
+import time
+import unittest
+from doctest import DocTestSuite
+from pathlib import Path
+from unittest import mock
+
+from rdflib import Graph
+
+from wikidata_queries import base
+from wikidata_queries import client as client_module
+from wikidata_queries.base import WikiDataQueryBuilder
+from wikidata_queries.client import FixtureTransport, RdflibTransport, RetryableError, WikidataClient, \
+    bindings_to_frame, iter_bindings, query_key
+from wikidata_queries.contracts import ContentRatingContract, FilmContract
+
+
+def load_tests(loader: unittest.TestLoader, tests: unittest.TestSuite, ignore) -> unittest.TestSuite:
+    tests.addTests(DocTestSuite(client_module))
+    return tests
+
+
+def results(*values: str) -> dict:
+    return {'head': {'vars': ['film']},
+            'results': {'bindings': [{'film': {'type': 'uri', 'value': value}} for value in values]}}
+
+
+class CountingTransport:
+    """Answers every query with its text after failing `failures` times."""
+
+    def __init__(self, failures: int = 0, error: type = RetryableError):
+        self.failures = failures
+        self.error = error
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, query: str) -> dict:
+        with self.lock:
+            self.calls.append(query)
+            if self.failures > 0:
+                self.failures -= 1
+                raise self.error('try again')
+        return results(query)
+
+
+WIKIDATA_EXTRACT = '''
+wd:Q83495 wdt:P345 "tt0133093" ; wdt:P31 wd:Q11424 ; rdfs:label "The Matrix"@en, "Matrix"@fr .
+wd:Q189600 wdt:P345 "tt0120338" ; wdt:P31 wd:Q11424 ; rdfs:label "Titanic"@en .
+'''
+
+
+class TestWikidataClient(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.cache_dir = Path(self.tempdir.name)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_disk_cache(self):
+        transport = CountingTransport()
+        client = WikidataClient(transport, min_interval=0, cache_dir=self.cache_dir)
+        self.assertEqual(results('SELECT 1'), client.query('SELECT 1'))
+        self.assertEqual(results('SELECT 1'), client.query('SELECT 1'))
+        self.assertEqual(1, len(transport.calls))
+        self.assertTrue((self.cache_dir / f"{query_key('SELECT 1')}.json").exists())
+
+        # Another run reads the cache, and so can the tests
+        self.assertEqual(results('SELECT 1'), WikidataClient(CountingTransport(failures=10), min_interval=0,
+                                                             max_retries=0, cache_dir=self.cache_dir).query('SELECT 1'))
+        self.assertEqual(results('SELECT 1'), FixtureTransport(self.cache_dir)('SELECT 1'))
+        with self.assertRaises(LookupError):
+            FixtureTransport(self.cache_dir)('SELECT 2')
+
+    def test_retry(self):
+        transport = CountingTransport(failures=2)
+        client = WikidataClient(transport, min_interval=0, backoff=0.01, cache_dir=None)
+        self.assertEqual(results('SELECT 1'), client.query('SELECT 1'))
+        self.assertEqual(3, client.requests)
+
+        client = WikidataClient(CountingTransport(failures=5), min_interval=0, max_retries=2, backoff=0.01,
+                                cache_dir=None)
+        with self.assertRaises(RetryableError):
+            client.query('SELECT 1')
+        self.assertEqual(3, client.requests)
+
+        # Other errors are not retried
+        client = WikidataClient(CountingTransport(failures=1, error=ValueError), min_interval=0, cache_dir=None)
+        with self.assertRaises(ValueError):
+            client.query('SELECT 1')
+        self.assertEqual(1, client.requests)
+
+    def test_query_many(self):
+        transport = CountingTransport()
+        client = WikidataClient(transport, max_workers=4, min_interval=0.02, cache_dir=None)
+        queries = [f'SELECT {i % 6}' for i in range(12)]
+        start = time.monotonic()
+        responses = client.query_many(queries)
+        elapsed = time.monotonic() - start
+        self.assertEqual([results(query) for query in queries], responses)
+        self.assertLessEqual(len(transport.calls), 12)
+        self.assertGreaterEqual(len(transport.calls), 6)
+        # The requests are at least min_interval apart
+        self.assertGreaterEqual(elapsed, 0.02 * (len(transport.calls) - 1) * 0.9)
+
+    def test_rdflib_transport(self):
+        graph = Graph()
+        prefixes = ''.join(f'@prefix {prefix}: <{iri}> .\n' for prefix, iri in client_module.WIKIDATA_PREFIXES.items())
+        graph.parse(data=prefixes + WIKIDATA_EXTRACT, format='turtle')
+        client = WikidataClient(RdflibTransport(graph), min_interval=0, cache_dir=None)
+        builder = WikiDataQueryBuilder(client)
+        df = builder.raw_query(['film'], 'SELECT ?film { ?film wdt:P345 "tt0133093" . }')
+        self.assertEqual(['http://www.wikidata.org/entity/Q83495'], df['film.value'].tolist())
+        df = builder.query(['label'], 'wd:Q83495 rdfs:label ?label . FILTER(LANG(?label) = "en")')
+        self.assertEqual(['The Matrix'], df['label.value'].tolist())
+
+
+def literal(value: str) -> dict:
+    return {'type': 'literal', 'value': value}
+
+
+class TestDecodeBindings(unittest.TestCase):
+    results = {'head': {'vars': ['crpLabel', 'countryLabel', 'contentRatingLabel']},
+               'results': {'bindings': [
+                   {'crpLabel': literal('MPA film rating'), 'countryLabel': literal('United States of America'),
+                    'contentRatingLabel': literal('R')},
+                   {'crpLabel': literal('FSK'), 'contentRatingLabel': literal('FSK 16')},
+               ]}}
+
+    def builder(self, results: dict):
+        client = WikidataClient(lambda query: results, min_interval=0, cache_dir=None)
+        return mock.patch.object(base, 'builder', WikiDataQueryBuilder(client))
+
+    def test_iter_bindings(self):
+        self.assertEqual([('R', 'United States of America'), ('FSK 16', None)],
+                         list(iter_bindings(self.results, ['contentRatingLabel', 'countryLabel'])))
+        # A variable of the query without any binding is not missing
+        self.assertEqual([], list(iter_bindings({'head': {'vars': ['film']}, 'results': {'bindings': []}}, ['film'])))
+        with self.assertRaises(KeyError):
+            list(iter_bindings(self.results, ['film']))
+
+    def test_bindings_to_frame(self):
+        df = bindings_to_frame(self.results, ['crpLabel', 'countryLabel'])
+        self.assertEqual(['crpLabel.value', 'countryLabel.value'], df.columns.tolist())
+        self.assertEqual(['United States of America', None], df['countryLabel.value'].tolist())
+        with self.assertRaises(KeyError):
+            bindings_to_frame(self.results, ['film'])
+
+    def test_contracts(self):
+        with self.builder(self.results):
+            self.assertEqual([ContentRatingContract(label='MPA film rating',
+                                                    appliesInCountry='United States of America', value='R'),
+                              ContentRatingContract(label='FSK', appliesInCountry=None, value='FSK 16')],
+                             base.get_content_ratings_for_film('Q83495'))
+        results = {'head': {'vars': ['originatingCountryLabel', 'originalLangLabel', 'publicationDateLabel']},
+                   'results': {'bindings': [{'originatingCountryLabel': literal('United States of America'),
+                                             'originalLangLabel': literal('English'),
+                                             'publicationDateLabel': literal('1999-03-24')}]}}
+        with self.builder(results):
+            self.assertEqual(FilmContract(hasCountryOfOrigin='United States of America', hasOriginalLanguage='English',
+                                          hasPublicationDate='1999-03-24'),
+                             base.get_single_valued_prop('Q83495'))
+        with self.builder({'head': {'vars': ['film']}, 'results': {'bindings': []}}):
+            with self.assertRaises(KeyError):
+                base.get_from_imdb_id('tt0000000')
+
+
+if __name__ == '__main__':
+    unittest.main()
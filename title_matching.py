@@ -0,0 +1,148 @@
+"""Matches (title, year) pairs, e.g. from award data, to IMDb titles.
+
+`TitleLookup` is a table of every IMDb title and alternative title keyed by
+`normalize_title` and start year, with an index on both. It is built once from
+`title_akas` and `title_basics` by `build_title_lookup`, after which `match_titles`
+resolves any number of pairs with a few batched queries instead of one scan of
+`title_akas` per pair.
+"""
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import Column, Index, Integer, String, func, select
+from sqlalchemy.orm import Session as OrmSession
+
+from autogen_db_models.imdb import TitleAkas, TitleBasics
+from autogen_db_models.imdb.base import Base
+from utils.str import normalize_title
+
+__all__ = ['TitleLookup', 'TitleMatch', 'build_title_lookup', 'ensure_title_lookup', 'match_titles']
+
+# Preferred when several titles match equally well
+TITLE_TYPE_RANK = {'movie': 0, 'tvMovie': 1, 'short': 2, 'video': 3}
+
+
+class TitleLookup(Base):
+    __tablename__ = 'title_lookup'
+
+    _id = Column(Integer, primary_key=True)
+    normTitle = Column(String, nullable=False)
+    year = Column(Integer)
+    tconst = Column(String, nullable=False)
+    title = Column(String)
+    titleType = Column(String)
+
+    __table_args__ = (
+        Index('ix_title_lookup_norm_title_year', 'normTitle', 'year'),
+    )
+
+    def __repr__(self):
+        return f"<TitleLookup(normTitle='{self.normTitle}', year='{self.year}', tconst='{self.tconst}', title='{self.title}', titleType='{self.titleType}')>"
+
+
+class TitleMatch(NamedTuple):
+    tconst: str
+    title: str
+    year: int
+
+
+def build_title_lookup(session: OrmSession, *, chunksize: int = 50_000, verbose: int = 1) -> int:
+    """Fills `TitleLookup` from `TitleAkas` joined with `TitleBasics`, replacing its rows.
+
+    The akas are read in chunks in order of `titleId`, so only the keys of the
+    current title have to be kept to skip duplicates.
+
+    Returns:
+        The number of rows inserted.
+    """
+    table = TitleLookup.__table__
+    table.create(session.get_bind(), checkfirst=True)
+    session.execute(table.delete())
+
+    stmt = select(TitleAkas.titleId, TitleAkas.title, TitleBasics.startYear, TitleBasics.titleType) \
+        .join(TitleBasics, TitleAkas.titleId == TitleBasics.tconst) \
+        .order_by(TitleAkas.titleId)
+    count = 0
+    current_tconst = None
+    seen = set()
+    result = session.execute(stmt, execution_options={'yield_per': chunksize})
+    for rows in result.partitions():
+        records = []
+        for tconst, title, year, title_type in rows:
+            if title is None:
+                continue
+            if tconst != current_tconst:
+                current_tconst = tconst
+                seen = set()
+            norm_title = normalize_title(title)
+            if not norm_title or norm_title in seen:
+                continue
+            seen.add(norm_title)
+            records.append({'normTitle': norm_title, 'year': year, 'tconst': tconst,
+                            'title': title, 'titleType': title_type})
+        if records:
+            session.execute(table.insert(), records)
+            count += len(records)
+        if verbose > 0:
+            print(f'Title lookup: {count} rows')
+    session.commit()
+    return count
+
+
+def ensure_title_lookup(session: OrmSession, **kwargs) -> None:
+    """Builds `TitleLookup` with `build_title_lookup` unless it already has rows."""
+    TitleLookup.__table__.create(session.get_bind(), checkfirst=True)
+    if not session.execute(select(func.count()).select_from(TitleLookup.__table__)).scalar():
+        build_title_lookup(session, **kwargs)
+
+
+def _rank(row, title: str, year: int) -> tuple:
+    return (abs(row.year - year),
+            row.title != title,
+            TITLE_TYPE_RANK.get(row.titleType, len(TITLE_TYPE_RANK)),
+            row.tconst)
+
+
+def match_titles(session: OrmSession,
+                 pairs: Iterable[Tuple[str, int]],
+                 *,
+                 year_tolerance: int = 1,
+                 batch_size: int = 500,
+                 ) -> Dict[Tuple[str, int], Optional[TitleMatch]]:
+    """Returns the best IMDb title for each (title, year) in `pairs`, or None if there is none.
+
+    A title matches if its `normalize_title` is the same and its start year is at most
+    `year_tolerance` away. The closest year wins, then an exact title, then movies
+    over other title types, then the lowest tconst.
+
+    Args:
+        session: A session to the database with a built `TitleLookup`.
+        pairs: The titles and years to match.
+        year_tolerance: The maximum difference of years.
+        batch_size: The number of distinct normalized titles looked up per query.
+    """
+    pairs = list(dict.fromkeys(pairs))
+    by_norm: Dict[str, List[Tuple[str, int]]] = {}
+    for title, year in pairs:
+        by_norm.setdefault(normalize_title(title), []).append((title, year))
+
+    candidates: Dict[str, list] = {}
+    norm_titles = [norm for norm in by_norm if norm]
+    columns = TitleLookup.__table__.c
+    for i in range(0, len(norm_titles), batch_size):
+        stmt = select(columns.normTitle, columns.year, columns.tconst, columns.title, columns.titleType) \
+            .where(columns.normTitle.in_(norm_titles[i:i + batch_size]))
+        for row in session.execute(stmt):
+            if row.year is not None:
+                candidates.setdefault(row.normTitle, []).append(row)
+
+    matches: Dict[Tuple[str, int], Optional[TitleMatch]] = {}
+    for norm_title, norm_pairs in by_norm.items():
+        rows = candidates.get(norm_title, [])
+        for title, year in norm_pairs:
+            close = [row for row in rows if abs(row.year - year) <= year_tolerance]
+            if close:
+                best = min(close, key=lambda row: _rank(row, title, year))
+                matches[(title, year)] = TitleMatch(best.tconst, best.title, best.year)
+            else:
+                matches[(title, year)] = None
+    return matches
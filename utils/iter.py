@@ -1,7 +1,9 @@
-from itertools import chain, tee
-from typing import Iterable, overload
+from itertools import chain, islice, tee
+from typing import Iterable, Iterator, List, TypeVar, overload
 
-__all__ = ['pairwise', 'remove_consecs']
+__all__ = ['pairwise', 'remove_consecs', 'chunked']
+
+_T = TypeVar('_T')
 
 
 def pairwise(iterable: Iterable) -> zip:
@@ -26,3 +28,20 @@ def remove_consecs(lst: list, o: object = None) -> Iterable:
     if o is None:
         raise NotImplementedError
     return chain((curr for curr, nxt in pairwise(lst) if not (curr == nxt == o)), lst[-1])
+
+
+def chunked(iterable: Iterable[_T], size: int) -> Iterator[List[_T]]:
+    """Yields lists of `size` consecutive items of `iterable`. The last list may be shorter.
+
+    Examples:
+        >>> list(chunked(range(5), 2))
+        [[0, 1], [2, 3], [4]]
+    """
+    if size < 1:
+        raise ValueError(f"size must be at least 1, got {size}")
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
@@ -1,8 +1,9 @@
 import string
+import unicodedata
 
 from utils.iter import remove_consecs
 
-__all__ = ['snake_to_camel', 'camel_to_snake', 'to_all_caps', 'snake_to_capwords', 'snake_case']
+__all__ = ['snake_to_camel', 'camel_to_snake', 'to_all_caps', 'snake_to_capwords', 'snake_case', 'normalize_title']
 
 
 def snake_case(s: str) -> str:
@@ -137,6 +138,31 @@ def trim_spaces(s: str) -> str:
     return ' '.join(_ for _ in s.split(' ') if _)
 
 
+def normalize_title(s: str) -> str:
+    """Returns a key to compare titles that only differ in case, accents, punctuation or spacing.
+
+    Examples:
+        >>> normalize_title('Les Misérables')
+        'les miserables'
+        >>> normalize_title('Crouching Tiger, Hidden Dragon')
+        'crouching tiger hidden dragon'
+        >>> normalize_title('Birdman or (The Unexpected Virtue of Ignorance)')
+        'birdman or the unexpected virtue of ignorance'
+        >>> normalize_title('Mr. & Mrs. Smith') == normalize_title('Mr and Mrs Smith')
+        True
+        >>> normalize_title("Schindler's List")
+        'schindlers list'
+    """
+    s = unicodedata.normalize('NFKD', s.replace('&', ' and '))
+    s = ''.join(c for c in s if not unicodedata.combining(c))
+    words = []
+    for word in s.casefold().split():
+        word = ''.join(c for c in word if c.isalnum())
+        if word:
+            words.append(word)
+    return ' '.join(words)
+
+
 if __name__ == '__main__':
     import doctest
 
@@ -4,29 +4,30 @@ import urllib.request
 # proxy_support = urllib.request.ProxyHandler({})
 # opener = urllib.request.build_opener(proxy_support)
 # urllib.request.install_opener(opener)
-from typing import List, NamedTuple, Tuple
+import json
+import re
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 
-
-from SPARQLWrapper import SPARQLWrapper, JSON
 import pandas as pd
 
+from wikidata_queries.client import WikidataClient, bindings_to_columns, bindings_to_frame, iter_bindings
 from wikidata_queries.contracts import ContentRatingContract, FilmContract
 from wikidata_queries.queries import CR_QUERY_TEMPLATE, SINGLE_PROP_FILM_QUERY_TEMPLATE, WIKIDATA_ID_FROM_IMDB_ID_QUERY, \
-    PREQUEL_SEQUEL_BY_WIKIDATA_ID_QUERY
+    PREQUEL_SEQUEL_BY_WIKIDATA_ID_QUERY, WIKIDATA_IDS_FROM_IMDB_IDS_QUERY, CR_BATCH_QUERY_TEMPLATE, \
+    SINGLE_PROP_FILMS_QUERY_TEMPLATE
+from utils.iter import chunked
+
+# The number of films per VALUES block, which keeps the queries well under the URL
+# length and the time limits of the endpoint
+VALUES_BATCH_SIZE = 200
 
 
 class WikiDataQueryBuilder:
-    def __init__(self):
-        self.sparql_builder = SPARQLWrapper("https://query.wikidata.org/sparql",
-                                            agent="Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.11 (KHTML, like Gecko) Chrome/23.0.1271.64 Safari/537.11")
+    def __init__(self, client: WikidataClient = None):
+        self.client = WikidataClient() if client is None else client
 
     def raw_query(self, fields: List[str], raw: str):
-        self.sparql_builder.setQuery(raw)
-        self.sparql_builder.setReturnFormat(JSON)
-        results = self.sparql_builder.query().convert()
-        results_df = pd.json_normalize(results['results']['bindings'])
-        results_df = results_df[[f'{field}.value' for field in fields]]
-        return results_df
+        return self.client.raw_query(fields, raw)
 
     def query(self, fields: List[str], where: str, limit: int = None) -> pd.DataFrame:
         # From https://www.wikidata.org/wiki/Wikidata:SPARQL_query_service/queries/examples#Cats
@@ -38,17 +39,11 @@ class WikiDataQueryBuilder:
              {where}
            }}
            """
-        self.sparql_builder.setQuery(query)
         if limit:
             query += f"""
             LIMIT {limit}
             """
-        self.sparql_builder.setReturnFormat(JSON)
-        results = self.sparql_builder.query().convert()
-
-        results_df = pd.json_normalize(results['results']['bindings'])
-        results_df[[f'{field}.value' for field in fields]].head()
-        return results_df
+        return bindings_to_frame(self.client.query(query), fields)
 
 
 builder = WikiDataQueryBuilder()
@@ -58,36 +53,123 @@ def get_individual_id_from_url(entity_url: str) -> str:
     return entity_url.replace('http://www.wikidata.org/entity/', '')
 
 
+def _wikidata_values(wikidata_ids: List[str]) -> str:
+    for wikidata_id in wikidata_ids:
+        if not re.fullmatch(r'Q\d+', wikidata_id):
+            raise ValueError(f"'{wikidata_id}' is not a Wikidata item id")
+    return ' '.join(f'wd:{wikidata_id}' for wikidata_id in wikidata_ids)
+
+
+def _query_batches(client: Optional[WikidataClient], ids: Iterable[str], batch_size: int,
+                   to_query: Callable[[List[str]], str]) -> List[dict]:
+    """Returns the results of the query of each batch of `batch_size` of the distinct `ids`,
+    sent at once with `WikidataClient.query_many`."""
+    client = builder.client if client is None else client
+    return client.query_many([to_query(batch) for batch in chunked(dict.fromkeys(ids), batch_size)])
+
+
+def _batch_frame(results: dict, columns: Dict[str, str], index: str) -> pd.DataFrame:
+    """Returns the values of the bindings of `results` as the `columns` renamed from their
+    variables, indexed by the Wikidata id of the variable `index`. Unbound values are None.
+
+    The rows where `index` is unbound are left out, like the single row of an aggregate
+    query when no film matches."""
+    values = bindings_to_columns(results, [index, *columns])
+    urls = values.pop(index)
+    bound = [i for i, url in enumerate(urls) if url is not None]
+    ids = pd.Index([get_individual_id_from_url(urls[i]) for i in bound], name=index)
+    return pd.DataFrame({columns[var]: [column[i] for i in bound] for var, column in values.items()},
+                        index=ids, dtype=object)
+
+
+def get_from_imdb_ids(imdb_ids: Iterable[str],
+                      *,
+                      batch_size: int = VALUES_BATCH_SIZE,
+                      client: WikidataClient = None) -> Iterator[pd.DataFrame]:
+    """Yields the Wikidata ids of the films of `imdb_ids` like `get_from_imdb_id`, one query per batch.
+    The queries of all the batches are sent first, concurrently, see `WikidataClient.query_many`.
+
+    Each DataFrame has a column 'film' with the Wikidata id, indexed by 'imdbId'.
+    The IMDb ids without a film on Wikidata are left out.
+
+    Args:
+        imdb_ids: The IMDb ids of the films, e.g. 'tt0133093'.
+        batch_size: The number of films per query.
+        client: The client to send the queries with. Defaults to the one of `builder`.
+    """
+    def to_query(batch: List[str]) -> str:
+        return WIKIDATA_IDS_FROM_IMDB_IDS_QUERY.format(imdb_ids=' '.join(map(json.dumps, batch)))
+
+    for results in _query_batches(client, imdb_ids, batch_size, to_query):
+        values = bindings_to_columns(results, ['imdbId', 'film'])
+        films = list(map(get_individual_id_from_url, values['film']))
+        yield pd.DataFrame({'film': films}, index=pd.Index(values['imdbId'], name='imdbId'), dtype=object)
+
+
+def get_content_ratings_for_films(wikidata_ids: Iterable[str],
+                                  *,
+                                  batch_size: int = VALUES_BATCH_SIZE,
+                                  client: WikidataClient = None) -> Iterator[pd.DataFrame]:
+    """Yields the content ratings of the films of `wikidata_ids` like `get_content_ratings_for_film`,
+    one query per batch.
+
+    Each DataFrame has the columns 'label', 'appliesInCountry' and 'value' of
+    `ContentRatingContract` and a row per rating, indexed by the Wikidata id as 'film'.
+
+    Raises:
+        ValueError: When one of `wikidata_ids` is not a Wikidata item id like 'Q83495'.
+    """
+    for results in _query_batches(client, wikidata_ids, batch_size,
+                                  lambda batch: CR_BATCH_QUERY_TEMPLATE.format(films=_wikidata_values(batch))):
+        yield _batch_frame(results, {'crpLabel': 'label', 'countryLabel': 'appliesInCountry',
+                                     'contentRatingLabel': 'value'}, 'film')
+
+
+def get_single_valued_props(wikidata_ids: Iterable[str],
+                            *,
+                            batch_size: int = VALUES_BATCH_SIZE,
+                            client: WikidataClient = None) -> Iterator[pd.DataFrame]:
+    """Yields the country of origin, original language and first publication date of the films of
+    `wikidata_ids` like `get_single_valued_prop`, one query per batch.
+
+    Each DataFrame has the columns 'hasCountryOfOrigin', 'hasOriginalLanguage' and
+    'hasPublicationDate' of `FilmContract`, indexed by the Wikidata id as 'film'.
+
+    Raises:
+        ValueError: When one of `wikidata_ids` is not a Wikidata item id like 'Q83495'.
+    """
+    for results in _query_batches(client, wikidata_ids, batch_size,
+                                  lambda batch: SINGLE_PROP_FILMS_QUERY_TEMPLATE.format(films=_wikidata_values(batch))):
+        yield _batch_frame(results, {'originatingCountryLabel': 'hasCountryOfOrigin',
+                                     'originalLangLabel': 'hasOriginalLanguage',
+                                     'publicationDateLabel': 'hasPublicationDate'}, 'film')
+
+
 def get_content_ratings_for_film(wikidata_id: str) -> List[ContentRatingContract]:
     query = CR_QUERY_TEMPLATE
-    df = builder.raw_query(['crpLabel', 'countryLabel', 'contentRatingLabel'], query.format(film=wikidata_id))
-    ratings: List[ContentRatingContract] = []
-    for index, row in df.iterrows():
-        label = row['crpLabel.value']
-        country = row['countryLabel.value']
-        rating_category = row['contentRatingLabel.value']
-        ratings.append(ContentRatingContract(label=label, appliesInCountry=country, value=rating_category))
-    return ratings
+    results = builder.client.query(query.format(film=wikidata_id))
+    return [ContentRatingContract(label=label, appliesInCountry=country, value=rating_category)
+            for label, country, rating_category
+            in iter_bindings(results, ['crpLabel', 'countryLabel', 'contentRatingLabel'])]
 
 
-def get_single_valued_prop(wikidata_id: str) -> FilmContract:
+def get_single_valued_prop(wikidata_id: str) -> Optional[FilmContract]:
     query = SINGLE_PROP_FILM_QUERY_TEMPLATE
-    df = builder.raw_query(['originatingCountryLabel', 'originalLangLabel', 'publicationDateLabel'], query.format(film=wikidata_id))
-    for index, row in df.iterrows():
-        country = row['originatingCountryLabel.value']
-        lang = row['originalLangLabel.value']
-        pub_date = row['publicationDateLabel.value']
+    results = builder.client.query(query.format(film=wikidata_id))
+    for country, lang, pub_date in iter_bindings(results, ['originatingCountryLabel', 'originalLangLabel',
+                                                           'publicationDateLabel']):
         return FilmContract(hasCountryOfOrigin=country, hasOriginalLanguage=lang, hasPublicationDate=pub_date)
+    return None
 
 
 def get_prequel_sequel(wikidata_id: str) -> Tuple[FilmContract]:
     query = PREQUEL_SEQUEL_BY_WIKIDATA_ID_QUERY
-    df = builder.raw_query(['prequels', 'sequels'], query.format(wikidata_id=wikidata_id))
-    row = df.iloc[0]
-    prequels = tuple(map(lambda x: FilmContract(wikidata_id=get_individual_id_from_url(x), isPrequel=True),
-                   row['prequels.value'].split(",")))
-    sequels = tuple(map(lambda x: FilmContract(wikidata_id=get_individual_id_from_url(x), isSequel=True),
-                  row['sequels.value'].split(",")))
+    results = builder.client.query(query.format(wikidata_id=wikidata_id))
+    prequels, sequels = list(iter_bindings(results, ['prequels', 'sequels']))[0]
+    prequels = tuple(FilmContract(wikidata_id=get_individual_id_from_url(x), isPrequel=True)
+                     for x in (prequels or '').split(",") if x)
+    sequels = tuple(FilmContract(wikidata_id=get_individual_id_from_url(x), isSequel=True)
+                    for x in (sequels or '').split(",") if x)
     return prequels + sequels
 
 
@@ -99,9 +181,14 @@ def get_from_imdb_id(imdb_id: str) -> str:
 
     Returns: The wikidata id of the given movie with the given imdb id
 
+    Raises:
+        KeyError: When no film on Wikidata has the imdb id
+
     """
-    df = builder.raw_query(['film'], WIKIDATA_ID_FROM_IMDB_ID_QUERY.format(imdb_id=imdb_id))
-    return get_individual_id_from_url(df.iloc[0]['film.value'])
+    results = builder.client.query(WIKIDATA_ID_FROM_IMDB_ID_QUERY.format(imdb_id=imdb_id))
+    for film, in iter_bindings(results, ['film']):
+        return get_individual_id_from_url(film)
+    raise KeyError(f"no film with the IMDb id '{imdb_id}' on Wikidata")
 
 
 class Genre(NamedTuple):
@@ -124,13 +211,10 @@ def get_genre_with_subgenres() -> List[GenreWithSub]:
       SERVICE wikibase:label { bd:serviceParam wikibase:language "en,[AUTO_LANGUAGE]".}
     }
     """.strip()
-    df = builder.raw_query(['genre', 'genreLabel', 'subGenre', 'subGenreLabel'], query)
+    results = builder.client.query(query)
     lst: List[GenreWithSub] = []
-    for index, row in df.iterrows():
-        genre = row['genre.value']
-        genrelabel = row['genreLabel.value']
-        subgenre = row['subGenre.value']
-        subgenrelabel = row['subGenreLabel.value']
+    for genre, genrelabel, subgenre, subgenrelabel in iter_bindings(results, ['genre', 'genreLabel', 'subGenre',
+                                                                              'subGenreLabel']):
         lst.append(GenreWithSub(
             genre=Genre(wikidata_id=get_individual_id_from_url(genre), label=genrelabel),
             subgenre=Genre(wikidata_id=get_individual_id_from_url(subgenre), label=subgenrelabel)
@@ -0,0 +1,353 @@
+"""Sends SPARQL queries to Wikidata concurrently, politely and at most once.
+
+`WikidataClient` runs queries on a thread pool, keeps requests at least
+`min_interval` seconds apart, retries failed requests with exponential backoff and
+keeps every response on disk by the hash of its query, so running the same
+enrichment again sends no request at all.
+
+The requests themselves are sent by a transport, any callable that takes the query
+text and returns the SPARQL JSON results as a dict:
+
+- `SPARQLWrapperTransport` queries an endpoint, Wikidata by default.
+- `FixtureTransport` answers from recorded responses, e.g. a cache folder.
+- `RdflibTransport` runs the queries on a local `rdflib.Graph`.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Type, Union
+
+import pandas as pd
+
+from dirs import ROOT_DIR
+
+__all__ = ['WIKIDATA_ENDPOINT', 'WIKIDATA_PREFIXES', 'DEFAULT_CACHE_DIR', 'RetryableError', 'Transport',
+           'SPARQLWrapperTransport', 'FixtureTransport', 'RdflibTransport', 'RateLimiter', 'WikidataClient',
+           'query_key', 'iter_bindings', 'bindings_to_columns', 'bindings_to_frame']
+
+WIKIDATA_ENDPOINT = "https://query.wikidata.org/sparql"
+WIKIDATA_PREFIXES = {
+    'wd': 'http://www.wikidata.org/entity/',
+    'wdt': 'http://www.wikidata.org/prop/direct/',
+    'p': 'http://www.wikidata.org/prop/',
+    'ps': 'http://www.wikidata.org/prop/statement/',
+    'wikibase': 'http://wikiba.se/ontology#',
+    'bd': 'http://www.bigdata.com/rdf#',
+    'rdfs': 'http://www.w3.org/2000/01/rdf-schema#',
+}
+DEFAULT_CACHE_DIR = ROOT_DIR / 'wikidata_queries' / 'cache'
+# Longer queries are sent by POST, since the endpoint rejects URLs much longer than this
+MAX_GET_QUERY_LENGTH = 2000
+USER_AGENT = ("Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.11 (KHTML, like Gecko) "
+              "Chrome/23.0.1271.64 Safari/537.11")
+
+Transport = Callable[[str], Dict[str, Any]]
+
+
+class RetryableError(Exception):
+    """Raised by a transport when the same request may succeed later, e.g. on a timeout of the endpoint."""
+
+
+def query_key(query: str) -> str:
+    """Returns the key of the response to `query` in a cache.
+
+    Examples:
+        >>> query_key('SELECT ?s { ?s ?p ?o }') == query_key('  SELECT ?s { ?s ?p ?o }\\n')
+        True
+    """
+    return hashlib.sha256(query.strip().encode('utf-8')).hexdigest()
+
+
+class SPARQLWrapperTransport:
+    """Sends the queries to a SPARQL endpoint with one `SPARQLWrapper` per thread."""
+
+    def __init__(self, endpoint: str = WIKIDATA_ENDPOINT, agent: str = USER_AGENT):
+        self.endpoint = endpoint
+        self.agent = agent
+        self._local = threading.local()
+
+    def __call__(self, query: str) -> Dict[str, Any]:
+        from SPARQLWrapper import GET, JSON, POST, SPARQLWrapper
+        from SPARQLWrapper.SPARQLExceptions import EndPointInternalError
+
+        sparql = getattr(self._local, 'sparql', None)
+        if sparql is None:
+            sparql = self._local.sparql = SPARQLWrapper(self.endpoint, agent=self.agent)
+        sparql.setQuery(query)
+        sparql.setMethod(POST if len(query) > MAX_GET_QUERY_LENGTH else GET)
+        sparql.setReturnFormat(JSON)
+        try:
+            return sparql.query().convert()
+        except EndPointInternalError as e:
+            # Wikidata answers 500 when a query times out, which is often temporary
+            raise RetryableError(str(e)) from e
+
+
+class FixtureTransport:
+    """Answers the queries from recorded responses, without any network access.
+
+    Raises:
+        LookupError: When a query has no recorded response.
+    """
+
+    def __init__(self, responses: Union[Dict[str, Dict[str, Any]], str, Path]):
+        """
+        Args:
+            responses: The responses by query text, or a folder of responses saved by
+                `WikidataClient` as `<query_key>.json`.
+        """
+        if isinstance(responses, dict):
+            self.responses = {query_key(query): response for query, response in responses.items()}
+            self.folder = None
+        else:
+            self.responses = {}
+            self.folder = Path(responses)
+
+    def __call__(self, query: str) -> Dict[str, Any]:
+        key = query_key(query)
+        try:
+            return self.responses[key]
+        except KeyError:
+            pass
+        if self.folder is not None:
+            try:
+                with open(self.folder / f'{key}.json', encoding='utf-8') as f:
+                    return json.load(f)
+            except FileNotFoundError:
+                pass
+        raise LookupError(f"no recorded response for the query:\n{query}")
+
+
+class RdflibTransport:
+    """Runs the queries on an `rdflib.Graph`, e.g. a small extract of Wikidata for the tests.
+
+    The `WIKIDATA_PREFIXES` can be used without declaring them. Wikidata extensions
+    like `SERVICE wikibase:label` are not supported.
+    """
+
+    def __init__(self, graph, namespaces: Dict[str, str] = None):
+        self.graph = graph
+        self.namespaces = dict(WIKIDATA_PREFIXES if namespaces is None else namespaces)
+        # rdflib graphs are not safe to query from several threads at once
+        self._lock = threading.Lock()
+
+    def __call__(self, query: str) -> Dict[str, Any]:
+        with self._lock:
+            result = self.graph.query(query, initNs=self.namespaces)
+            return json.loads(result.serialize(format='json'))
+
+
+class RateLimiter:
+    """Lets callers through at most once every `min_interval` seconds, across threads."""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.min_interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+class WikidataClient:
+    """Sends SPARQL queries through a transport with a cache, rate limiting and retries.
+
+    Examples:
+        >>> client = WikidataClient(FixtureTransport({'SELECT ?x {}': {'results': {'bindings': []}}}),
+        ...                         cache_dir=None)
+        >>> client.query('SELECT ?x {}')
+        {'results': {'bindings': []}}
+    """
+
+    def __init__(self,
+                 transport: Transport = None,
+                 *,
+                 max_workers: int = 4,
+                 min_interval: float = 0.2,
+                 max_retries: int = 3,
+                 backoff: float = 1.0,
+                 retry_on: Tuple[Type[BaseException], ...] = (RetryableError, OSError),
+                 cache_dir: Optional[Union[str, Path]] = DEFAULT_CACHE_DIR):
+        """
+        Args:
+            transport: Sends a query and returns its results. Defaults to a `SPARQLWrapperTransport` to Wikidata.
+            max_workers: The number of queries sent at the same time by `query_many`.
+            min_interval: The minimum number of seconds between the start of two requests.
+            max_retries: The number of times a failed request is sent again.
+            backoff: The seconds to wait before the first retry, doubled after each retry.
+            retry_on: The errors of the transport after which a request is sent again.
+            cache_dir: The folder to keep the responses in, or None to keep them in memory only.
+        """
+        self.transport = SPARQLWrapperTransport() if transport is None else transport
+        self.max_workers = max_workers
+        self.rate_limiter = RateLimiter(min_interval)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.retry_on = retry_on
+        self.cache_dir = None if cache_dir is None else Path(cache_dir)
+        self._memory: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.requests = 0  # the number of requests sent, including retries
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self._memory[key]
+        except KeyError:
+            pass
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(self.cache_dir / f'{key}.json', encoding='utf-8') as f:
+                response = json.load(f)
+        except FileNotFoundError:
+            return None
+        self._memory[key] = response
+        return response
+
+    def _save(self, key: str, response: Dict[str, Any]) -> None:
+        self._memory[key] = response
+        if self.cache_dir is None:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.cache_dir / f'{key}.json'
+        # Written next to the final file first, so a crash never leaves a truncated response
+        temp = path.with_name(f'{path.name}.{threading.get_ident()}.tmp')
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(response, f)
+        os.replace(temp, path)
+
+    def _send(self, query: str) -> Dict[str, Any]:
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.wait()
+            with self._lock:
+                self.requests += 1
+            try:
+                return self.transport(query)
+            except self.retry_on:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+
+    def query(self, query: str) -> Dict[str, Any]:
+        """Returns the SPARQL JSON results of `query`, from the cache if it was sent before.
+
+        Raises:
+            Exception: The last error of the transport, when every attempt failed.
+        """
+        key = query_key(query)
+        response = self._load(key)
+        if response is None:
+            response = self._send(query)
+            self._save(key, response)
+        return response
+
+    def query_many(self, queries: Iterable[str]) -> List[Dict[str, Any]]:
+        """Returns the results of each of `queries` in order, sending up to `max_workers` of them at once.
+
+        Raises:
+            Exception: The first error of a query, after the other queries are done.
+        """
+        queries = list(queries)
+        if self.max_workers <= 1 or len(queries) <= 1:
+            return [self.query(query) for query in queries]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self.query, query) for query in queries]
+            return [future.result() for future in futures]
+
+    def raw_query(self, fields: List[str], raw: str) -> pd.DataFrame:
+        """Returns the values of `fields` of the results of `raw` as columns named '<field>.value'."""
+        return bindings_to_frame(self.query(raw), fields)
+
+
+XSD = 'http://www.w3.org/2001/XMLSchema#'
+_XSD_DECODERS: Dict[str, Callable[[str], Any]] = {
+    **{XSD + name: int for name in ('integer', 'int', 'long', 'short', 'nonNegativeInteger', 'positiveInteger')},
+    **{XSD + name: float for name in ('decimal', 'double', 'float')},
+    XSD + 'boolean': lambda value: value in ('true', '1'),
+}
+
+
+def _check_fields(results: Dict[str, Any], fields: List[str]) -> None:
+    declared = results.get('head', {}).get('vars')
+    bindings = results['results']['bindings']
+    for field in fields:
+        if declared is not None and field in declared:
+            continue
+        if not any(field in binding for binding in bindings):
+            raise KeyError(f"'{field}' is not a variable of the results")
+
+
+def _decoder(typed: bool) -> Callable[[Optional[Dict[str, str]]], Any]:
+    if not typed:
+        return lambda term: None if term is None else term['value']
+
+    def decode(term: Optional[Dict[str, str]]) -> Any:
+        if term is None:
+            return None
+        convert = _XSD_DECODERS.get(term.get('datatype'))
+        return term['value'] if convert is None else convert(term['value'])
+    return decode
+
+
+def iter_bindings(results: Dict[str, Any], fields: List[str], *, typed: bool = False) -> Iterator[tuple]:
+    """Yields the values of `fields` of each binding in SPARQL JSON `results` as a tuple.
+
+    The value of a field that is not bound in a binding is None.
+
+    Args:
+        results: The SPARQL JSON results of a query.
+        fields: The names of the variables, without '?'.
+        typed: Whether to convert the numeric and boolean literals to `int`, `float` and `bool`.
+            Other values are strings.
+
+    Raises:
+        KeyError: When one of `fields` is neither a variable of the results nor bound in any binding.
+
+    Examples:
+        >>> results = {'head': {'vars': ['film', 'year']}, 'results': {'bindings': [
+        ...     {'film': {'type': 'uri', 'value': 'Q83495'},
+        ...      'year': {'type': 'literal', 'value': '1999', 'datatype': XSD + 'integer'}},
+        ...     {'film': {'type': 'uri', 'value': 'Q189600'}}]}}
+        >>> list(iter_bindings(results, ['film', 'year'], typed=True))
+        [('Q83495', 1999), ('Q189600', None)]
+        >>> list(iter_bindings(results, ['title']))
+        Traceback (most recent call last):
+        ...
+        KeyError: "'title' is not a variable of the results"
+    """
+    _check_fields(results, fields)
+    decode = _decoder(typed)
+    for binding in results['results']['bindings']:
+        yield tuple(decode(binding.get(field)) for field in fields)
+
+
+def bindings_to_columns(results: Dict[str, Any], fields: List[str], *, typed: bool = False) -> Dict[str, List[Any]]:
+    """Returns the values of `fields` in SPARQL JSON `results` as a list per field, see `iter_bindings`.
+
+    Examples:
+        >>> bindings_to_columns({'head': {'vars': ['film']}, 'results': {'bindings': []}}, ['film'])
+        {'film': []}
+    """
+    _check_fields(results, fields)
+    decode = _decoder(typed)
+    bindings = results['results']['bindings']
+    return {field: [decode(binding.get(field)) for binding in bindings] for field in fields}
+
+
+def bindings_to_frame(results: Dict[str, Any], fields: List[str], *, typed: bool = False) -> pd.DataFrame:
+    """Returns the values of `fields` in SPARQL JSON `results` as columns named '<field>.value'.
+
+    The columns are built from `bindings_to_columns` and have the object dtype, so
+    unbound values stay None.
+    """
+    columns = bindings_to_columns(results, fields, typed=typed)
+    return pd.DataFrame({f'{field}.value': values for field, values in columns.items()}, dtype=object)
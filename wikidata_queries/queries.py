@@ -38,4 +38,49 @@ WHERE {{
                      wdt:P156 ?sequel.
     SERVICE wikibase:label {{ bd:serviceParam wikibase:language "[AUTO_LANGUAGE],en". }}
 }}
-'''
\ No newline at end of file
+'''
+
+# The batch queries below take a VALUES block of many films and declare their prefixes
+# and labels explicitly, so that they also run on a local rdflib graph.
+
+WIKIDATA_PREFIX_DECLARATIONS = '''
+PREFIX wd: <http://www.wikidata.org/entity/>
+PREFIX wdt: <http://www.wikidata.org/prop/direct/>
+PREFIX wikibase: <http://wikiba.se/ontology#>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+'''
+
+WIKIDATA_IDS_FROM_IMDB_IDS_QUERY = WIKIDATA_PREFIX_DECLARATIONS + '''
+SELECT ?imdbId ?film {{
+    VALUES ?imdbId {{ {imdb_ids} }}
+    ?film wdt:P345 ?imdbId.
+}}
+'''
+
+CR_BATCH_QUERY_TEMPLATE = WIKIDATA_PREFIX_DECLARATIONS + '''
+SELECT ?film ?crpLabel ?countryLabel ?contentRatingLabel {{
+    VALUES ?film {{ {films} }}
+    ?film wdt:P31 wd:Q11424.
+    ?crp wdt:P31 wd:Q24716199;
+         wdt:P17 ?country;
+         wikibase:claim ?p;
+         wikibase:statementProperty ?ps.
+    ?film ?p [?ps ?contentRating].
+    OPTIONAL {{ ?crp rdfs:label ?crpLabel. FILTER(LANG(?crpLabel) = "en") }}
+    OPTIONAL {{ ?country rdfs:label ?countryLabel. FILTER(LANG(?countryLabel) = "en") }}
+    OPTIONAL {{ ?contentRating rdfs:label ?contentRatingLabel. FILTER(LANG(?contentRatingLabel) = "en") }}
+}}
+ORDER BY ?film ?crpLabel
+'''
+
+SINGLE_PROP_FILMS_QUERY_TEMPLATE = WIKIDATA_PREFIX_DECLARATIONS + '''
+SELECT ?film (SAMPLE(?countryLabel) AS ?originatingCountryLabel) (SAMPLE(?langLabel) AS ?originalLangLabel)
+       (MIN(?publicationDate) AS ?publicationDateLabel) {{
+    VALUES ?film {{ {films} }}
+    ?film wdt:P31 wd:Q11424.
+    OPTIONAL {{ ?film wdt:P495 ?country. ?country rdfs:label ?countryLabel. FILTER(LANG(?countryLabel) = "en") }}
+    OPTIONAL {{ ?film wdt:P364 ?lang. ?lang rdfs:label ?langLabel. FILTER(LANG(?langLabel) = "en") }}
+    OPTIONAL {{ ?film wdt:P577 ?publicationDate }}
+}}
+GROUP BY ?film
+'''
@@ -11,6 +11,8 @@ from yamd.owl import get_pretty_label, get_language_from_code, split_locstr, get
 from yamd.parser import parse_lenient_list_of_strings, parse_lenient_list_of_list_of_string, trim_dict
 
 LOLOS = Union[str, List['LOLOS']]
+# libyaml parses the specs many times faster, when PyYAML is built with it
+YAML_LOADER = getattr(yaml, 'CFullLoader', yaml.FullLoader)
 
 
 class Node:
@@ -530,7 +532,7 @@ def convert_owl_yaml_to_md(owlyaml_file: Union[str, Path],
                            md_file: Union[IO, str, Path]) -> None:
     """Converts a owl yaml specs file to md documentation."""
     with open(owlyaml_file, 'r', encoding='utf-8') as yamlfile:
-        data = yaml.load(yamlfile, yaml.FullLoader)
+        data = yaml.load(yamlfile, YAML_LOADER)
         data = trim_dict(data)
         # print(str(data))
 